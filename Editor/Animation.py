@@ -0,0 +1,302 @@
+from PySide6.QtCore import QTimer, QPointF, QRectF
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QPolygonF
+
+from bisect import bisect_right
+from math import sin, cos, pi
+from typing import Callable
+
+import os
+import time
+
+from Editor.Shapes.Shape import Shape
+from Editor.Shapes.Primitives import Polygon
+from Editor.Shapes.DeformShapes import MultiSubdividePolygon
+from Editor.Scene import Scene
+from Editor.SceneListener import SceneListener
+#
+# keyframe-track class
+#
+# value of one animated parameter over time (in seconds), interpolated linearly between the
+# keyframes and held before the first and after the last one, a plain number is a constant track
+#
+class Track:
+    def __init__(self, keyframes : list[tuple[float, float]] | float) -> None:
+        if (isinstance(keyframes, (int, float))):
+            keyframes = [(0.0, float(keyframes))]
+        if not (len(keyframes)):
+            raise AttributeError("a track requires at least one keyframe")
+        keyframes = sorted(keyframes)
+        self.__times__ : list[float] = [float(t) for t, value in keyframes]
+        self.__values__ : list[float] = [float(value) for t, value in keyframes]
+
+    @property
+    def duration(self) -> float:
+        return self.__times__[-1]
+
+    def value(self, t : float) -> float:
+        index : int = bisect_right(self.__times__, t)
+        if (index == 0):
+            return self.__values__[0]
+        if (index == len(self.__times__)):
+            return self.__values__[-1]
+        t0 : float = self.__times__[index - 1]
+        t1 : float = self.__times__[index]
+        v0 : float = self.__values__[index - 1]
+        return v0 + (self.__values__[index] - v0) * (t - t0) / (t1 - t0)
+#
+# deform-target class
+#
+# one polygon-shape whose vertices follow the animation, 'source' is its undeformed outline (the
+# current one by default) and 'rest' what the shape is given back once the animation stops
+#
+# the source is subdivided once per subdivision-level on first use and kept as plain x/y-floats,
+# together with the sine- and cosine-terms of the x-values, so a frame only has to compute
+#
+#   y + amplitude * sin(k * x + offset) = y + amplitude * (sin(k * x) * cos(offset) + cos(k * x) * sin(offset))
+#
+# per vertex, the terms are only computed again when the width (k) changes (see DeformPolygon())
+#
+class DeformTarget:
+    def __init__(self, shape : Polygon, source : QPolygonF | None = None) -> None:
+        self.shape : Polygon = shape
+        self.source : QPolygonF = QPolygonF(shape.describeShape() if (source is None) else source)
+        self.__rest__ : tuple[QPolygonF, QRectF] = (QPolygonF(shape.__polygon__), QRectF(shape.boundingBox))
+        # per subdivision-level: x- and y-values of the subdivided source
+        self.__levels__ : dict[int, tuple[list[float], list[float]]] = {}
+        # per subdivision-level: (width, sine-terms, cosine-terms)
+        self.__terms__ : dict[int, tuple[float, list[float], list[float]]] = {}
+
+    def deform(self, level : int, amplitude : float, width : float, offset : float) -> None:
+        xs, ys = self.__geometry__(level)
+        sines, cosines = self.__wave_terms__(level, width)
+        # the whole argument of the sine is taken in degrees by DeformPolygon()
+        phase : float = offset * pi / 180.0
+        a_sin : float = amplitude * cos(phase)
+        a_cos : float = amplitude * sin(phase)
+        polygon : QPolygonF = QPolygonF([QPointF(x, y + a_sin * s + a_cos * c) for x, y, s, c in zip(xs, ys, sines, cosines)])
+        self.shape.__polygon__ = polygon
+        self.shape.__bounding_box__ = polygon.boundingRect()
+        self.shape.markDirty()
+
+    def restore(self) -> None:
+        self.shape.__polygon__ = QPolygonF(self.__rest__[0])
+        self.shape.__bounding_box__ = QRectF(self.__rest__[1])
+        self.shape.markDirty()
+
+    def vertexCount(self, level : int) -> int:
+        return len(self.__geometry__(level)[0])
+
+    def __geometry__(self, level : int) -> tuple[list[float], list[float]]:
+        geometry : tuple[list[float], list[float]] | None = self.__levels__.get(level)
+        if (geometry is None):
+            points : list[QPointF] = MultiSubdividePolygon(self.source, level).toList()
+            geometry = ([point.x() for point in points], [point.y() for point in points])
+            self.__levels__[level] = geometry
+        return geometry
+
+    def __wave_terms__(self, level : int, width : float) -> tuple[list[float], list[float]]:
+        terms : tuple[float, list[float], list[float]] | None = self.__terms__.get(level)
+        if (terms is None or terms[0] != width):
+            k : float = 2.0 * pi * width * pi / 180.0
+            xs : list[float] = self.__geometry__(level)[0]
+            terms = (width, [sin(k * x) for x in xs], [cos(k * x) for x in xs])
+            self.__terms__[level] = terms
+        return (terms[1], terms[2])
+#
+# deform-animation class
+#
+# keyframed amplitude, width and offset of the sine-wave deformation (see DeformPolygon()) applied
+# to a set of targets, 'subdivisions' is the level the targets are subdivided to at full quality
+#
+# the animation repeats after 'duration' seconds (the end of the longest track by default) if 'loop' is set
+#
+class DeformAnimation:
+    def __init__(self, targets : list[DeformTarget], amplitude : Track, width : Track, offset : Track,
+                 subdivisions : int = 2, duration : float | None = None, loop : bool = True) -> None:
+        self.targets : list[DeformTarget] = list(targets)
+        self.amplitude : Track = amplitude
+        self.width : Track = width
+        self.offset : Track = offset
+        self.subdivisions : int = subdivisions
+        self.duration : float = duration if (duration is not None) else max(amplitude.duration, width.duration, offset.duration)
+        self.loop : bool = loop
+    #
+    # animation-time for 'seconds' since the start
+    #
+    def time(self, seconds : float) -> float:
+        if (self.loop and self.duration > 0.0):
+            return seconds % self.duration
+        return min(seconds, self.duration)
+    #
+    # (amplitude, width, offset) at animation-time 't'
+    #
+    def parameters(self, t : float) -> tuple[float, float, float]:
+        return (self.amplitude.value(t), self.width.value(t), self.offset.value(t))
+    #
+    # deform all targets to how they look 'seconds' after the start
+    #
+    def apply(self, seconds : float, level : int | None = None) -> None:
+        amplitude, width, offset = self.parameters(self.time(seconds))
+        for target in self.targets:
+            target.deform(self.subdivisions if (level is None) else level, amplitude, width, offset)
+
+    def restore(self) -> None:
+        for target in self.targets:
+            target.restore()
+
+#
+# animation-player class
+#
+# plays a deform-animation on the scene, driven by a timer at 'fps' ticks per second
+#
+# every tick deforms targets (round-robin, continuing where the previous tick stopped) until the
+# frame-budget is used up, which is what is left of 1 / fps after the last rendered frame (reported
+# through 'frameTime'), targets not reached keep their previous frame for one more tick
+#
+# ticks that cannot deform all targets in time drop the subdivision-level by one, after 'recoverTicks'
+# ticks in a row that used less than half of the budget the level is raised again (up to the
+# animation's own), as animation-time follows the clock, late ticks skip frames instead of slowing down
+#
+# as a scene-listener the player drops targets that are detached and stops when the scene is replaced
+# or cleared, frames are reported as deformations (see Scene.notifyShapesDeformed()), never as edits,
+# so indices of the scene follow the animated shapes but nothing is recorded
+#
+class AnimationPlayer(SceneListener):
+
+    fps : int = 60
+    recoverTicks : int = 30
+
+    def __init__(self, scene : Scene, redraw : Callable[[], None], frameTime : Callable[[], float] = lambda : 0.0) -> None:
+        self.scene : Scene = scene
+        self.animation : DeformAnimation | None = None
+        self.level : int = 0
+        self.lateTicks : int = 0
+        self.__redraw__ : Callable[[], None] = redraw
+        self.__frame_time__ : Callable[[], float] = frameTime
+        self.__started__ : float = 0.0
+        self.__cursor__ : int = 0
+        self.__fast_ticks__ : int = 0
+        self.__timer__ : QTimer = QTimer()
+        self.__timer__.setTimerType(Qt.TimerType.PreciseTimer)
+        self.__timer__.timeout.connect(self.__tick__)
+
+    @property
+    def playing(self) -> bool:
+        return self.animation is not None
+
+    @property
+    def budget(self) -> float:
+        return 1.0 / self.fps
+
+    def play(self, animation : DeformAnimation) -> None:
+        self.stop()
+        self.animation = animation
+        self.level = animation.subdivisions
+        self.lateTicks = 0
+        self.__cursor__ = 0
+        self.__fast_ticks__ = 0
+        self.__started__ = time.perf_counter()
+        self.scene.listeners.append(self)
+        self.__timer__.start(round(1000 / self.fps))
+    #
+    # hold the targets where they are (e.g. while frames are rendered from the same animation), with
+    # 'restore' they are given back their geometry from before until resume() (e.g. while the scene is saved)
+    #
+    def pause(self, restore : bool = False) -> None:
+        self.__timer__.stop()
+        if (restore and self.animation is not None):
+            self.__restore__()
+
+    def resume(self) -> None:
+        if (self.animation is not None):
+            self.__timer__.start(round(1000 / self.fps))
+    #
+    # stop playing, with 'restore' the targets are given back their geometry from before
+    #
+    def stop(self, restore : bool = True) -> None:
+        if (self.animation is None):
+            return
+        self.__timer__.stop()
+        if (restore):
+            self.__restore__()
+        self.animation = None
+        if (self in self.scene.listeners):
+            self.scene.listeners.remove(self)
+        self.__redraw__()
+
+    def __tick__(self) -> None:
+        start : float = time.perf_counter()
+        targets : list[DeformTarget] = self.animation.targets
+        if not (len(targets)):
+            self.stop()
+            return
+        amplitude, width, offset = self.animation.parameters(self.animation.time(start - self.__started__))
+        deadline : float = start + self.budget - self.__frame_time__()
+        deformed : list[Shape] = []
+        while (len(deformed) < len(targets)):
+            self.__cursor__ %= len(targets)
+            targets[self.__cursor__].deform(self.level, amplitude, width, offset)
+            deformed.append(targets[self.__cursor__].shape)
+            self.__cursor__ += 1
+            if (time.perf_counter() > deadline):
+                break
+        self.scene.notifyShapesDeformed(deformed)
+
+        if (len(deformed) < len(targets)):
+            self.lateTicks += 1
+            self.__fast_ticks__ = 0
+            self.level = max(self.level - 1, 0)
+        elif (time.perf_counter() - start + self.__frame_time__() < 0.5 * self.budget):
+            self.__fast_ticks__ += 1
+            if (self.__fast_ticks__ >= self.recoverTicks and self.level < self.animation.subdivisions):
+                self.level += 1
+                self.__fast_ticks__ = 0
+        else:
+            self.__fast_ticks__ = 0
+        self.__redraw__()
+
+    def __restore__(self) -> None:
+        self.animation.restore()
+        self.scene.notifyShapesDeformed([target.shape for target in self.animation.targets])
+    #
+    # scene-listener
+    #
+    def shapesDetached(self, shapes : list[Shape]) -> None:
+        detached : set[Shape] = set(shapes)
+        for target in self.animation.targets:
+            if (target.shape in detached):
+                target.restore()
+        self.animation.targets = [target for target in self.animation.targets if not (target.shape in detached)]
+
+    def shapesReplaced(self, previous : list[Shape]) -> None:
+        self.stop()
+
+    def sceneCleared(self) -> None:
+        self.stop(False)
+#
+# render the animation headlessly into a sequence of png-files (frame_0000.png, ...) in 'directory',
+# 'frames' frames at 'fps' (one run through the animation by default), every frame at full subdivision-level
+#
+# 'area' is the part of the scene that is rendered (see RasterExport), the targets are given back their
+# geometry afterwards, returns the written files
+#
+def renderFrames(scene : Scene, animation : DeformAnimation, area : QRectF, width : int, height : int,
+                 directory : os.path, fps : int = 30, frames : int | None = None,
+                 progress : Callable[[int, int], None] | None = None) -> list[os.path]:
+    from Editor.RasterExport import RasterExport
+    count : int = frames if (frames is not None) else max(1, round(animation.duration * fps))
+    files : list[os.path] = []
+    os.makedirs(directory, exist_ok=True)
+    try:
+        for frame in range(count):
+            animation.apply(frame / fps)
+            file : os.path = os.path.join(directory, f"frame_{frame:04d}.png")
+            RasterExport(scene, area, width, height).write(file)
+            files.append(file)
+            if (progress is not None):
+                progress(frame + 1, count)
+    finally:
+        animation.restore()
+        scene.notifyShapesDeformed([target.shape for target in animation.targets])
+    return files
@@ -0,0 +1,191 @@
+from PySide6.QtCore import QPointF, QRectF
+
+from array import array
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import get_context
+from typing import Callable
+
+import os
+import time
+
+from Editor.Shapes.Shape import Shape
+from Editor.Shapes.Aggregate import AggregateShape
+from Editor.Shapes.Primitives import Polygon, CompoundPolygon
+from Editor.DeformWorker import deformOutlines
+from Editor.Scene import Scene
+
+#
+# batch-deform-report class
+#
+# result of BatchDeform.run(), 'vertices' counts the vertices of the deformed shapes
+#
+class BatchDeformReport:
+    def __init__(self, shapes : int, vertices : int, chunks : int, workers : int, seconds : float, cancelled : bool) -> None:
+        self.shapes : int = shapes
+        self.vertices : int = vertices
+        self.chunks : int = chunks
+        self.workers : int = workers
+        self.seconds : float = seconds
+        self.cancelled : bool = cancelled
+
+    def __str__(self) -> str:
+        if (self.cancelled):
+            return f"deformation cancelled after {1000.0 * self.seconds:.0f} ms, the shapes were left as they are"
+        return (f"{self.shapes} shapes deformed into {self.vertices} vertices\n"
+                f"{self.chunks} chunks on {self.workers} processes in {1000.0 * self.seconds:.0f} ms")
+
+#
+# batch-deformation
+#
+# subdivides and deforms many shapes at once (see MultiSubdividePolygon() and DeformPolygon()) on
+# a pool of processes, so the work is spread over all cores instead of running on the ui-thread
+#
+# the outlines are shipped to the workers as raw float64-blocks in chunks of about 'chunkVertices'
+# (resulting) vertices, at most two chunks per worker are in flight, finished chunks are turned back
+# into polygons that keep the returned blocks as their lazily read vertex-data (see Polygon.fromVertexData()),
+# so the main-side never builds a QPointF per vertex
+#
+# batches of less than 'minParallelVertices' vertices are deformed in this process, starting the
+# workers would take longer than the deformation itself
+#
+# progress is reported per finished chunk, cancel() (e.g. from the progress-callback or a dialog while
+# it processes events) stops the batch after the running chunks, the scene is only changed once all
+# chunks are done: the deformed shapes replace theirs in one step (undone at once)
+#
+class BatchDeform:
+
+    chunkVertices : int = 100000
+    minParallelVertices : int = 200000
+
+    def __init__(self, amplitude : float, width : float, offset : float, subdivisions : int = 2,
+                 workers : int | None = None) -> None:
+        self.amplitude : float = amplitude
+        self.width : float = width
+        self.offset : float = offset
+        self.subdivisions : int = subdivisions
+        self.workers : int = workers if (workers is not None) else (os.cpu_count() or 1)
+        self.__cancelled__ : bool = False
+
+    def cancel(self) -> None:
+        self.__cancelled__ = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self.__cancelled__
+    #
+    # deform the attached 'shapes' of the scene, groups, compound-polygons and members of groups are left
+    # as they are, 'progress' is passed the deformed and the total number of shapes
+    #
+    def run(self, scene : Scene, shapes : list[Shape],
+            progress : Callable[[int, int], None] | None = None) -> BatchDeformReport:
+        start : float = time.perf_counter()
+        self.__cancelled__ = False
+        attached : set[Shape] = set(scene.attachedShapes)
+        shapes = [shape for shape in dict.fromkeys(shapes) if (shape in attached and self.deformable(shape))]
+        # outlines have to be fitted to the current bounding-boxes first
+        scene.refresh(shapes)
+        outlines : list[bytes] = []
+        sources : list[Shape] = []
+        for shape in shapes:
+            outline : bytes = self.__outline_data__(shape)
+            if (len(outline)):
+                outlines.append(outline)
+                sources.append(shape)
+
+        chunks : list[tuple[list[bytes], int]] = self.__chunks__(outlines)
+        total_vertices : int = sum(len(outline) // 16 for outline in outlines) << self.subdivisions
+        parallel : bool = self.workers > 1 and total_vertices >= self.minParallelVertices
+        results : list[list[tuple[bytes, tuple[float, float, float, float]]] | None] = [None] * len(chunks)
+        if (parallel):
+            self.__run_parallel__(chunks, results, len(sources), progress)
+        else:
+            self.__run_inline__(chunks, results, len(sources), progress)
+        if (self.__cancelled__):
+            return BatchDeformReport(0, 0, len(chunks), self.workers if (parallel) else 1, time.perf_counter() - start, True)
+
+        replacement : dict[Shape, Polygon] = {}
+        vertices : int = 0
+        deformed = iter(sources)
+        for chunk in results:
+            for data, bounds in chunk:
+                source : Shape = next(deformed)
+                polygon : Polygon = Polygon.fromVertexData(memoryview(data).cast("d"),
+                                                           QRectF(bounds[0], bounds[1], bounds[2] - bounds[0], bounds[3] - bounds[1]))
+                polygon.__fill_color__ = source.__fill_color__
+                polygon.__outline_color__ = source.__outline_color__
+                polygon.__outline_width__ = source.__outline_width__
+                polygon.__show_fill_body__ = source.__show_fill_body__
+                polygon.__z_index__ = source.__z_index__
+                replacement[source] = polygon
+                vertices += len(data) // 16
+        if (len(replacement)):
+            scene.replaceAttached([replacement.get(shape, shape) for shape in scene.attachedShapes])
+        return BatchDeformReport(len(replacement), vertices, len(chunks), self.workers if (parallel) else 1,
+                                 time.perf_counter() - start, False)
+    #
+    # shapes made of a single outline that is not shared with other shapes
+    #
+    @staticmethod
+    def deformable(shape : Shape) -> bool:
+        return not (isinstance(shape, (AggregateShape, CompoundPolygon)) or len(shape.__parent_groups__))
+
+    def __outline_data__(self, shape : Shape) -> bytes:
+        if (isinstance(shape, Polygon) and not (shape.materialized) and shape.__vertex_data__.format == "d"):
+            return shape.__vertex_data__.tobytes()
+        points : list[QPointF] = shape.describeShape().toList()
+        values : array = array("d", bytes(16 * len(points)))
+        values[0::2] = array("d", [point.x() for point in points])
+        values[1::2] = array("d", [point.y() for point in points])
+        return values.tobytes()
+    #
+    # consecutive outlines grouped into chunks, each with the number of outlines before it
+    #
+    def __chunks__(self, outlines : list[bytes]) -> list[tuple[list[bytes], int]]:
+        chunks : list[tuple[list[bytes], int]] = []
+        chunk : list[bytes] = []
+        chunk_vertices : int = 0
+        first : int = 0
+        for index, outline in enumerate(outlines):
+            chunk.append(outline)
+            chunk_vertices += (len(outline) // 16) << self.subdivisions
+            if (chunk_vertices >= self.chunkVertices):
+                chunks.append((chunk, first))
+                chunk, chunk_vertices, first = [], 0, index + 1
+        if (len(chunk)):
+            chunks.append((chunk, first))
+        return chunks
+
+    def __run_inline__(self, chunks : list[tuple[list[bytes], int]], results : list,
+                       total : int, progress : Callable[[int, int], None] | None) -> None:
+        for index, (chunk, first) in enumerate(chunks):
+            if (self.__cancelled__):
+                return
+            results[index] = deformOutlines(chunk, self.subdivisions, self.amplitude, self.width, self.offset)
+            if (progress is not None):
+                progress(first + len(chunk), total)
+
+    def __run_parallel__(self, chunks : list[tuple[list[bytes], int]], results : list,
+                         total : int, progress : Callable[[int, int], None] | None) -> None:
+        # workers are spawned instead of forked, forking a process that runs qt-threads is not safe
+        executor : ProcessPoolExecutor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+        try:
+            pending : dict[Future, int] = {}
+            next_chunk : int = 0
+            done_shapes : int = 0
+            while (next_chunk < len(chunks) or len(pending)):
+                while (next_chunk < len(chunks) and len(pending) < 2 * self.workers):
+                    future : Future = executor.submit(deformOutlines, chunks[next_chunk][0], self.subdivisions,
+                                                      self.amplitude, self.width, self.offset)
+                    pending[future] = next_chunk
+                    next_chunk += 1
+                finished, rest = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index : int = pending.pop(future)
+                    results[index] = future.result()
+                    done_shapes += len(chunks[index][0])
+                if (progress is not None):
+                    progress(done_shapes, total)
+                if (self.__cancelled__):
+                    return
+        finally:
+            executor.shutdown(wait=not (self.__cancelled__), cancel_futures=True)
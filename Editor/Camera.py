@@ -1,5 +1,5 @@
-from PySide6.QtCore import QPointF, QSizeF
-from PySide6.QtGui import QTransform, QMouseEvent, QWheelEvent
+from PySide6.QtCore import QPointF, QSizeF, QRectF
+from PySide6.QtGui import QTransform, QMouseEvent, QWheelEvent, QPolygonF
 from PySide6.QtWidgets import QWidget
 from PySide6.QtCore import Qt
 
@@ -12,30 +12,104 @@ import Utility
 #
 # View.transform must be connected to the corresponding QPainter to be effective
 #
+# the transform and its inverse are cached and only recomputed after 'topLeft', 'zoomFactor'
+# or 'viewportSize' were assigned (they must be assigned, not modified in place), so mapping
+# points costs one matrix-multiplication
+#
 class View:
     def __init__(self, viewportSize : QSizeF, viewportArea : QSizeF, topLeft : QPointF = QPointF(0, 0)) -> None:
-        self.topLeft : QPointF = topLeft
-        self.zoomFactor : float = 1.0
-        self.viewportSize : QSizeF = viewportSize
+        self.__top_left__ : QPointF = QPointF(topLeft)
+        self.__zoom_factor__ : float = 1.0
+        self.__viewport_size__ : QSizeF = QSizeF(viewportSize)
         self.viewportArea : QSizeF = viewportArea
-        self.transform : QTransform = QTransform()
+        self.__transform__ : QTransform = QTransform()
+        self.__inverse__ : QTransform = QTransform()
+        self.__valid__ : bool = False
+
+    @property
+    def topLeft(self) -> QPointF:
+        return self.__top_left__
+
+    @topLeft.setter
+    def topLeft(self, value : QPointF) -> None:
+        self.__top_left__ = QPointF(value)
+        self.__valid__ = False
+
+    @property
+    def zoomFactor(self) -> float:
+        return self.__zoom_factor__
+
+    @zoomFactor.setter
+    def zoomFactor(self, value : float) -> None:
+        self.__zoom_factor__ = value
+        self.__valid__ = False
+
+    @property
+    def viewportSize(self) -> QSizeF:
+        return self.__viewport_size__
+
+    @viewportSize.setter
+    def viewportSize(self, value : QSizeF) -> None:
+        self.__viewport_size__ = QSizeF(value)
+        self.__valid__ = False
+
+    @property
+    def transform(self) -> QTransform:
+        if not (self.__valid__):
+            self.updateTransform()
+        return self.__transform__
+
+    @property
+    def inverse(self) -> QTransform:
+        if not (self.__valid__):
+            self.updateTransform()
+        return self.__inverse__
 
     def zoom(self, zoomFactor : float) -> None:
-        self.viewportArea = Utility.toQSizeF(Utility.toQVector2D(self.viewportSize) * zoomFactor)
+        self.viewportArea = self.viewportSize * zoomFactor
 
     def updateTransform(self) -> None:
-        self.transform.reset()
-        self.transform.translate(0.5 * self.viewportSize.width(), 0.5 * self.viewportSize.height())
-        self.transform.scale(self.zoomFactor, self.zoomFactor)
-        self.transform.translate(-self.topLeft.x(), -self.topLeft.y())
+        self.__transform__.reset()
+        self.__transform__.translate(0.5 * self.viewportSize.width(), 0.5 * self.viewportSize.height())
+        self.__transform__.scale(self.zoomFactor, self.zoomFactor)
+        self.__transform__.translate(-self.topLeft.x(), -self.topLeft.y())
+        self.__inverse__ = self.__transform__.inverted()[0]
+        self.__valid__ = True
 
     def mapToScreen(self, point : QPointF) -> QPointF:
-        self.updateTransform()
         return self.transform.map(point)
     
     def mapToWorld(self, point : QPointF) -> QPointF:
-        self.updateTransform()
-        return self.transform.inverted()[0].map(point)
+        return self.inverse.map(point)
+    #
+    # batch-versions, all points/rectangles are mapped by qt in one call
+    #
+    def mapPointsToScreen(self, points : QPolygonF | list[QPointF]) -> QPolygonF:
+        return self.transform.map(points if isinstance(points, QPolygonF) else QPolygonF(points))
+
+    def mapPointsToWorld(self, points : QPolygonF | list[QPointF]) -> QPolygonF:
+        return self.inverse.map(points if isinstance(points, QPolygonF) else QPolygonF(points))
+
+    def mapRectsToScreen(self, rects : list[QRectF]) -> list[QRectF]:
+        return __map_rects__(self.transform, rects)
+
+    def mapRectsToWorld(self, rects : list[QRectF]) -> list[QRectF]:
+        return __map_rects__(self.inverse, rects)
+    #
+    # world-area currently shown in the viewport (e.g. for culling or exporting what is visible)
+    #
+    def visibleArea(self) -> QRectF:
+        return self.inverse.mapRect(QRectF(QPointF(0.0, 0.0), self.viewportSize))
+#
+# the view only translates and scales, so mapping both corners of every rectangle is enough
+#
+def __map_rects__(transform : QTransform, rects : list[QRectF]) -> list[QRectF]:
+    corners : QPolygonF = QPolygonF()
+    for rect in rects:
+        corners.append(rect.topLeft())
+        corners.append(rect.bottomRight())
+    mapped : QPolygonF = transform.map(corners)
+    return [QRectF(mapped.at(i), mapped.at(i + 1)).normalized() for i in range(0, mapped.size(), 2)]
 
 from Editor.CanvasComponent import CanvasComponent
 #
@@ -44,6 +118,10 @@ from Editor.CanvasComponent import CanvasComponent
 # stores information and logic about viewing the canvas through a view
 #
 class Camera(CanvasComponent):
+
+    pickRadius : float = 3.0 # distance in screen-pixels within which a click still hits a shape's outline
+    snapRadius : float = 8.0 # distance in screen-pixels within which a dragged point snaps to other geometry
+
     def __init__(self, parent : QWidget, viewportSize : QSizeF) -> None:
         super().__init__()
         self.view : View = View(viewportSize, viewportSize)
@@ -57,9 +135,17 @@ class Camera(CanvasComponent):
         super().disable()
         self.dragging = False 
 
+    # pick-radius converted to world-units for the current zoom-level
+    def pickTolerance(self) -> float:
+        return Camera.pickRadius / self.view.zoomFactor
+
+    # snap-radius converted to world-units for the current zoom-level
+    def snapTolerance(self) -> float:
+        return Camera.snapRadius / self.view.zoomFactor
+
     def mousePressEvent(self, event : QMouseEvent) -> None:
         if (self.enabled and not self.active):
-            self.anchorPoint = Utility.toQPointF(event.pos())
+            self.anchorPoint = QPointF(event.pos())
             self.viewAnchorPoint = self.view.topLeft
             self.dragging = True
             self.parent.setCursor(Qt.CursorShape.SizeAllCursor)
@@ -74,7 +160,8 @@ class Camera(CanvasComponent):
     def mouseMoveEvent(self, event : QMouseEvent) -> None:
         if (self.enabled and self.active):
             if (self.dragging):
-                self.view.topLeft = self.viewAnchorPoint + self.view.mapToWorld(self.anchorPoint) - self.view.mapToWorld(Utility.toQPointF(event.pos()))
+                points : QPolygonF = self.view.mapPointsToWorld([self.anchorPoint, QPointF(event.pos())])
+                self.view.topLeft = self.viewAnchorPoint + points.at(0) - points.at(1)
 
     def wheelEvent(self, event : QWheelEvent) -> None:
         if (self.enabled and self.active):
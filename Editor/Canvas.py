@@ -6,20 +6,40 @@ from PySide6.QtGui import (
     QColor,     QPaintEvent,    QMouseEvent,
     QCursor,    QWheelEvent
 )
-from PySide6.QtCore import QPointF, QSize, QPoint, QSizeF
+from PySide6.QtCore import QPointF, QSize, QPoint, QSizeF, QRectF, QRect
 from PySide6.QtCore import Qt
 #
-# import all editor-modules
+# import all editor-modules needed to show the first frame
 #
-from Editor.Camera import Camera
+from Editor.Shapes.Shape import Shape
+from Editor.Shapes.Aggregate import AggregateShape
+from Editor.Shapes.Instance import InstanceShape
+from Editor.Camera import Camera, View
 from Editor.Scene import Scene
-from Editor.NewShape import NewShape
 from Editor.EditShape import EditShape
-from Editor.GroupShapes import GroupShapes
 from Editor.CanvasComponent import CanvasComponent
+from Editor.History import History
+from Editor.Snapping import Snapping
+from Editor.RenderQuality import RenderQuality, QualityController
+from Editor.StartupProfiler import startupProfiler
+#
+# modules only needed once the user asks for them (files, exports, autosave, async rendering,
+# creating and grouping shapes) are imported where they are used, to keep the startup short
+#
+from typing import Callable, TYPE_CHECKING
+if (TYPE_CHECKING):
+    from Editor.NewShape import NewShape
+    from Editor.GroupShapes import GroupShapes
+    from Editor.SVGWriter import SVGOptimization, SVGOptimizationReport
+    from Editor.SVGReader import ProgressCallback
+    from Editor.Journal import Journal
+    from Editor.RenderThread import RenderThread, RenderStats
+    from Editor.Flatten import FlattenReport
+    from Editor.Animation import AnimationPlayer, DeformAnimation
+    from Editor.BatchDeform import BatchDeform, BatchDeformReport
 
 import os
-import xml.etree.ElementTree as XMLTree
+import time
 
 #
 # editorstate enum
@@ -40,49 +60,241 @@ class EditorState(Enum):
 # here all other editor-functionality bundles together into one canvas-widget
 #
 class Canvas(QWidget):
+
+    scrollTolerance : float = 1e-3 # sub-pixel pan-distance that is still scrolled by whole pixels
+
     def __init__(self, parent : QWidget, dimensions : QSize) -> None:
         super().__init__(parent)
         self.setMinimumSize(dimensions)
 
         self.image : QImage = QImage(dimensions, QImage.Format_RGB32)
+        # (scene-revision, zoom, camera-position, quality-key) the image was last rendered with, None if it can't be reused
+        self.__frame__ : tuple[int, float, QPointF, tuple] | None = None
+        # asynchronous rendering, None while the scene is rendered in paintEvent() directly
+        self.renderThread : "RenderThread | None" = None
+        self.__submitted_key__ : tuple | None = None
+        # draft-quality frames during interactions, refined once input is idle
+        self.quality : QualityController = QualityController(self.update)
 
         self.state : EditorState = EditorState.EDIT
 
         # components of the editor-logic
         self.scene : Scene = Scene()
+        # snapping of dragged points to the geometry of the scene
+        self.snapping : Snapping = Snapping(self.scene)
         
         self.camera : Camera = Camera(self, dimensions)
-        self.newShape : NewShape = NewShape(self, self.camera, self.scene)
-        self.editShape : EditShape = EditShape(self, self.camera, self.scene)
-        self.groupShapes : GroupShapes = GroupShapes(self, self.camera, self.scene)
+        self.editShape : EditShape = EditShape(self, self.camera, self.scene, self.snapping)
+        # created on first use (see the newShape- and groupShapes-properties)
+        self.__new_shape__ : "NewShape | None" = None
+        self.__group_shapes__ : "GroupShapes | None" = None
+        # undo/redo of all edits of the scene
+        self.history : History = History(self.scene)
+        # incremental autosave, None while disabled
+        self.journal : "Journal | None" = None
+        # mark shapes that overlap others (see Editor/Overlaps.py)
+        self.highlightOverlaps : bool = False
+        # plays deformation-animations, created on first use (see Editor/Animation.py)
+        self.__animation_player__ : "AnimationPlayer | None" = None
 
+        # components created so far, all input-events are passed to these
         self.components : list[CanvasComponent] = [ self.camera,
-                                                    self.newShape,
-                                                    self.editShape,
-                                                    self.groupShapes]
+                                                    self.editShape]
 
         self.setState(EditorState.EDIT)
+    #
+    # components that are not needed before the user first adds or groups shapes
+    #
+    @property
+    def newShape(self) -> "NewShape":
+        if (self.__new_shape__ is None):
+            from Editor.NewShape import NewShape
+            self.__new_shape__ = NewShape(self, self.camera, self.scene, self.snapping)
+            self.__new_shape__.disable()
+            self.components.append(self.__new_shape__)
+        return self.__new_shape__
+
+    @property
+    def groupShapes(self) -> "GroupShapes":
+        if (self.__group_shapes__ is None):
+            from Editor.GroupShapes import GroupShapes
+            self.__group_shapes__ = GroupShapes(self, self.camera, self.scene)
+            self.__group_shapes__.disable()
+            self.components.append(self.__group_shapes__)
+        return self.__group_shapes__
 
     def paintEvent(self, event : QPaintEvent) -> None:
+        quality : RenderQuality = self.quality.quality()
+        if (self.renderThread is not None):
+            self.__present_frame__(quality)
+            return
+        start : float = time.perf_counter()
+        self.scene.update(self.camera.view.visibleArea())
+        strips : list[QRect] | None = self.__scroll_frame__(quality)
+
         painter : QPainter = QPainter(self)
         scene_painter : QPainter = QPainter(self.image)
-        scene_painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+        scene_painter.setRenderHint(QPainter.RenderHint.Antialiasing, quality.antialiasing)
 
-        self.camera.view.updateTransform()
         scene_painter.setTransform(self.camera.view.transform)
 
-        self.scene.update()    
-        self.scene.draw(scene_painter, self.image)
+        if (strips is None):
+            self.scene.draw(scene_painter, self.image, quality)
+        else:
+            self.__draw_strips__(scene_painter, strips, quality)
+        self.__frame__ = (self.scene.revision, self.camera.view.zoomFactor, QPointF(self.camera.view.topLeft), quality.key)
     
         self.editShape.draw(scene_painter)
+        if (self.__group_shapes__ is not None):
+            self.__group_shapes__.draw(scene_painter)
+        if (self.highlightOverlaps):
+            self.__draw_overlaps__(scene_painter)
+        self.snapping.drawTarget(scene_painter)
 
         painter.drawImage(0, 0, self.image)
 
         scene_painter.end()
         painter.end()
+        self.quality.frameRendered(quality, time.perf_counter() - start)
+        startupProfiler.frameRendered()
+
+    #
+    # scroll-blit panning
+    #
+    # while the camera is moved around, the last frame is still valid apart from being shifted by the
+    # panned distance, so it is moved in place and only the newly exposed strips along the edges have
+    # to be rendered (the cost of a frame then depends on the panned edge-area, not the whole viewport)
+    #
+    # this is only done in the camera-state (no editor-decorations are drawn into the frame there),
+    # zooming, edits of the scene, sub-pixel pan-distances and a change of the quality (between draft- and
+    # full quality or of the draft's level of detail) redraw the whole frame
+    #
+    # returns the exposed strips in screen-coordinates, or None if the whole frame has to be redrawn
+    #
+    def __scroll_frame__(self, quality : RenderQuality) -> list[QRect] | None:
+        if (self.state != EditorState.SCROLL_CAMERA or self.__frame__ is None):
+            return None
+        revision, zoom, top_left, quality_key = self.__frame__
+        if (revision != self.scene.revision or zoom != self.camera.view.zoomFactor or quality_key != quality.key):
+            return None
+        delta : QPointF = (top_left - self.camera.view.topLeft) * zoom
+        dx : int = round(delta.x())
+        dy : int = round(delta.y())
+        width : int = self.image.width()
+        height : int = self.image.height()
+        if (abs(delta.x() - dx) > Canvas.scrollTolerance or abs(delta.y() - dy) > Canvas.scrollTolerance or
+            abs(dx) >= width or abs(dy) >= height):
+            return None
+        scrollImage(self.image, dx, dy)
+        strips : list[QRect] = []
+        if (dy != 0):
+            strips.append(QRect(0, 0 if (dy > 0) else height + dy, width, abs(dy)))
+        if (dx != 0):
+            # rows of the horizontal strip are already covered above
+            top : int = max(dy, 0)
+            strips.append(QRect(0 if (dx > 0) else width + dx, top, abs(dx), height - abs(dy)))
+        return strips
+
+    def __draw_strips__(self, painter : QPainter, strips : list[QRect], quality : RenderQuality) -> None:
+        # world-areas are grown by a pixel, antialiased edges of shapes just outside still reach into a strip
+        pixel : float = 1.0 / self.camera.view.zoomFactor
+        areas : list[QRectF] = self.camera.view.mapRectsToWorld([QRectF(strip) for strip in strips])
+        for strip, area in zip(strips, areas):
+            painter.save()
+            painter.resetTransform()
+            painter.setClipRect(strip)
+            painter.fillRect(strip, self.scene.backgroundColor)
+            painter.setTransform(self.camera.view.transform)
+            self.scene.drawArea(painter, area.adjusted(-pixel, -pixel, pixel, pixel), quality)
+            painter.restore()
+
+    #
+    # asynchronous rendering (see Editor/RenderThread.py)
+    #
+    # paintEvent() then only submits a snapshot of the visible shapes whenever scene or view changed
+    # and presents the newest frame the render-thread completed, editor-decorations are drawn on top
+    # of it directly, as they have to follow the input without delay
+    #
+    def setAsyncRendering(self, enabled : bool) -> None:
+        if (enabled and self.renderThread is None):
+            from Editor.RenderThread import RenderThread
+            self.renderThread = RenderThread(self.image.size())
+            self.renderThread.frameReady.connect(self.update)
+            self.renderThread.start()
+        elif (not enabled and self.renderThread is not None):
+            self.renderThread.stop()
+            self.renderThread.frameReady.disconnect(self.update)
+            self.renderThread = None
+        self.__submitted_key__ = None
+        self.__frame__ = None
+        self.update()
+
+    @property
+    def renderStats(self) -> "RenderStats | None":
+        return self.renderThread.stats if (self.renderThread is not None) else None
+
+    def __present_frame__(self, quality : RenderQuality) -> None:
+        from Editor.RenderThread import snapshotScene
+        view : View = self.camera.view
+        self.scene.update(view.visibleArea())
+        key : tuple = (self.scene.revision, view.zoomFactor, view.topLeft.x(), view.topLeft.y()) + quality.key
+        if (key != self.__submitted_key__):
+            self.renderThread.submit(key, snapshotScene(self.scene, view.visibleArea(), quality, view.zoomFactor), view.transform,
+                                     self.scene.backgroundColor, self.image.size(), quality.antialiasing)
+            self.__submitted_key__ = key
+
+        painter : QPainter = QPainter(self)
+        frame, frame_key, seconds = self.renderThread.present()
+        # the level of detail follows the frames of the render-thread (with the quality they were rendered with)
+        if (seconds is not None):
+            self.quality.frameRendered(RenderQuality(*frame_key[4:]), seconds)
+        if (frame is not None):
+            painter.drawImage(0, 0, frame)
+        else:
+            painter.fillRect(self.rect(), self.scene.backgroundColor)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+        painter.setTransform(view.transform)
+        for shape in self.scene.attachedShapes:
+            shape.drawOverlay(painter)
+        self.editShape.draw(painter)
+        if (self.__group_shapes__ is not None):
+            self.__group_shapes__.draw(painter)
+        if (self.highlightOverlaps):
+            self.__draw_overlaps__(painter)
+        self.snapping.drawTarget(painter)
+        painter.end()
+        startupProfiler.frameRendered()
+
+    def setSnapping(self, enabled : bool) -> None:
+        self.snapping.enabled = enabled
+
+    def setOverlapHighlighting(self, enabled : bool) -> None:
+        self.highlightOverlaps = enabled
+        self.__frame__ = None
+        self.update()
+    #
+    # mark all shapes overlapping others (exactly), a dragged shape is queried again on every frame,
+    # a dragged multi-selection (which only moves its proxy until it is dropped) by the proxy's bounds
+    #
+    def __draw_overlaps__(self, painter : QPainter) -> None:
+        from Editor.Overlaps import drawOverlaps
+        dragged : Shape | None = self.editShape.shape if (self.editShape.dragging) else None
+        if (dragged is not None and not self.editShape.multiSelection):
+            self.scene.overlaps.moved([dragged])
+        shapes : set[Shape] = self.scene.overlaps.overlappingShapes(True)
+        if (dragged is not None and self.editShape.multiSelection):
+            box : QRectF = dragged.boundingBox.normalized()
+            hits : list[Shape] = self.scene.overlaps.overlapping((box.left(), box.top(), box.right(), box.bottom()),
+                                                                set(self.editShape.selection))
+            if (len(hits)):
+                shapes.update(hits)
+                shapes.add(dragged)
+        drawOverlaps(painter, shapes)
 
     def setState(self, state : EditorState) -> None:
         self.state = state
+        # the last frame may contain decorations of the previous state
+        self.__frame__ = None
         for component in self.components:
             component.disable()
         if (self.state == EditorState.NEW):
@@ -97,6 +309,7 @@ class Canvas(QWidget):
     def mousePressEvent(self, event : QMouseEvent) -> None:
         for component in self.components:
             component.mousePressEvent(event)
+        self.__track_interaction__()
         self.update()
 
     def mouseReleaseEvent(self, event : QMouseEvent) -> None:
@@ -107,12 +320,109 @@ class Canvas(QWidget):
     def mouseMoveEvent(self, event : QMouseEvent) -> None:
         for component in self.components:
             component.mouseMoveEvent(event)
+        self.__track_interaction__()
         self.update()
 
     def wheelEvent(self, event : QWheelEvent) -> None:
         for component in self.components:
             component.wheelEvent(event)
+        if (self.camera.enabled):
+            self.quality.interact()
+        self.update()
+    #
+    # panning the camera, dragging a shape and drawing a new one are rendered with draft-quality
+    #
+    def __track_interaction__(self) -> None:
+        if (self.camera.dragging or self.editShape.dragging or
+            (self.__new_shape__ is not None and self.__new_shape__.dragging)):
+            self.quality.interact()
+
+    #
+    # undo/redo the last edit, components are reset as their selections could refer to reverted shapes
+    #
+    def undo(self) -> None:
+        if (self.history.undo()):
+            self.setState(self.state)
+            self.update()
+
+    def redo(self) -> None:
+        if (self.history.redo()):
+            self.setState(self.state)
+            self.update()
+
+    #
+    # merge shapes of the same style (see Scene.flatten()), the selection may refer to merged shapes
+    #
+    def flatten(self) -> "FlattenReport":
+        report : FlattenReport = self.scene.flatten()
+        self.setState(self.state)
         self.update()
+        return report
+
+    #
+    # subdivide and deform every selected shape on a pool of processes (see Editor/BatchDeform.py), the
+    # selection is left empty as the deformed shapes replace the selected ones
+    #
+    def deformSelection(self, deform : "BatchDeform", progress : Callable[[int, int], None] | None = None) -> "BatchDeformReport":
+        report : BatchDeformReport = deform.run(self.scene, list(self.editShape.selection), progress)
+        self.setState(self.state)
+        self.update()
+        return report
+
+    #
+    # place 'count' instances of every selected shape next to it, sharing its geometry (see Scene.repeatAsInstances()),
+    # returns how many instances were added
+    #
+    def repeatSelection(self, count : int) -> int:
+        shapes : list[Shape] = list(self.editShape.selection)
+        gap : float = 0.1 * max([shape.boundingBox.normalized().width() for shape in shapes], default=0.0)
+        instances : list[InstanceShape] = self.scene.repeatAsInstances(shapes, count, gap)
+        self.setState(self.state)
+        self.update()
+        return len(instances)
+
+    #
+    # play an animation on the scene (replacing the one playing), stopping it gives the animated
+    # shapes back their geometry from before
+    #
+    def playAnimation(self, animation : "DeformAnimation") -> None:
+        if (self.__animation_player__ is None):
+            from Editor.Animation import AnimationPlayer
+            self.__animation_player__ = AnimationPlayer(self.scene, self.update, lambda : self.quality.lastFrameTime)
+        self.__animation_player__.play(animation)
+
+    def stopAnimation(self) -> None:
+        if (self.__animation_player__ is not None):
+            self.__animation_player__.stop()
+
+    @property
+    def animation(self) -> "DeformAnimation | None":
+        return None if (self.__animation_player__ is None) else self.__animation_player__.animation
+    #
+    # render one run through the playing animation into png-frames of the currently visible area
+    # (see renderFrames()), playback goes on from where it was afterwards
+    #
+    def exportAnimation(self, directory : os.path, width : int, fps : int = 30,
+                        progress : Callable[[int, int], None] | None = None) -> list[os.path]:
+        from Editor.Animation import renderFrames
+        animation : "DeformAnimation" = self.animation
+        area : QRectF = self.camera.view.visibleArea()
+        height : int = max(1, round(width * area.height() / area.width()))
+        self.__animation_player__.pause()
+        try:
+            return renderFrames(self.scene, animation, area, width, height, directory, fps, progress=progress)
+        finally:
+            self.__animation_player__.resume()
+    #
+    # give the animated shapes back their geometry at rest until the animation is resumed
+    #
+    def __hold_animation__(self) -> None:
+        if (self.__animation_player__ is not None):
+            self.__animation_player__.pause(restore=True)
+
+    def __resume_animation__(self) -> None:
+        if (self.__animation_player__ is not None):
+            self.__animation_player__.resume()
 
     def clear(self, color : QColor = QColor(255, 255, 255)) -> None:
         self.scene.clear()
@@ -120,13 +430,71 @@ class Canvas(QWidget):
         self.camera.zoomFactor = 1.0
         self.update()
 
+    #
+    # save/open the scene in the native binary scene-format (see Editor/SceneFile.py)
+    #
+    def saveScene(self, file : os.path) -> None:
+        from Editor.SceneFile import writeSceneFile
+        # animated shapes are saved at rest, not with the frame they are showing
+        self.__hold_animation__()
+        try:
+            writeSceneFile(self.scene.attachedShapes, file)
+        finally:
+            self.__resume_animation__()
+
+    def openScene(self, file : os.path) -> None:
+        from Editor.SceneFile import readSceneFile
+        shapes : list = readSceneFile(file)
+        self.clear()
+        self.scene.attach_objects(shapes)
+        self.update()
+
+    #
+    # autosave every edit into a journal-directory (see Editor/Journal.py)
+    #
+    # with 'recover' the scene autosaved in that directory replaces the current one, otherwise the
+    # current scene is written as a new checkpoint over whatever the directory contained
+    #
+    def enableAutosave(self, directory : os.path, recover : bool) -> None:
+        from Editor.Journal import Journal
+        self.disableAutosave()
+        journal : Journal = Journal(self.scene, directory)
+        if (recover and Journal.hasData(directory)):
+            shapes : list = journal.recover()
+            self.clear()
+            self.scene.attach_objects(shapes)
+        else:
+            self.__hold_animation__()
+            try:
+                journal.checkpoint()
+            finally:
+                self.__resume_animation__()
+        journal.start()
+        self.journal = journal
+        self.update()
+
+    def disableAutosave(self) -> None:
+        if (self.journal is not None):
+            self.journal.close()
+            self.journal = None
+
     #
     # export a scene to an XML-SVG-file
     #
     # https://de.wikipedia.org/wiki/Scalable_Vector_Graphics
     #
+    # the document is streamed shape by shape through an SVGWriter, so memory-usage stays
+    # flat no matter how big the scene is ('.svgz'-files are written gzip-compressed)
+    #
+    # the text of every shape is kept for the next export (see SVGWriter.writeShape()), which only
+    # serializes the shapes edited in between and copies the text of all others
     #
-    def exportSceneToSVG(self, file : os.path, title : str, description : str) -> None:
+    # with an 'optimization' the output is shrunk while writing (see SVGOptimization), the
+    # returned report tells how much that saved
+    #
+    def exportSceneToSVG(self, file : os.path, title : str, description : str, indent : bool = True,
+                         optimization : "SVGOptimization | None" = None) -> "SVGOptimizationReport":
+        from Editor.SVGWriter import SVGWriter
         # required attributes for xml-tree to qualify as svg
         root_svg_attributes : dict[str,str] = { "xmlns" : "http://www.w3.org/2000/svg",
                                                 "xmlns:xlink" : "http://www.w3.org/1999/xlink",
@@ -136,25 +504,68 @@ class Canvas(QWidget):
                                                 "height" : f"{self.image.size().height()}mm",
                                                 "viewBox" : f"{self.camera.view.topLeft.x()} {self.camera.view.topLeft.y()} {self.camera.view.viewportArea.width()} {self.camera.view.viewportArea.height()}"}
         
-        root_svg : XMLTree.Element = XMLTree.Element("svg", root_svg_attributes)
-        # title and description
-        title_tag : XMLTree.Element = XMLTree.Element("title")
-        descr_tag : XMLTree.Element = XMLTree.Element("desc")
-        title_tag.text = title
-        descr_tag.text = description
-
-        root_svg.append(title_tag)
-        root_svg.append(descr_tag)
-        # add info about all shapes
-        for shape in self.scene.attachedShapes:
-            root_svg.append(shape.toSVG())
-        # print out tree
-        tree : XMLTree.ElementTree = XMLTree.ElementTree(root_svg)
-        XMLTree.indent(tree, space="\t", level=0)
-        tree.write(file, encoding="utf-8", xml_declaration=True)
+        # shapes are fitted to their bounding-boxes first, so no text is kept for outdated vertices
+        self.scene.update()
+        with SVGWriter.open(file, indent, optimization) as writer:
+            # title and description
+            writer.writeHeader(root_svg_attributes, title, description)
+            if (optimization is not None and optimization.styleClasses):
+                writer.writeStyleSheet(self.__shared_styles__())
+            # add info about all shapes, unchanged ones reuse the text of the previous export
+            writer.writeShapes(self.scene.attachedShapes)
+            writer.writeFooter()
+        return writer.report
+    #
+    # export the currently visible area of the scene as png of any size (rendered band by band,
+    # so even poster-sizes never need a full-size image in memory), 'height' follows the aspect-ratio if omitted
+    #
+    def exportSceneToPNG(self, file : os.path, width : int, height : int | None = None,
+                         progress : Callable[[int, int], None] | None = None) -> None:
+        from Editor.RasterExport import RasterExport
+        area : QRectF = self.camera.view.visibleArea()
+        if (height is None):
+            height = max(1, round(width * area.height() / area.width()))
+        RasterExport(self.scene, area, width, height).write(file, progress)
+    #
+    # inline-styles used by more than one shape (styles used once are shorter written inline)
+    #
+    def __shared_styles__(self) -> list[str]:
+        counts : dict[str, int] = {}
+        visited : set[Shape] = set()
+        stack : list[Shape] = list(self.scene.attachedShapes)
+        while (len(stack)):
+            shape : Shape = stack.pop()
+            if (isinstance(shape, AggregateShape)):
+                stack.extend(shape.children)
+            elif (isinstance(shape, InstanceShape) and isinstance(shape.master, AggregateShape)):
+                # the members are written once into the symbol of the master
+                if not (shape.master in visited):
+                    visited.add(shape.master)
+                    stack.append(shape.master)
+            else:
+                style : str = shape.svgStyle()
+                counts[style] = counts.get(style, 0) + 1
+        return [style for style, count in counts.items() if count > 1]
     #
     # import a scene / a set of shapes using an XML-SVG-file (only supported shapes will be parsed)
     # parameter 'scene' will be mutated (rather than return-value bc Canvas-Scene-object should not change)
     #
-    def importShapesFromSVG(scene : Scene, file : os.path) -> None:
-        pass
\ No newline at end of file
+    # the file is parsed incrementally and all shapes are attached to the scene in one go at the end
+    #
+    @staticmethod
+    def importShapesFromSVG(scene : Scene, file : os.path, progress : "ProgressCallback | None" = None) -> None:
+        from Editor.SVGReader import readShapesFromSVG
+        scene.attach_objects(readShapesFromSVG(file, progress))
+#
+# shift the pixels of an image in place by (dx, dy) whole pixels
+#
+# this is one move of the whole pixel-buffer by the corresponding byte-offset, pixels that wrap
+# around into the neighbouring row only end up in the exposed columns, which are redrawn anyway
+#
+def scrollImage(image : QImage, dx : int, dy : int) -> None:
+    bits : memoryview = image.bits()
+    offset : int = dy * image.bytesPerLine() + dx * (image.depth() // 8)
+    if (offset > 0):
+        bits[offset:] = bits[:len(bits) - offset]
+    elif (offset < 0):
+        bits[:offset] = bits[-offset:]
@@ -0,0 +1,41 @@
+from array import array
+from math import sin, radians, pi
+#
+# deformation-kernel of the batch-deformation (see Editor/BatchDeform.py)
+#
+# runs in the worker-processes, so it only depends on the standard-library (a worker never has to
+# import qt) and only passes raw vertex-data: outlines come in and go out as flat x/y-float64-blocks
+#
+# the arithmetic is the one of MultiSubdividePolygon() and DeformPolygon(), so the results are the same
+#
+
+#
+# subdivide every outline 'subdivisions' times and deform it along the sine-wave, returns every
+# deformed outline together with its bounds (left, top, right, bottom)
+#
+def deformOutlines(outlines : list[bytes], subdivisions : int, amplitude : float, width : float,
+                   offset : float) -> list[tuple[bytes, tuple[float, float, float, float]]]:
+    res : list[tuple[bytes, tuple[float, float, float, float]]] = []
+    for outline in outlines:
+        values : array = array("d")
+        values.frombytes(outline)
+        xs : list[float] = values[0::2].tolist()
+        ys : list[float] = values[1::2].tolist()
+        for n in range(subdivisions):
+            xs = __subdivide__(xs)
+            ys = __subdivide__(ys)
+        # DeformPolygon() takes the whole argument of the sine in degrees
+        ys = [y + amplitude * sin(radians(2 * pi * width * x + offset)) for x, y in zip(xs, ys)]
+        result : array = array("d", bytes(16 * len(xs)))
+        result[0::2] = array("d", xs)
+        result[1::2] = array("d", ys)
+        res.append((result.tobytes(), (min(xs), min(ys), max(xs), max(ys))))
+    return res
+#
+# one coordinate of an outline subdivided once, every vertex is followed by the center of its side
+#
+def __subdivide__(values : list[float]) -> list[float]:
+    res : list[float] = [0.0] * (2 * len(values))
+    res[0::2] = values
+    res[1::2] = [value + 0.5 * (next_value - value) for value, next_value in zip(values, values[1:] + values[:1])]
+    return res
@@ -1,15 +1,18 @@
 
 from PySide6.QtWidgets import QWidget, QDialog
-from PySide6.QtGui import QColor, QMouseEvent, QPainter, QPen
+from PySide6.QtGui import QColor, QMouseEvent, QPainter, QPen, QTransform
 from PySide6.QtCore import QPointF, QSizeF, QRectF
+from PySide6.QtCore import Qt
 
-from Editor.Shapes.Shape import Shape
+from Editor.Shapes.Shape import Shape, findBoundingBoxShapes
 from Editor.Scene import Scene 
 from Editor.Camera import Camera
+from Editor.Snapping import Snapping, SnapTarget
 
 from enum import Enum
 
 import Utility
+from VectorMath import Box
 #
 # edit-shape-dialog class
 #
@@ -21,16 +24,19 @@ class EditShapeDialog(QDialog):
 #
 # click-area for handling translate-edit-operations
 #
+# the corners of the moved bounding-box snap to the geometry of the scene, the closest snap wins
+#
 class TranslateArea:
-    def __init__(self, camera : Camera):
+    def __init__(self, camera : Camera, snapping : Snapping):
         self.camera : Camera = camera
+        self.snapping : Snapping = snapping
         self.area : QRectF = QRectF()
         self.clicked : bool = False
         self.anchorPoint : QPointF = QPointF()
         self.shapeAnchorPoint  : QPointF = QPointF()
 
     def mousePressEvent(self, event : QMouseEvent, shape : Shape) -> None:
-        mouseClickPoint : QPointF = self.camera.view.mapToWorld(Utility.toQPointF(event.pos()))
+        mouseClickPoint : QPointF = self.camera.view.mapToWorld(QPointF(event.pos()))
         if (Utility.PointInRect(mouseClickPoint, self.area)):
             self.clicked = True
             self.anchorPoint = mouseClickPoint
@@ -39,10 +45,18 @@ class TranslateArea:
     def mouseReleaseEvent(self, event : QMouseEvent) -> None:
         self.clicked = False
 
-    def mouseMoveEvent(self, event : QMouseEvent, shape : Shape) -> None:
-        delta : QPointF = self.camera.view.mapToWorld(Utility.toQPointF(event.pos())) - self.anchorPoint
+    def mouseMoveEvent(self, event : QMouseEvent, shape : Shape, exclude : set[Shape]) -> None:
+        delta : QPointF = self.camera.view.mapToWorld(QPointF(event.pos())) - self.anchorPoint
         shape.moveTo(self.shapeAnchorPoint) # move to anchor point
         shape.translate(delta) # move about delta
+        if not (self.snapping.active(event)):
+            self.snapping.clearTarget()
+            return
+        box : QRectF = shape.boundingBox.normalized()
+        offset : QPointF | None = self.snapping.snapOffset([box.topLeft(), box.topRight(), box.bottomRight(), box.bottomLeft()],
+                                                           self.camera.snapTolerance(), exclude)
+        if (offset is not None):
+            shape.translate(offset)
 #
 # enum to describe what corner a ScaleArea acts upon
 #
@@ -54,9 +68,12 @@ class ScaleAreaMode(Enum):
 #
 # click-area for handling scale-edit-operations
 #
+# the dragged corner snaps to the geometry of the scene
+#
 class ScaleArea:
-    def __init__(self, camera : Camera, mode : ScaleAreaMode):
+    def __init__(self, camera : Camera, snapping : Snapping, mode : ScaleAreaMode):
         self.camera : Camera = camera
+        self.snapping : Snapping = snapping
         self.area : QRectF = QRectF()
         self.clicked : bool = False
         self.anchorPoint : QPointF = QPointF()
@@ -64,7 +81,7 @@ class ScaleArea:
         self.mode : ScaleAreaMode = mode
 
     def mousePressEvent(self, event : QMouseEvent, shape : Shape) -> None:
-        mouseClickPoint : QPointF = self.camera.view.mapToWorld(Utility.toQPointF(event.pos()))
+        mouseClickPoint : QPointF = self.camera.view.mapToWorld(QPointF(event.pos()))
         if (Utility.PointInRect(mouseClickPoint, self.area)):
             self.clicked = True
             self.anchorPoint = mouseClickPoint
@@ -80,8 +97,14 @@ class ScaleArea:
     def mouseReleaseEvent(self, event : QMouseEvent) -> None:
         self.clicked = False
 
-    def mouseMoveEvent(self, event : QMouseEvent, shape : Shape) -> None:
-        delta : QPointF = self.camera.view.mapToWorld(Utility.toQPointF(event.pos())) - self.anchorPoint
+    def mouseMoveEvent(self, event : QMouseEvent, shape : Shape, exclude : set[Shape]) -> None:
+        delta : QPointF = self.camera.view.mapToWorld(QPointF(event.pos())) - self.anchorPoint
+        if (self.snapping.active(event)):
+            target : SnapTarget | None = self.snapping.snap(self.shapeAnchorPoint + delta, self.camera.snapTolerance(), exclude)
+            if (target is not None):
+                delta = target.point - self.shapeAnchorPoint
+        else:
+            self.snapping.clearTarget()
         if (self.mode == ScaleAreaMode.TOPLEFT):
             shape.topLeft = self.shapeAnchorPoint + delta
         elif (self.mode == ScaleAreaMode.TOPRIGHT):
@@ -91,91 +114,198 @@ class ScaleArea:
         elif (self.mode == ScaleAreaMode.BOTTOMRIGHT):
             shape.bottomRight = self.shapeAnchorPoint + delta
         
+#
+# stand-in shape for a selection of multiple shapes
+#
+# while dragging, the edit-areas only act on the bounding-box of this proxy (which is drawn instead
+# of regenerating every selected shape on each mouse-move), the selected shapes are transformed
+# all at once when the drag ends
+#
+class SelectionProxy(Shape):
+    def __init__(self, shapes : list[Shape]) -> None:
+        super().__init__(findBoundingBoxShapes(shapes))
+        self.__show_bounding_box__ = True
+
+    def update(self) -> None:
+        pass
+    #
+    # affine transformation that maps the bounding-box 'origin' onto the current bounding-box of the proxy
+    # (bounding-boxes dragged past their opposite corner result in a mirroring transformation)
+    #
+    def transformFrom(self, origin : QRectF) -> QTransform:
+        width : float = origin.width() if (origin.width() != 0.0) else 0.01
+        height : float = origin.height() if (origin.height() != 0.0) else 0.01
+        transform : QTransform = QTransform()
+        transform.translate(self.topLeft.x(), self.topLeft.y())
+        transform.scale(self.size.width() / width, self.size.height() / height)
+        transform.translate(-origin.topLeft().x(), -origin.topLeft().y())
+        return transform
+
 from Editor.CanvasComponent import CanvasComponent
 ## editor-edit-shape class
 #
 # stores information and logic about when an existing shape is edited
 #
+# shift-clicking shapes adds them to (or removes them from) a multi-selection, which is
+# moved/scaled/mirrored as a whole through a SelectionProxy
+#
 class EditShape(CanvasComponent):
-    def __init__(self, parent : QWidget, camera : Camera, scene : Scene) -> None:
+    def __init__(self, parent : QWidget, camera : Camera, scene : Scene, snapping : Snapping) -> None:
         super().__init__()
         self.parent : QWidget = parent
         self.camera : Camera = camera
         self.scene : Scene = scene
+        self.snapping : Snapping = snapping
 
-        self.translateArea : TranslateArea = TranslateArea(camera)
-        self.scaleAreas : list[ScaleArea] = [ ScaleArea(camera, ScaleAreaMode.TOPLEFT), 
-                                              ScaleArea(camera, ScaleAreaMode.TOPRIGHT), 
-                                              ScaleArea(camera, ScaleAreaMode.BOTTOMRIGHT), 
-                                              ScaleArea(camera, ScaleAreaMode.BOTTOMLEFT)]
+        self.translateArea : TranslateArea = TranslateArea(camera, snapping)
+        self.scaleAreas : list[ScaleArea] = [ ScaleArea(camera, snapping, ScaleAreaMode.TOPLEFT), 
+                                              ScaleArea(camera, snapping, ScaleAreaMode.TOPRIGHT), 
+                                              ScaleArea(camera, snapping, ScaleAreaMode.BOTTOMRIGHT), 
+                                              ScaleArea(camera, snapping, ScaleAreaMode.BOTTOMLEFT)]
 
         self.shape : Shape = None
         self.anchor_point : QPointF = None
         self.dragging : bool = False
 
+        # all selected shapes (dict used as an insertion-ordered set), 'shape' is either the only
+        # selected shape or the SelectionProxy of all of them
+        self.selection : dict[Shape, None] = {}
+        self.__proxy_origin__ : QRectF = QRectF()
+        # bounding-box of the edited shape when the current drag started
+        self.__drag_origin__ : QRectF = QRectF()
+        # reused by __update_edit_areas__()
+        self.__box__ : Box = Box()
+
     def disable(self) -> None:
         super().disable()
         self.dragging = False
-        if not (self.shape is None):
-            self.shape.__show_bounding_box__ = False
+        self.snapping.clearTarget()
+        self.__clear_selection__()
+
+    def __clear_selection__(self) -> None:
+        for shape in self.selection:
+            shape.__show_bounding_box__ = False
+        self.selection.clear()
         self.shape = None
+        self.active = False
+    #
+    # add or remove a shape from the selection and choose what the edit-areas act upon
+    #
+    def __toggle_selection__(self, shape : Shape) -> None:
+        if (shape in self.selection):
+            del self.selection[shape]
+            shape.__show_bounding_box__ = False
+        else:
+            self.selection[shape] = None
+            shape.__show_bounding_box__ = True
+        self.__select_edit_target__()
+
+    def __select_edit_target__(self) -> None:
+        if (len(self.selection) == 0):
+            self.shape = None
+            self.active = False
+            return
+        if (len(self.selection) == 1):
+            self.shape = next(iter(self.selection))
+        else:
+            self.shape = SelectionProxy(list(self.selection))
+            self.__proxy_origin__ = QRectF(self.shape.boundingBox)
+        self.active = True
+        self.__update_edit_areas__()
+
+    @property
+    def multiSelection(self) -> bool:
+        return isinstance(self.shape, SelectionProxy)
+    #
+    # mirror all selected shapes about the center of the selection in one batch
+    #
+    def mirrorSelection(self, horizontal : bool) -> None:
+        if (self.shape is None):
+            return
+        center : QPointF = self.shape.boundingBox.normalized().center()
+        transform : QTransform = QTransform()
+        transform.translate(center.x(), center.y())
+        transform.scale(-1.0 if horizontal else 1.0, 1.0 if horizontal else -1.0)
+        transform.translate(-center.x(), -center.y())
+        self.scene.transformShapes(list(self.selection), transform)
+        self.__select_edit_target__()
 
     def __find_clicked_shape__(self, clickPoint : QPointF) -> Shape | None:
-        for shape in reversed(self.scene.attachedShapes):
-            if (Utility.PointInRect(clickPoint, shape.boundingBox)):
-                return shape
-        return None
+        return self.scene.findShapeAt(clickPoint, self.camera.pickTolerance())
 
     def draw(self, painter : QPainter) -> None:
         if (self.enabled and self.active):
             if not (self.shape is None):
+                if (self.multiSelection):
+                    self.shape.drawOverlay(painter)
                 painter.setPen(QPen(Shape.boundingBoxColor, Shape.boundingBoxWidth))
                 painter.drawRect(self.translateArea.area)
                 for scaleArea in self.scaleAreas:
                     painter.drawRect(scaleArea.area)
 
+    # (called on every mouse-move of a drag, so the areas are computed from plain floats and updated in place)
     def __update_edit_areas__(self) -> None:
-        self.translateArea.area = QRectF(self.shape.center - 0.1 * Utility.toQPointF(self.shape.size), 0.2 * self.shape.size)
-        self.scaleAreas[0].area = QRectF(self.shape.center + 0.5 * QPointF(-self.shape.size.width(), -self.shape.size.height()), 0.2 * self.shape.size)
-        self.scaleAreas[1].area = QRectF(self.shape.center + 0.5 * QPointF(self.shape.size.width() - 0.4 * self.shape.size.width(), -self.shape.size.height()), 0.2 * self.shape.size)
-        self.scaleAreas[2].area = QRectF(self.shape.center + 0.5 * QPointF(self.shape.size.width() - 0.4 * self.shape.size.width(), self.shape.size.height() - 0.4 * self.shape.size.height()), 0.2 * self.shape.size)
-        self.scaleAreas[3].area = QRectF(self.shape.center + 0.5 * QPointF(-self.shape.size.width(), self.shape.size.height() - 0.4 * self.shape.size.height()), 0.2 * self.shape.size)
+        box : Box = self.__box__.assign(self.shape.boundingBox)
+        center_x : float = box.x + 0.5 * box.width
+        center_y : float = box.y + 0.5 * box.height
+        width : float = 0.2 * box.width
+        height : float = 0.2 * box.height
+        self.translateArea.area.setRect(center_x - 0.1 * box.width, center_y - 0.1 * box.height, width, height)
+        self.scaleAreas[0].area.setRect(center_x - 0.5 * box.width, center_y - 0.5 * box.height, width, height)
+        self.scaleAreas[1].area.setRect(center_x + 0.3 * box.width, center_y - 0.5 * box.height, width, height)
+        self.scaleAreas[2].area.setRect(center_x + 0.3 * box.width, center_y + 0.3 * box.height, width, height)
+        self.scaleAreas[3].area.setRect(center_x - 0.5 * box.width, center_y + 0.3 * box.height, width, height)
 
     def mousePressEvent(self, event : QMouseEvent) -> None:
         if (self.enabled):
-            mouseClickPoint : QPointF = self.camera.view.mapToWorld(Utility.toQPointF(event.pos()))
+            mouseClickPoint : QPointF = self.camera.view.mapToWorld(QPointF(event.pos()))
+            # shift-clicks extend or reduce the selection
+            if (event.modifiers() & Qt.KeyboardModifier.ShiftModifier):
+                clickedShape : Shape | None = self.__find_clicked_shape__(mouseClickPoint)
+                if not (clickedShape is None):
+                    self.__toggle_selection__(clickedShape)
+                return
             # differentiate between 'a shape is selected' and 'no shape is selected'
             if (self.shape is None):
                 clickedShape : Shape | None = self.__find_clicked_shape__(mouseClickPoint)
-                self.shape = clickedShape
-                if not (self.shape is None):
-                    self.shape.__show_bounding_box__ = True
-                    self.active = True
-                    self.scene.moveToFront(self.shape)
-                    self.__update_edit_areas__()
+                if not (clickedShape is None):
+                    self.scene.moveToFront(clickedShape)
+                    self.__toggle_selection__(clickedShape)
             else:
-                if not (Utility.PointInRect(mouseClickPoint, self.shape.boundingBox)):
-                    self.active = False
-                    self.shape.__show_bounding_box__ = False
-                    self.shape = None
+                if not (Utility.PointInRect(mouseClickPoint, self.shape.boundingBox.normalized())):
+                    self.__clear_selection__()
                 else:
                     self.translateArea.mousePressEvent(event, self.shape)
                     for scaleArea in self.scaleAreas:
                         scaleArea.mousePressEvent(event, self.shape)
+                    self.__drag_origin__ = QRectF(self.shape.boundingBox)
+                    self.dragging = self.translateArea.clicked or any(scaleArea.clicked for scaleArea in self.scaleAreas)
 
     def mouseReleaseEvent(self, event : QMouseEvent) -> None:
         if (self.enabled and self.active):
+            self.dragging = False
+            self.snapping.clearTarget()
+            dragged : bool = self.translateArea.clicked
             if (self.translateArea.clicked):
                 self.translateArea.mouseReleaseEvent(event)
             for scaleArea in self.scaleAreas:
                 if (scaleArea.clicked):
+                    dragged = True
                     scaleArea.mouseReleaseEvent(event)
+            # the drag of a multi-selection is applied to all shapes only now
+            if (dragged and self.multiSelection):
+                self.scene.transformShapes(list(self.selection), self.shape.transformFrom(self.__proxy_origin__))
+                self.__select_edit_target__()
+            elif (dragged):
+                self.scene.notifyShapesEdited([self.shape], [self.__drag_origin__])
     
     def mouseMoveEvent(self, event : QMouseEvent) -> None:
         if (self.enabled and self.active):
+            # the dragged shapes don't snap to themselves
+            exclude : set[Shape] = set(self.selection)
             if (self.translateArea.clicked):
-                self.translateArea.mouseMoveEvent(event, self.shape)
+                self.translateArea.mouseMoveEvent(event, self.shape, exclude)
             for scaleArea in self.scaleAreas:
                 if (scaleArea.clicked):
-                    scaleArea.mouseMoveEvent(event, self.shape)
+                    scaleArea.mouseMoveEvent(event, self.shape, exclude)
             self.__update_edit_areas__()
\ No newline at end of file
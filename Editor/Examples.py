@@ -0,0 +1,101 @@
+from PySide6.QtGui import QColor, QPolygonF
+from PySide6.QtCore import QPointF, QSizeF
+from Editor.Shapes.Primitives import Rectangle, Circle, Polygon
+from Editor.Shapes.DeformShapes import MultiSubdividePolygon, DeformPolygon
+from Editor.Scene import Scene
+
+from typing import TYPE_CHECKING
+if (TYPE_CHECKING):
+    from Editor.Animation import DeformAnimation
+#
+# example scenes of the File/Examples-menu
+#
+# kept apart from Editor/Scene.py, so the deformation-code they use is only imported once
+# one of them is actually loaded
+#
+
+def exampleScene1(scene : Scene) -> None:
+    scene.clear()
+
+    rectangle_1 : Rectangle = Rectangle(QPointF(100.0, 100.0), QSizeF(100.0, 100.0))
+    rectangle_1.__show_fill_body__ = False
+    rectangle_1.__outline_color__ = QColor(0, 0, 255)
+    rectangle_1.__outline_width__ = 2.0
+
+    circle_1 : Circle = Circle(QPointF(150.0, 150.0), 50.0)
+    circle_1.__show_fill_body__ = False
+    circle_1.__outline_color__ = QColor(255, 0, 0)
+    circle_1.__outline_width__ = 2.0
+
+    scene.attach_objects([rectangle_1, circle_1])
+
+def exampleScene2(scene : Scene) -> None:
+    scene.clear()
+
+    padding : float = 5.0
+    rectangles : list[Rectangle] = [Rectangle(QPointF(200.0 + padding, 100.0), QSizeF(100.0, 100.0)),
+                                    Rectangle(QPointF(300.0 + 2 * padding, 100.0), QSizeF(100.0, 100.0)),
+                                    Rectangle(QPointF(100.0, 200.0 + padding), QSizeF(100.0, 100.0)),
+                                    Rectangle(QPointF(200.0 + padding, 300.0 + 2 * padding), QSizeF(100.0, 100.0)),
+                                    Rectangle(QPointF(300.0 + 2 * padding, 300.0 + 2 * padding), QSizeF(100.0, 100.0)),
+                                    Rectangle(QPointF(400.0 + 3 * padding, 200.0 + padding), QSizeF(100.0, 100.0))]
+
+    circles : list[Circle] = [Circle(QPointF(150.0, 150.0), 50.0), 
+                                Circle(QPointF(450.0 + 3 * padding, 150.0), 50.0), 
+                                Circle(QPointF(450.0 + 3 * padding, 350.0 + 2 * padding), 50.0), 
+                                Circle(QPointF(150.0, 350.0 + 2 * padding), 50.0)]
+
+    for rect in rectangles:
+        rect.__fill_color__ = QColor(0, 0, 255)
+        rect.__outline_color__ = QColor(255, 0, 0)
+        rect.__outline_width__ = 2.0
+
+    for circ in circles:
+        circ.__fill_color__ = QColor(255, 0, 0)
+        circ.__outline_color__ = QColor(0, 0, 255)
+        circ.__outline_width__ = 2.0
+
+    scene.attach_objects(rectangles)
+    scene.attach_objects(circles)
+
+#
+# example scene 2, but all shapes are converted to polygons, subdivided and deformed
+#
+def exampleScene3(scene : Scene) -> None:
+    __deformed_example_2__(scene)
+#
+# example scene 3 with its wave running through the shapes (see Editor/Animation.py), the amplitude swells
+# and falls back once per run, the returned animation still has to be played
+#
+def exampleAnimation3(scene : Scene) -> "DeformAnimation":
+    from Editor.Animation import DeformAnimation, DeformTarget, Track
+    targets : list[DeformTarget] = [DeformTarget(shape, source) for shape, source in __deformed_example_2__(scene)]
+    return DeformAnimation(targets,
+                           amplitude=Track([(0.0, 20.0), (1.0, 30.0), (2.0, 20.0)]),
+                           width=Track(0.2),
+                           offset=Track([(0.0, 0.0), (2.0, 360.0)]),
+                           subdivisions=2)
+#
+# shapes of example scene 3 together with the (undeformed) outlines they were made from
+#
+def __deformed_example_2__(scene : Scene) -> list[tuple[Polygon, QPolygonF]]:
+    scene.clear()
+    example_scene_2 : Scene = Scene()
+    exampleScene2(example_scene_2)
+    
+    res : list[tuple[Polygon, QPolygonF]] = []
+    for shape in example_scene_2.attachedShapes:
+        shape.update()
+
+        polygon : QPolygonF = shape.describeShape()
+        polygon_subdivided : QPolygonF = MultiSubdividePolygon(polygon, 2)
+        polygon_deformed : QPolygonF = DeformPolygon(polygon_subdivided, 20.0, 0.2, 0.0)
+        polygon_shape : Polygon = Polygon(polygon_deformed.toList())
+
+        polygon_shape.__fill_color__ = shape.__fill_color__
+        polygon_shape.__outline_color__ = shape.__outline_color__
+        polygon_shape.__outline_width__ = shape.__outline_width__
+
+        scene.attach_object(polygon_shape)
+        res.append((polygon_shape, polygon))
+    return res
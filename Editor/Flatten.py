@@ -0,0 +1,215 @@
+from PySide6.QtGui import QPainterPath, QPolygonF
+
+from concurrent.futures import ThreadPoolExecutor
+from math import floor
+
+import os
+import time
+
+from Editor.Shapes.Shape import Shape
+from Editor.Shapes.Aggregate import AggregateShape
+from Editor.Shapes.Instance import InstanceShape
+from Editor.Shapes.Primitives import CompoundPolygon
+from Editor.Scene import Scene
+
+#
+# flatten-report class
+#
+# result of flattenScene(), 'runs' is the number of merged shapes that replaced more than one shape
+#
+class FlattenReport:
+    def __init__(self, shapesBefore : int, shapesAfter : int, mergedShapes : int, runs : int, seconds : float) -> None:
+        self.shapesBefore : int = shapesBefore
+        self.shapesAfter : int = shapesAfter
+        self.mergedShapes : int = mergedShapes
+        self.runs : int = runs
+        self.seconds : float = seconds
+
+    def __str__(self) -> str:
+        return (f"{self.shapesBefore} -> {self.shapesAfter} shapes\n"
+                f"{self.mergedShapes} shapes merged into {self.runs} compound-polygons in {1000.0 * self.seconds:.0f} ms")
+
+#
+# scene-flattening
+#
+# abutting and overlapping shapes with the same style (e.g. imported from cad-tools) are replaced by
+# one compound-polygon per style, so they cost one fill-call and one svg-element instead of one each
+#
+# only filled, opaque shapes without outline are merged (the union of outlined or translucent shapes
+# looks different from the shapes drawn one by one), groups and instances are left as they are
+#
+# a merged shape is drawn at the place of its topmost member, which would lift the other members over
+# every shape of another style in between, so while walking the shapes in drawing-order the run of a
+# style is closed as soon as a shape of another style overlaps one of its members (found through the
+# spatial-index), later shapes of that style start a new run
+#
+# every run is united on its own (in parallel, on plain painterpath-copies): members are split into
+# groups of overlapping bounds first, only those are united (pairwise, neighbours first, so every
+# union stays small) and the disjoint results are simply added to one path
+#
+def flattenScene(scene : Scene, workers : int | None = None) -> FlattenReport:
+    start : float = time.perf_counter()
+    # painterpaths and index have to be up to date before they are read from other threads
+    scene.update()
+    shapes : list[Shape] = list(scene.attachedShapes)
+    runs : list[list[Shape]] = __collect_runs__(scene, shapes)
+
+    merged : list[list[Shape]] = [run for run in runs if len(run) > 1]
+    jobs : list[list[tuple[QPainterPath, tuple[float, float, float, float]]]] = [
+        [(QPainterPath(member.__painterpath__), scene.index.bounds(member)) for member in run] for run in merged]
+    with ThreadPoolExecutor(max_workers=workers if (workers is not None) else (os.cpu_count() or 1)) as executor:
+        rings : list[list[QPolygonF]] = list(executor.map(uniteRings, jobs))
+
+    replacement : dict[Shape, Shape] = {}
+    for run, run_rings in zip(merged, rings):
+        top : Shape = run[-1]
+        compound : CompoundPolygon = CompoundPolygon(run_rings)
+        compound.__fill_color__ = top.__fill_color__
+        compound.__outline_color__ = top.__outline_color__
+        compound.__outline_width__ = top.__outline_width__
+        compound.__show_fill_body__ = True
+        compound.__z_index__ = top.__z_index__
+        replacement[top] = compound
+    members : set[Shape] = set(member for run in merged for member in run)
+
+    result : list[Shape] = []
+    for shape in shapes:
+        if (shape in replacement):
+            result.append(replacement[shape])
+        elif not (shape in members):
+            result.append(shape)
+    if (len(merged)):
+        scene.replaceAttached(result)
+    return FlattenReport(len(shapes), len(result), len(members), len(merged), time.perf_counter() - start)
+#
+# style of a shape that can be merged with others of the same style, None if it can't be merged at all
+#
+def mergeStyle(shape : Shape) -> int | None:
+    if (isinstance(shape, (AggregateShape, InstanceShape)) or not shape.__show_fill_body__ or shape.__outline_width__ > 0.0 or
+        shape.__fill_color__.alpha() != 255):
+        return None
+    return shape.__fill_color__.rgba()
+
+# split the shapes (in drawing-order) into runs of the same style that can be merged without changing the drawing
+#
+# the scene's index is sized for picking, cad-imports put hundreds of tiny shapes into each of its cells,
+# so the walk uses its own grid sized by the shapes and only filled with the shapes walked so far
+#
+def __collect_runs__(scene : Scene, shapes : list[Shape]) -> list[list[Shape]]:
+    runs : list[list[Shape]] = []
+    open_runs : dict[int, list[Shape]] = {}
+    # per walked shape: its style and run (None for shapes that can't be merged)
+    walked : list[tuple[int | None, list[Shape] | None]] = []
+    bounds : list[tuple[float, float, float, float]] = [scene.index.bounds(shape) for shape in shapes]
+    grid : BoundsGrid = BoundsGrid(bounds)
+    for index, shape in enumerate(shapes):
+        style : int | None = mergeStyle(shape)
+        # only an open run of another style can be closed by this shape
+        if (len(open_runs) > (1 if (style in open_runs) else 0)):
+            for other in grid.overlapping(index):
+                other_style, other_run = walked[other]
+                if (other_style is not None and other_style != style and open_runs.get(other_style) is other_run):
+                    del open_runs[other_style]
+        grid.insert(index)
+        if (style is None):
+            runs.append([shape])
+            walked.append((None, None))
+            continue
+        run : list[Shape] | None = open_runs.get(style)
+        if (run is None):
+            run = []
+            runs.append(run)
+            open_runs[style] = run
+        run.append(shape)
+        walked.append((style, run))
+    return runs
+#
+# union of the passed painterpaths as closed rings, 'bounds' are (left, top, right, bottom) of every path
+#
+# only touches the passed paths, so it can be run on any thread
+#
+def uniteRings(paths : list[tuple[QPainterPath, tuple[float, float, float, float]]]) -> list[QPolygonF]:
+    result : list[QPolygonF] = []
+    for component in __overlapping_groups__([bounds for path, bounds in paths]):
+        # neighbours are united first, sorted along rows of the grid
+        component.sort(key=lambda index : (paths[index][1][1], paths[index][1][0]))
+        united : list[QPainterPath] = [paths[index][0] for index in component]
+        while (len(united) > 1):
+            united = [united[i].united(united[i + 1]) if (i + 1 < len(united)) else united[i] for i in range(0, len(united), 2)]
+        result.extend(united[0].toSubpathPolygons())
+    return result
+#
+# indices of the passed bounds grouped by overlap (transitively), bounds that only touch count as overlapping
+#
+def __overlapping_groups__(bounds : list[tuple[float, float, float, float]]) -> list[list[int]]:
+    parents : list[int] = list(range(len(bounds)))
+
+    def find(index : int) -> int:
+        while (parents[index] != index):
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    grid : BoundsGrid = BoundsGrid(bounds)
+    for index in range(len(bounds)):
+        for other in grid.overlapping(index):
+            root : int = find(index)
+            other_root : int = find(other)
+            if (root != other_root):
+                parents[root] = other_root
+        grid.insert(index)
+
+    groups : dict[int, list[int]] = {}
+    for index in range(len(bounds)):
+        groups.setdefault(find(index), []).append(index)
+    return list(groups.values())
+#
+# uniform grid over a list of bounds (left, top, right, bottom), sized by their average extent
+#
+# bounds are referred to by their index and only become visible to overlapping() once inserted,
+# bounds that would cover too many cells are kept in a separate list that is always checked
+#
+class BoundsGrid:
+
+    maxCellsPerBounds : int = 64
+
+    def __init__(self, bounds : list[tuple[float, float, float, float]]) -> None:
+        self.bounds : list[tuple[float, float, float, float]] = bounds
+        extent : float = sum(max(right - left, bottom - top) for left, top, right, bottom in bounds) / max(len(bounds), 1)
+        self.cellSize : float = max(extent, 1e-6)
+        self.__cells__ : dict[tuple[int, int], list[int]] = {}
+        self.__large__ : list[int] = []
+
+    def insert(self, index : int) -> None:
+        cell_range : tuple[int, int, int, int] = self.__cell_range__(self.bounds[index])
+        if ((cell_range[2] - cell_range[0] + 1) * (cell_range[3] - cell_range[1] + 1) > BoundsGrid.maxCellsPerBounds):
+            self.__large__.append(index)
+            return
+        for cx in range(cell_range[0], cell_range[2] + 1):
+            for cy in range(cell_range[1], cell_range[3] + 1):
+                self.__cells__.setdefault((cx, cy), []).append(index)
+    #
+    # inserted indices whose bounds overlap (or touch) the bounds at 'index', each reported once
+    #
+    def overlapping(self, index : int) -> set[int]:
+        left, top, right, bottom = self.bounds[index]
+        cell_range : tuple[int, int, int, int] = self.__cell_range__(self.bounds[index])
+        candidates : list[int] = list(self.__large__)
+        if ((cell_range[2] - cell_range[0] + 1) * (cell_range[3] - cell_range[1] + 1) > len(self.__cells__)):
+            # more cells covered than exist, testing every inserted index directly is cheaper
+            for cell in self.__cells__.values():
+                candidates.extend(cell)
+        else:
+            for cx in range(cell_range[0], cell_range[2] + 1):
+                for cy in range(cell_range[1], cell_range[3] + 1):
+                    candidates.extend(self.__cells__.get((cx, cy), ()))
+        result : set[int] = set()
+        for other in candidates:
+            o_left, o_top, o_right, o_bottom = self.bounds[other]
+            if (left <= o_right and o_left <= right and top <= o_bottom and o_top <= bottom):
+                result.add(other)
+        return result
+
+    def __cell_range__(self, bounds : tuple[float, float, float, float]) -> tuple[int, int, int, int]:
+        return (floor(bounds[0] / self.cellSize), floor(bounds[1] / self.cellSize),
+                floor(bounds[2] / self.cellSize), floor(bounds[3] / self.cellSize))
@@ -1,6 +1,6 @@
 
 from PySide6.QtWidgets import QWidget, QDialog
-from PySide6.QtGui import QColor, QMouseEvent, QPainter, QPen
+from PySide6.QtGui import QColor, QMouseEvent, QPainter, QPen, QBrush
 from PySide6.QtCore import QPointF, QSizeF, QRectF
 from PySide6.QtCore import Qt
 
@@ -10,59 +10,124 @@ from Editor.Scene import Scene
 from Editor.Camera import Camera
 from Editor.EditShape import EditShape
 
-import Utility
+from enum import Enum
+
 
 from Editor.CanvasComponent import CanvasComponent
 #
+# enum to describe which shapes a rubber-band selection picks up
+#
+class SelectionMode(Enum):
+    CONTAINS   = 1 # only shapes that lie entirely within the rectangle
+    INTERSECTS = 2 # every shape that touches the rectangle
+#
 # editor group-shapes class
 #
 # canvas-component that stores information and logic about grouping 
 # together shapes to aggregate shapes
 #
+# left-clicking a shape toggles its selection, dragging on empty space spans a rubber-band:
+# dragged to the right it selects contained shapes, dragged to the left intersected shapes
+# right-clicking groups the selection
+#
 class GroupShapes(CanvasComponent):
+
+    rubberBandColor : QColor = QColor(16, 227, 206, 50)
+
     def __init__(self, parent : QWidget, camera : Camera, scene : Scene) -> None:
         super().__init__()
         self.parent : QWidget = parent
         self.camera : Camera = camera
         self.scene : Scene = scene
         
-        self.selected_shapes : list[Shape] = []
+        # dict used as an insertion-ordered set, so membership-tests and toggling are O(1)
+        self.selected_shapes : dict[Shape, None] = {}
+
+        self.rubberBand : QRectF | None = None
+        self.rubberBandMode : SelectionMode = SelectionMode.CONTAINS
+        self.rubberBandShapes : set[Shape] = set()
+        self.__rubber_band_screen_pos__ : QPointF = QPointF()
 
     def disable(self) -> None:
         super().disable()
-        if (len(self.selected_shapes)):
-            for shape in self.selected_shapes:
-                shape.__show_bounding_box__ = False
-            self.selected_shapes.clear()
+        self.__clear_selection__()
+        self.rubberBand = None
+        self.rubberBandShapes = set()
+
+    def __clear_selection__(self) -> None:
+        for shape in self.selected_shapes:
+            shape.__show_bounding_box__ = False
+        self.selected_shapes.clear()
+
+    def __toggle_selection__(self, shape : Shape) -> None:
+        if (shape in self.selected_shapes):
+            del self.selected_shapes[shape]
+            shape.__show_bounding_box__ = False
+        else:
+            self.selected_shapes[shape] = None
+            shape.__show_bounding_box__ = True
+    def draw(self, painter : QPainter) -> None:
+        if (self.enabled and self.rubberBand is not None):
+            painter.setPen(QPen(Shape.boundingBoxColor, Shape.boundingBoxWidth))
+            painter.setBrush(QBrush(GroupShapes.rubberBandColor))
+            painter.drawRect(self.rubberBand.normalized())
+            painter.setBrush(QBrush())
+            for shape in self.rubberBandShapes:
+                if not (shape in self.selected_shapes):
+                    painter.drawRect(shape.boundingBox)
+            # live selection-count next to the cursor, in screen-coordinates
+            painter.save()
+            painter.resetTransform()
+            painter.setPen(QPen(QColor(0, 0, 0)))
+            painter.drawText(self.__rubber_band_screen_pos__ + QPointF(12.0, -6.0), 
+                             f"{len(self.rubberBandShapes)} selected")
+            painter.restore()
     
     def __find_clicked_shape__(self, clickPoint : QPointF) -> Shape | None:
-        for shape in reversed(self.scene.attachedShapes):
-            if (Utility.PointInRect(clickPoint, shape.boundingBox)):
-                return shape
-        return None
+        return self.scene.findShapeAt(clickPoint, self.camera.pickTolerance())
 
     def __group_selected_shapes__(self) -> None:
         #for shape in self.selected_shapes:
         #     self.scene.attachedShapes.remove(shape)
-        self.scene.attach_object(AggregateShape(self.selected_shapes))
-        self.disable()
+        self.scene.attach_object(AggregateShape(list(self.selected_shapes)))
+        self.__clear_selection__()
 
     def mousePressEvent(self, event : QMouseEvent) -> None:
         if (self.enabled):
             if (event.button() == Qt.MouseButton.LeftButton):
-                mouseClickPoint : QPointF = self.camera.view.mapToWorld(Utility.toQPointF(event.pos()))
+                mouseClickPoint : QPointF = self.camera.view.mapToWorld(QPointF(event.pos()))
                 selected_shape : Shape | None = self.__find_clicked_shape__(mouseClickPoint)
                 if (selected_shape is None):
-                    self.disable()
+                    # start a rubber-band, a click without dragging clears the selection on release
+                    self.rubberBand = QRectF(mouseClickPoint, QSizeF(0.0, 0.0))
+                    self.rubberBandShapes = set()
+                    self.__rubber_band_screen_pos__ = QPointF(event.pos())
+                    self.active = True
                 else:
-                    selected_shape.__show_bounding_box__ = True
-                    self.selected_shapes.append(selected_shape)
+                    self.__toggle_selection__(selected_shape)
             elif (event.button() == Qt.MouseButton.RightButton):
                 if (len(self.selected_shapes) > 0):
                     self.__group_selected_shapes__()
 
     def mouseReleaseEvent(self, event : QMouseEvent) -> None:
-        pass
+        if (self.enabled and self.rubberBand is not None):
+            if (self.rubberBand.width() == 0.0 and self.rubberBand.height() == 0.0):
+                self.__clear_selection__()
+            else:
+                for shape in self.rubberBandShapes:
+                    if not (shape in self.selected_shapes):
+                        self.__toggle_selection__(shape)
+            self.rubberBand = None
+            self.rubberBandShapes = set()
+            self.active = False
 
     def mouseMoveEvent(self, event : QMouseEvent) -> None:
-        pass
\ No newline at end of file
+        if (self.enabled and self.rubberBand is not None):
+            self.rubberBand.setBottomRight(self.camera.view.mapToWorld(QPointF(event.pos())))
+            self.__rubber_band_screen_pos__ = QPointF(event.pos())
+            # dragged to the right selects contained shapes, dragged to the left intersected ones
+            if (self.rubberBand.width() >= 0.0):
+                self.rubberBandMode = SelectionMode.CONTAINS
+            else:
+                self.rubberBandMode = SelectionMode.INTERSECTS
+            self.rubberBandShapes = self.scene.findShapesInRect(self.rubberBand, self.rubberBandMode == SelectionMode.CONTAINS)
\ No newline at end of file
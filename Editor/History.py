@@ -0,0 +1,253 @@
+from PySide6.QtCore import QRectF
+from PySide6.QtGui import QTransform
+
+from collections import deque
+
+import time
+
+from Editor.Shapes.Shape import Shape
+from Editor.Scene import Scene
+from Editor.SceneListener import SceneListener
+
+#
+# command base-class
+#
+# a command stores only the delta of one edit (never a copy of the scene) and can revert
+# and re-apply it on the scene, touching only the shapes it changed
+#
+class Command:
+    def __init__(self) -> None:
+        self.timestamp : float = time.monotonic()
+
+    def undo(self, scene : Scene) -> None:
+        pass
+
+    def redo(self, scene : Scene) -> None:
+        pass
+    #
+    # try to fold a directly following command into this one (returns whether it did)
+    #
+    def merge(self, command : "Command", interval : float) -> bool:
+        return False
+
+    # rough estimate of the memory held by the command in bytes
+    def memory(self) -> int:
+        return 64
+#
+# shapes attached to the scene, this also covers new groups (their members
+# are kept by the group-shape itself)
+#
+class AttachCommand(Command):
+    def __init__(self, shapes : list[Shape]) -> None:
+        super().__init__()
+        self.shapes : list[Shape] = list(shapes)
+
+    def undo(self, scene : Scene) -> None:
+        scene.detach_objects(list(reversed(self.shapes)))
+
+    def redo(self, scene : Scene) -> None:
+        scene.attach_objects(self.shapes)
+
+    def merge(self, command : Command, interval : float) -> bool:
+        # the drag that gives a newly created shape its size is part of creating it
+        # (redo attaches the shape-object as it was when undone)
+        return (isinstance(command, EditCommand) and
+                all(shape in self.shapes for shape in command.shapes) and
+                all(box.width() == 0.0 and box.height() == 0.0 for box in command.previous))
+
+    def memory(self) -> int:
+        return super().memory() + 8 * len(self.shapes)
+#
+# bounding-boxes edited directly (moved or scaled through the edit-areas)
+#
+class EditCommand(Command):
+    rectBytes : int = 64
+
+    def __init__(self, shapes : list[Shape], previous : list[QRectF], current : list[QRectF]) -> None:
+        super().__init__()
+        self.shapes : list[Shape] = list(shapes)
+        self.previous : list[QRectF] = previous
+        self.current : list[QRectF] = current
+
+    def undo(self, scene : Scene) -> None:
+        scene.setBoundingBoxes(self.shapes, self.previous)
+
+    def redo(self, scene : Scene) -> None:
+        scene.setBoundingBoxes(self.shapes, self.current)
+
+    def merge(self, command : Command, interval : float) -> bool:
+        # consecutive drags of the same shapes end up as one edit
+        if (isinstance(command, EditCommand) and command.timestamp - self.timestamp <= interval and
+            len(command.shapes) == len(self.shapes) and all(a is b for a, b in zip(command.shapes, self.shapes)) and
+            command.previous == self.current):
+            self.current = command.current
+            self.timestamp = command.timestamp
+            return True
+        return False
+
+    def memory(self) -> int:
+        return super().memory() + len(self.shapes) * (8 + 2 * EditCommand.rectBytes)
+#
+# a batch of shapes transformed at once (multi-selection drags, mirroring), reverted
+# through the inverse transformation
+#
+class TransformCommand(Command):
+    def __init__(self, shapes : list[Shape], transform : QTransform) -> None:
+        super().__init__()
+        self.shapes : list[Shape] = list(shapes)
+        self.transform : QTransform = QTransform(transform)
+
+    def undo(self, scene : Scene) -> None:
+        scene.transformShapes(self.shapes, self.transform.inverted()[0])
+
+    def redo(self, scene : Scene) -> None:
+        scene.transformShapes(self.shapes, self.transform)
+
+    def merge(self, command : Command, interval : float) -> bool:
+        if (isinstance(command, TransformCommand) and command.timestamp - self.timestamp <= interval and
+            len(command.shapes) == len(self.shapes) and all(a is b for a, b in zip(command.shapes, self.shapes))):
+            self.transform = self.transform * command.transform # applies this transformation first
+            self.timestamp = command.timestamp
+            return True
+        return False
+
+    def memory(self) -> int:
+        return super().memory() + 8 * len(self.shapes) + 96
+#
+# a shape moved within the drawing-order (e.g. to the front when clicked)
+#
+class ReorderCommand(Command):
+    def __init__(self, shape : Shape, index : int, previousIndex : int, zIndex : int, previousZIndex : int) -> None:
+        super().__init__()
+        self.shape : Shape = shape
+        self.index : int = index
+        self.previousIndex : int = previousIndex
+        self.zIndex : int = zIndex
+        self.previousZIndex : int = previousZIndex
+
+    def undo(self, scene : Scene) -> None:
+        scene.reorderShape(self.shape, self.previousIndex, self.previousZIndex, self.index)
+
+    def redo(self, scene : Scene) -> None:
+        scene.reorderShape(self.shape, self.index, self.zIndex, self.previousIndex)
+#
+# all attached shapes replaced at once (e.g. merged by Scene.flatten())
+#
+class ReplaceCommand(Command):
+    def __init__(self, previous : list[Shape], current : list[Shape]) -> None:
+        super().__init__()
+        self.previous : list[Shape] = list(previous)
+        self.current : list[Shape] = list(current)
+
+    def undo(self, scene : Scene) -> None:
+        scene.replaceAttached(self.previous)
+
+    def redo(self, scene : Scene) -> None:
+        scene.replaceAttached(self.current)
+
+    def memory(self) -> int:
+        return super().memory() + 8 * (len(self.previous) + len(self.current))
+#
+# undo-history class
+#
+# records every edit of a scene as a delta-command (as a scene-listener), undo and redo
+# revert/re-apply these through the scene, so their cost only depends on the changed shapes
+#
+# the estimated memory of all recorded commands is kept below 'memoryLimit' by dropping
+# the oldest ones
+#
+class History(SceneListener):
+
+    memoryLimit : int = 16 << 20    # bytes all commands may hold together
+    mergeInterval : float = 1.0     # seconds within which consecutive edits of the same shapes are merged
+
+    def __init__(self, scene : Scene, memoryLimit : int = memoryLimit) -> None:
+        self.scene : Scene = scene
+        self.memoryLimit : int = memoryLimit
+        self.undoStack : deque[Command] = deque()
+        self.redoStack : list[Command] = []
+        self.memory : int = 0
+        # set while a command is applied, the resulting scene-notifications are not recorded
+        self.__applying__ : bool = False
+        self.scene.listeners.append(self)
+
+    @property
+    def canUndo(self) -> bool:
+        return len(self.undoStack) > 0
+
+    @property
+    def canRedo(self) -> bool:
+        return len(self.redoStack) > 0
+
+    def undo(self) -> bool:
+        if not (self.canUndo):
+            return False
+        command : Command = self.undoStack.pop()
+        self.__apply__(command.undo)
+        self.redoStack.append(command)
+        return True
+
+    def redo(self) -> bool:
+        if not (self.canRedo):
+            return False
+        command : Command = self.redoStack.pop()
+        self.__apply__(command.redo)
+        self.undoStack.append(command)
+        return True
+
+    def clear(self) -> None:
+        self.undoStack.clear()
+        self.redoStack.clear()
+        self.memory = 0
+
+    def push(self, command : Command) -> None:
+        if (self.__applying__):
+            return
+        for dropped in self.redoStack:
+            self.memory -= dropped.memory()
+        self.redoStack.clear()
+        if (self.canUndo):
+            top : Command = self.undoStack[-1]
+            before : int = top.memory()
+            if (top.merge(command, self.mergeInterval)):
+                self.memory += top.memory() - before
+                return
+        self.undoStack.append(command)
+        self.memory += command.memory()
+        while (self.memory > self.memoryLimit and self.canUndo):
+            self.memory -= self.undoStack.popleft().memory()
+
+    def __apply__(self, action) -> None:
+        self.__applying__ = True
+        try:
+            action(self.scene)
+        finally:
+            self.__applying__ = False
+    #
+    # scene-listener
+    #
+    def shapesAttached(self, shapes : list[Shape]) -> None:
+        self.push(AttachCommand(shapes))
+
+    def shapesEdited(self, shapes : list[Shape], previous : list[QRectF]) -> None:
+        self.push(EditCommand(shapes, [QRectF(box) for box in previous], [QRectF(shape.boundingBox) for shape in shapes]))
+
+    def shapesTransformed(self, shapes : list[Shape], transform : QTransform) -> None:
+        if (self.__applying__):
+            return
+        if not (transform.isInvertible()):
+            # shapes were collapsed, nothing recorded so far can be reverted correctly anymore
+            self.clear()
+            return
+        self.push(TransformCommand(shapes, transform))
+
+    def shapeReordered(self, shape : Shape, index : int, previousIndex : int, previousZIndex : int) -> None:
+        if (index != previousIndex):
+            self.push(ReorderCommand(shape, index, previousIndex, shape.__z_index__, previousZIndex))
+
+    def shapesReplaced(self, previous : list[Shape]) -> None:
+        self.push(ReplaceCommand(previous, self.scene.attachedShapes))
+
+    def sceneCleared(self) -> None:
+        if not (self.__applying__):
+            self.clear()
@@ -0,0 +1,309 @@
+from PySide6.QtCore import QRectF
+from PySide6.QtGui import QTransform
+
+from typing import TextIO
+
+import json
+import os
+import threading
+
+from Editor.Shapes.Shape import Shape
+from Editor.Shapes.Aggregate import AggregateShape
+from Editor.Shapes.Instance import InstanceShape
+from Editor.Scene import Scene
+from Editor.SceneListener import SceneListener
+from Editor.SceneFile import (
+    ShapeType,          ShapeRecord,            SceneData,
+    readSceneData,      writeSceneData,         recordFromShape,
+    sceneDataFromShapes, shapesFromSceneData
+)
+
+#
+# journal class
+#
+# incremental autosave of a scene into a directory, consisting of
+#
+#   checkpoint.vgs          a full scene-file (see Editor/SceneFile.py)
+#   journal.log             append-only log of every edit since the checkpoint, one json-entry per line
+#   journal.compacting.log  older part of the log that is currently merged into a new checkpoint
+#
+# as a scene-listener the journal appends one small entry per edit (attached/detached shapes, edited
+# bounding-boxes, transformed shapes, drawing-order, replaced shapes, clearing), so saving costs as much
+# as the edit itself and not as much as the whole scene
+#
+# every entry carries an increasing sequence-number and the checkpoint stores the number of the
+# last entry it contains, recovering loads the checkpoint and replays all newer entries on top
+#
+# once the log grows past 'compactionThreshold' it is moved aside and merged into a new checkpoint
+# by a background-thread, which only works on plain scene-data (no shapes, no qt-objects)
+#
+class Journal(SceneListener):
+
+    compactionThreshold : int = 4 << 20 # log-size in bytes that starts a background-compaction
+    syncEntries : bool = False          # additionally fsync every entry (survives power-loss, not just crashes)
+
+    checkpointName : str = "checkpoint.vgs"
+    journalName : str = "journal.log"
+    compactingName : str = "journal.compacting.log"
+
+    def __init__(self, scene : Scene, directory : os.path) -> None:
+        self.scene : Scene = scene
+        self.directory : os.path = directory
+        self.checkpointFile : os.path = os.path.join(directory, Journal.checkpointName)
+        self.journalFile : os.path = os.path.join(directory, Journal.journalName)
+        self.compactingFile : os.path = os.path.join(directory, Journal.compactingName)
+
+        self.__stream__ : TextIO | None = None
+        self.__sequence__ : int = 0
+        # uids whose full records are already contained in the checkpoint or the log
+        self.__known__ : set[int] = set()
+        self.__compaction__ : threading.Thread | None = None
+        # error of the last failed compaction (the log is kept and merged again next time)
+        self.compactionError : Exception | None = None
+    #
+    # whether a directory contains an autosaved scene that could be recovered
+    #
+    @staticmethod
+    def hasData(directory : os.path) -> bool:
+        return any(os.path.exists(os.path.join(directory, name)) for name in (Journal.checkpointName,
+                                                                               Journal.journalName,
+                                                                               Journal.compactingName))
+    #
+    # shapes of the autosaved scene (checkpoint plus all logged edits), to be attached to the
+    # scene before the journal is started
+    #
+    def recover(self) -> list[Shape]:
+        data : SceneData = SceneData()
+        if (os.path.exists(self.checkpointFile)):
+            data = readSceneData(self.checkpointFile)
+        replayJournal(data, self.compactingFile)
+        replayJournal(data, self.journalFile)
+        self.__sequence__ = data.sequence
+        self.__known__ = set(data.records)
+        return shapesFromSceneData(data)
+    #
+    # start logging all edits of the scene
+    #
+    def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self.__stream__ = open(self.journalFile, "a", encoding="utf-8")
+        self.scene.listeners.append(self)
+
+    def close(self) -> None:
+        if (self in self.scene.listeners):
+            self.scene.listeners.remove(self)
+        self.wait()
+        if (self.__stream__ is not None):
+            self.__stream__.close()
+            self.__stream__ = None
+    #
+    # write the whole scene as new checkpoint and start with an empty log (blocks until done)
+    #
+    def checkpoint(self) -> None:
+        self.wait()
+        os.makedirs(self.directory, exist_ok=True)
+        data : SceneData = sceneDataFromShapes(self.scene.attachedShapes)
+        data.sequence = self.__sequence__
+        __write_checkpoint__(data, self.checkpointFile)
+        if (self.__stream__ is not None):
+            self.__stream__.close()
+            self.__stream__ = open(self.journalFile, "w", encoding="utf-8")
+        elif (os.path.exists(self.journalFile)):
+            os.remove(self.journalFile)
+        if (os.path.exists(self.compactingFile)):
+            os.remove(self.compactingFile)
+        self.__known__ = set(data.records)
+    #
+    # merge the current log into a new checkpoint in the background, new edits go into a fresh log meanwhile
+    #
+    def compact(self) -> None:
+        if (self.compacting):
+            return
+        # a log left over by a failed compaction is merged first, the current one stays in place until then
+        if not (os.path.exists(self.compactingFile)):
+            self.__stream__.close()
+            os.replace(self.journalFile, self.compactingFile)
+            self.__stream__ = open(self.journalFile, "a", encoding="utf-8")
+        self.__compaction__ = threading.Thread(target=self.__compact__, name="journal-compaction", daemon=False)
+        self.__compaction__.start()
+
+    @property
+    def compacting(self) -> bool:
+        return self.__compaction__ is not None and self.__compaction__.is_alive()
+
+    def wait(self) -> None:
+        if (self.__compaction__ is not None):
+            self.__compaction__.join()
+            self.__compaction__ = None
+
+    def __compact__(self) -> None:
+        try:
+            data : SceneData = SceneData()
+            if (os.path.exists(self.checkpointFile)):
+                data = readSceneData(self.checkpointFile)
+            replayJournal(data, self.compactingFile)
+            __write_checkpoint__(data, self.checkpointFile)
+            os.remove(self.compactingFile)
+            self.compactionError = None
+        except (OSError, ValueError) as error:
+            self.compactionError = error
+    #
+    # scene-listener
+    #
+    def shapesAttached(self, shapes : list[Shape]) -> None:
+        records : list[ShapeRecord] = []
+        for shape in shapes:
+            self.__collect_new_records__(shape, records)
+        self.__append__("attach", shapes=[__encode_record__(record) for record in records],
+                                  attached=[shape.__uid__ for shape in shapes])
+
+    def shapesDetached(self, shapes : list[Shape]) -> None:
+        # records of detached shapes can be dropped by the next compaction, so attaching them
+        # again has to log them in full
+        ordered : list[Shape] = []
+        visited : set[Shape] = set()
+        for shape in shapes:
+            __collect_shapes__(shape, ordered, visited)
+        self.__known__.difference_update([shape.__uid__ for shape in ordered])
+        self.__append__("detach", uids=[shape.__uid__ for shape in shapes])
+
+    def shapesEdited(self, shapes : list[Shape], previous : list[QRectF]) -> None:
+        boxes : list[list] = []
+        for shape in shapes:
+            bounding_box : QRectF = shape.boundingBox
+            boxes.append([shape.__uid__, bounding_box.x(), bounding_box.y(), bounding_box.width(), bounding_box.height()])
+        self.__append__("edit", boxes=boxes)
+
+    def shapesTransformed(self, shapes : list[Shape], transform : QTransform) -> None:
+        # vertex-data changed as well, so the complete records of the shapes and their members are logged
+        ordered : list[Shape] = []
+        visited : set[Shape] = set()
+        for shape in shapes:
+            __collect_shapes__(shape, ordered, visited)
+        self.__append__("update", shapes=[__encode_record__(recordFromShape(shape)) for shape in ordered])
+
+    def shapeReordered(self, shape : Shape, index : int, previousIndex : int, previousZIndex : int) -> None:
+        self.__append__("order", uid=shape.__uid__, index=index, previous=previousIndex)
+
+    def shapesReplaced(self, previous : list[Shape]) -> None:
+        # shapes no longer reachable from the scene are forgotten like detached ones
+        remaining : list[Shape] = []
+        visited : set[Shape] = set()
+        for shape in self.scene.attachedShapes:
+            __collect_shapes__(shape, remaining, visited)
+        dropped : list[Shape] = []
+        for shape in previous:
+            __collect_shapes__(shape, dropped, visited)
+        self.__known__.difference_update([shape.__uid__ for shape in dropped])
+        records : list[ShapeRecord] = []
+        for shape in self.scene.attachedShapes:
+            self.__collect_new_records__(shape, records)
+        self.__append__("replace", shapes=[__encode_record__(record) for record in records],
+                                   attached=[shape.__uid__ for shape in self.scene.attachedShapes])
+
+    def sceneCleared(self) -> None:
+        self.__known__.clear()
+        self.__append__("clear")
+
+    def __collect_new_records__(self, shape : Shape, records : list[ShapeRecord]) -> None:
+        if (shape.__uid__ in self.__known__):
+            return
+        self.__known__.add(shape.__uid__)
+        if (isinstance(shape, AggregateShape)):
+            for child in shape.children:
+                self.__collect_new_records__(child, records)
+        elif (isinstance(shape, InstanceShape)):
+            self.__collect_new_records__(shape.master, records)
+        records.append(recordFromShape(shape))
+
+    def __append__(self, op : str, **fields) -> None:
+        if (self.__stream__ is None):
+            return
+        self.__sequence__ += 1
+        entry : dict = { "seq" : self.__sequence__, "op" : op }
+        entry.update(fields)
+        self.__stream__.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self.__stream__.flush()
+        if (Journal.syncEntries):
+            os.fsync(self.__stream__.fileno())
+        if (self.__stream__.tell() >= self.compactionThreshold):
+            self.compact()
+#
+# apply all entries of a log-file newer than 'data.sequence' to 'data'
+#
+# a truncated last line (crash while writing) ends the replay
+#
+def replayJournal(data : SceneData, file : os.path) -> None:
+    if not (os.path.exists(file)):
+        return
+    with open(file, "r", encoding="utf-8") as stream:
+        for line in stream:
+            if not (line.endswith("\n")):
+                break
+            try:
+                entry : dict = json.loads(line)
+            except ValueError:
+                break
+            if (entry["seq"] > data.sequence):
+                applyJournalEntry(data, entry)
+
+def applyJournalEntry(data : SceneData, entry : dict) -> None:
+    op : str = entry["op"]
+    if (op == "attach"):
+        for record in entry["shapes"]:
+            data.records[record["uid"]] = __decode_record__(record)
+        data.attached.extend(entry["attached"])
+    elif (op == "update"):
+        for record in entry["shapes"]:
+            data.records[record["uid"]] = __decode_record__(record)
+    elif (op == "edit"):
+        for uid, x, y, width, height in entry["boxes"]:
+            if (uid in data.records):
+                data.records[uid].boundingBox = (x, y, width, height)
+    elif (op == "detach"):
+        for uid in entry["uids"]:
+            for i in range(len(data.attached) - 1, -1, -1):
+                if (data.attached[i] == uid):
+                    data.attached.pop(i)
+                    break
+    elif (op == "order"):
+        if (entry["previous"] < len(data.attached) and data.attached[entry["previous"]] == entry["uid"]):
+            data.attached.insert(entry["index"], data.attached.pop(entry["previous"]))
+    elif (op == "replace"):
+        for record in entry["shapes"]:
+            data.records[record["uid"]] = __decode_record__(record)
+        data.attached = list(entry["attached"])
+    elif (op == "clear"):
+        data.records.clear()
+        data.attached.clear()
+    data.sequence = entry["seq"]
+
+def __write_checkpoint__(data : SceneData, file : os.path) -> None:
+    # scene-files are written next to the old checkpoint first, so a crash never leaves a half-written one behind
+    writeSceneData(data, file)
+
+def __collect_shapes__(shape : Shape, ordered : list[Shape], visited : set[Shape]) -> None:
+    if (shape in visited):
+        return
+    visited.add(shape)
+    if (isinstance(shape, AggregateShape)):
+        for child in shape.children:
+            __collect_shapes__(child, ordered, visited)
+    elif (isinstance(shape, InstanceShape)):
+        __collect_shapes__(shape.master, ordered, visited)
+    ordered.append(shape)
+
+def __encode_record__(record : ShapeRecord) -> dict:
+    entry : dict = { "uid" : record.uid, "type" : record.type,
+                     "box" : list(record.boundingBox), "style" : list(record.style) }
+    if (record.vertices is not None):
+        entry["vertices"] = list(record.vertices)
+    if (record.type == ShapeType.STAR):
+        entry["star"] = list(record.star)
+    if (len(record.children)):
+        entry["children"] = record.children
+    return entry
+
+def __decode_record__(entry : dict) -> ShapeRecord:
+    return ShapeRecord(entry["uid"], entry["type"], tuple(entry["box"]), tuple(entry["style"]),
+                       entry.get("vertices"), tuple(entry.get("star", (0, 0.0, 0.0))), entry.get("children", []))
@@ -4,13 +4,13 @@ from PySide6.QtWidgets import (
     QLabel,     QSpinBox,       QDoubleSpinBox, 
     QDialog,    QPushButton
 )
-from PySide6.QtCore import QPointF, QSizeF
+from PySide6.QtCore import QPointF, QSizeF, QRectF
 from PySide6.QtGui import QColor, QPainter, QMouseEvent
 from PySide6.QtCore import Qt
 from Editor.Shapes.Primitives import Shape, Rectangle, Ellipse, Circle, Star
 from Editor.Camera import Camera
 from Editor.Scene import Scene
-import Utility
+from Editor.Snapping import Snapping, SnapTarget
 #
 # labeled spinbox
 #
@@ -139,20 +139,26 @@ from Editor.CanvasComponent import CanvasComponent
 #
 # stores information and logic about when a new shape is created
 #
+# both corners of the dragged bounding-box snap to the geometry of the scene (see Editor/Snapping.py)
+#
 class NewShape(CanvasComponent):
-    def __init__(self, parent : QWidget, camera : Camera, scene : Scene):
+    def __init__(self, parent : QWidget, camera : Camera, scene : Scene, snapping : Snapping):
         super().__init__()
         self.parent : QWidget = parent
         self.camera : Camera = camera
         self.scene : Scene = scene
+        self.snapping : Snapping = snapping
 
         self.shape : Shape = None
         self.anchor_point : QPointF = None
         self.dragging : bool = False
+        # bounding-box of the new shape before it was dragged to its size
+        self.__origin__ : QRectF = QRectF()
 
     def disable(self) -> None:
         super().disable()
         self.dragging = False
+        self.snapping.clearTarget()
 
     def makeNewShape(self, shape : Shape) -> None:
         if (self.enabled and not self.active):
@@ -163,23 +169,32 @@ class NewShape(CanvasComponent):
             if (dialog.result()):
                 self.shape = shape
                 self.scene.attach_object(self.shape)
+                self.__origin__ = QRectF(self.shape.boundingBox)
                 self.active = True
 
     def mousePressEvent(self, event : QMouseEvent) -> None:
         if (self.enabled and self.active):
             self.parent.setCursor(Qt.CursorShape.CrossCursor)
-            self.anchor_point = self.camera.view.mapToWorld(Utility.toQPointF(event.pos()))
+            self.anchor_point = self.__snapped_point__(event)
             self.dragging = True
 
     def mouseReleaseEvent(self, event : QMouseEvent) -> None:
         if (self.enabled and self.active):
             self.parent.setCursor(Qt.CursorShape.ArrowCursor)
+            self.scene.notifyShapesEdited([self.shape], [self.__origin__])
             self.disable()
     
     def mouseMoveEvent(self, event : QMouseEvent) -> None:
         if (self.enabled and self.active):
             if (self.dragging):
-                delta : QPointF = self.camera.view.mapToWorld(Utility.toQPointF(event.pos())) - self.anchor_point
+                delta : QPointF = self.__snapped_point__(event) - self.anchor_point
                 self.shape.center = self.anchor_point + 0.5 * delta
-                self.shape.size = Utility.toQSizeF(delta)
-
+                self.shape.size = QSizeF(delta.x(), delta.y())
+
+    def __snapped_point__(self, event : QMouseEvent) -> QPointF:
+        point : QPointF = self.camera.view.mapToWorld(QPointF(event.pos()))
+        if not (self.snapping.active(event)):
+            self.snapping.clearTarget()
+            return point
+        target : SnapTarget | None = self.snapping.snap(point, self.camera.snapTolerance(), {self.shape})
+        return point if (target is None) else QPointF(target.point)
@@ -0,0 +1,225 @@
+from PySide6.QtCore import QRectF
+from PySide6.QtGui import QPainter, QPen, QColor, QTransform
+from PySide6.QtCore import Qt
+
+from bisect import bisect_left
+
+from Editor.Shapes.Shape import Shape
+from Editor.SceneListener import SceneListener
+from Editor.Scene import Scene
+#
+# overlap-tracker class
+#
+# finds all pairs of attached shapes whose (outline-padded) bounding-boxes overlap, optionally refined
+# by an exact test of the visible areas (see Shape.intersectsShape()); boxes that only touch don't overlap
+#
+# the first query sweeps over the boxes sorted by their left edge (sweep-and-prune), keeping only the
+# boxes whose right edge lies past the sweep-line as candidates, so just boxes overlapping on the x-axis
+# are compared on the y-axis
+#
+# afterwards the overlaps are kept per shape and only moved shapes are queried again: their boxes are
+# looked up in the list sorted by left edges, between their own right edge and their left edge minus the
+# widest box; as a scene-listener the tracker knows which shapes moved, shapes moved by a drag that is
+# not finished yet can be passed to moved()
+#
+class OverlapTracker(SceneListener):
+    def __init__(self, scene : Scene) -> None:
+        self.scene : Scene = scene
+        # (left, top, right, bottom) of every tracked shape, in the order of their left edges as well
+        self.__bounds__ : dict[Shape, tuple[float, float, float, float]] = {}
+        self.__lefts__ : list[float] = []
+        self.__order__ : list[Shape] = []
+        self.__max_width__ : float = 0.0
+        # shapes overlapping each tracked shape on both axes
+        self.__overlaps__ : dict[Shape, set[Shape]] = {}
+        # results of the exact test per pair of bounding-box overlaps, dropped when one of them moves
+        self.__exact__ : dict[tuple[Shape, Shape], bool] = {}
+        # per exact-flag: the last result of overlappingShapes() and the shapes whose overlaps changed since
+        self.__overlapping__ : dict[bool, tuple[set[Shape], set[Shape]]] = {}
+        self.__stale__ : dict[Shape, None] = {}
+        self.__built__ : bool = False
+        self.scene.listeners.append(self)
+    #
+    # all overlapping pairs, each ordered by drawing-order (the lower shape first)
+    #
+    def pairs(self, exact : bool = False) -> list[tuple[Shape, Shape]]:
+        self.__prepare__()
+        result : list[tuple[Shape, Shape]] = []
+        for shape, others in self.__overlaps__.items():
+            for other in others:
+                if (shape.__z_index__ < other.__z_index__ and (not exact or self.__exactly__(shape, other))):
+                    result.append((shape, other))
+        result.sort(key=lambda pair : (pair[0].__z_index__, pair[1].__z_index__))
+        return result
+    #
+    # shapes that overlap any other shape
+    #
+    def overlappingShapes(self, exact : bool = False) -> set[Shape]:
+        self.__prepare__()
+        cached : tuple[set[Shape], set[Shape]] | None = self.__overlapping__.get(exact)
+        if (cached is None):
+            cached = (set(), set(self.__overlaps__))
+            self.__overlapping__[exact] = cached
+        result, changed = cached
+        for shape in changed:
+            others : set[Shape] | None = self.__overlaps__.get(shape)
+            if (others is not None and any((not exact or self.__exactly__(shape, other)) for other in others)):
+                result.add(shape)
+            else:
+                result.discard(shape)
+        changed.clear()
+        return set(result)
+    #
+    # tracked shapes whose bounding-boxes overlap 'bounds' (left, top, right, bottom), e.g. of a dragged selection
+    #
+    def overlapping(self, bounds : tuple[float, float, float, float], exclude : set[Shape] | frozenset = frozenset()) -> list[Shape]:
+        self.__prepare__()
+        return [other for other in self.__candidates__(bounds) if not (other in exclude)]
+    #
+    # shapes changed without the scene being told yet (e.g. while they are dragged), they are queried again
+    # with the next query, their painterpaths have to be up to date by then for exact tests
+    #
+    def moved(self, shapes : list[Shape]) -> None:
+        self.__mark_stale__(shapes)
+
+    def detach(self) -> None:
+        if (self in self.scene.listeners):
+            self.scene.listeners.remove(self)
+
+    def __exactly__(self, shape : Shape, other : Shape) -> bool:
+        key : tuple[Shape, Shape] = (shape, other) if (id(shape) < id(other)) else (other, shape)
+        result : bool | None = self.__exact__.get(key)
+        if (result is None):
+            result = shape.intersectsShape(other)
+            self.__exact__[key] = result
+        return result
+
+    def __prepare__(self) -> None:
+        if not (self.__built__):
+            self.__sweep__()
+        elif (len(self.__stale__)):
+            self.scene.refresh(list(self.__stale__))
+            for shape in self.__stale__:
+                self.__remove__(shape)
+                self.__insert__(shape)
+            self.__stale__.clear()
+
+    def __sweep__(self) -> None:
+        self.scene.update()
+        shapes : list[Shape] = list(self.scene.attachedShapes)
+        bounds : dict[Shape, tuple[float, float, float, float]] = { shape : self.scene.index.bounds(shape) for shape in shapes }
+        shapes.sort(key=lambda shape : bounds[shape][0])
+        overlaps : dict[Shape, set[Shape]] = { shape : set() for shape in shapes }
+        # boxes the sweep-line currently crosses
+        active : list[tuple[float, float, float, Shape]] = []
+        max_width : float = 0.0
+        for shape in shapes:
+            left, top, right, bottom = bounds[shape]
+            max_width = max(max_width, right - left)
+            active = [entry for entry in active if (entry[0] > left)]
+            for other_right, other_top, other_bottom, other in active:
+                if (other_top < bottom and top < other_bottom):
+                    overlaps[shape].add(other)
+                    overlaps[other].add(shape)
+            active.append((right, top, bottom, shape))
+        self.__bounds__ = bounds
+        self.__order__ = shapes
+        self.__lefts__ = [bounds[shape][0] for shape in shapes]
+        self.__max_width__ = max_width
+        self.__overlaps__ = overlaps
+        self.__exact__ = {}
+        self.__overlapping__ = {}
+        self.__stale__.clear()
+        self.__built__ = True
+
+    def __candidates__(self, bounds : tuple[float, float, float, float]) -> list[Shape]:
+        left, top, right, bottom = bounds
+        result : list[Shape] = []
+        for index in range(bisect_left(self.__lefts__, left - self.__max_width__), bisect_left(self.__lefts__, right)):
+            other_left, other_top, other_right, other_bottom = self.__bounds__[self.__order__[index]]
+            if (other_right > left and other_top < bottom and top < other_bottom):
+                result.append(self.__order__[index])
+        return result
+
+    def __insert__(self, shape : Shape) -> None:
+        if not (shape in self.scene.index):
+            return
+        bounds : tuple[float, float, float, float] = self.scene.index.bounds(shape)
+        others : set[Shape] = set(self.__candidates__(bounds))
+        for other in others:
+            self.__overlaps__[other].add(shape)
+        self.__overlaps__[shape] = others
+        self.__changed__(shape, others)
+        self.__bounds__[shape] = bounds
+        index : int = bisect_left(self.__lefts__, bounds[0])
+        self.__lefts__.insert(index, bounds[0])
+        self.__order__.insert(index, shape)
+        self.__max_width__ = max(self.__max_width__, bounds[2] - bounds[0])
+
+    def __remove__(self, shape : Shape) -> None:
+        bounds : tuple[float, float, float, float] | None = self.__bounds__.pop(shape, None)
+        if (bounds is None):
+            return
+        index : int = bisect_left(self.__lefts__, bounds[0])
+        while (self.__order__[index] is not shape):
+            index += 1
+        del self.__lefts__[index]
+        del self.__order__[index]
+        others : set[Shape] = self.__overlaps__.pop(shape)
+        for other in others:
+            self.__overlaps__[other].discard(shape)
+            self.__exact__.pop((shape, other) if (id(shape) < id(other)) else (other, shape), None)
+        self.__changed__(shape, others)
+
+    def __changed__(self, shape : Shape, others : set[Shape]) -> None:
+        for result, changed in self.__overlapping__.values():
+            changed.add(shape)
+            changed.update(others)
+    #
+    # edits of the scene, shapes inside groups are queried again through their attached groups
+    #
+    def __mark_stale__(self, shapes : list[Shape]) -> None:
+        if not (self.__built__):
+            return
+        for shape in shapes:
+            if (shape in self.__bounds__):
+                self.__stale__[shape] = None
+            else:
+                self.__mark_stale__(shape.__parent_groups__)
+
+    def shapesAttached(self, shapes : list[Shape]) -> None:
+        if (self.__built__):
+            for shape in shapes:
+                self.__stale__[shape] = None
+
+    def shapesDetached(self, shapes : list[Shape]) -> None:
+        if (self.__built__):
+            for shape in shapes:
+                self.__stale__.pop(shape, None)
+                self.__remove__(shape)
+
+    def shapesEdited(self, shapes : list[Shape], previous : list[QRectF]) -> None:
+        self.__mark_stale__(shapes)
+
+    def shapesTransformed(self, shapes : list[Shape], transform : QTransform) -> None:
+        self.__mark_stale__(shapes)
+
+    def shapesDeformed(self, shapes : list[Shape]) -> None:
+        self.__mark_stale__(shapes)
+
+    def shapesReplaced(self, previous : list[Shape]) -> None:
+        self.__built__ = False
+
+    def sceneCleared(self) -> None:
+        self.__built__ = False
+
+# opaque, so marks drawn again over a scrolled frame (see Canvas.__scroll_frame__()) look the same
+highlightColor : QColor = QColor(230, 30, 30)
+#
+# mark the passed shapes (e.g. OverlapTracker.overlappingShapes()) by their bounding-boxes
+#
+def drawOverlaps(painter : QPainter, shapes : set[Shape]) -> None:
+    painter.setPen(QPen(highlightColor, Shape.boundingBoxWidth))
+    painter.setBrush(Qt.BrushStyle.NoBrush)
+    for shape in shapes:
+        painter.drawRect(shape.boundingBox.normalized())
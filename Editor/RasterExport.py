@@ -0,0 +1,176 @@
+from PySide6.QtCore import QRectF
+from PySide6.QtGui import QColor, QImage, QPainter, QTransform
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import BinaryIO, Callable
+
+import os
+import struct
+import threading
+import zlib
+
+from Editor.Shapes.Shape import Shape
+from Editor.Scene import Scene
+from Editor.RenderThread import RenderItem, snapshotShapes, drawRenderItems
+
+#
+# png-writer class
+#
+# streaming png-encoder, the image-data is passed in as already deflated segments (see
+# compressRows()) and every segment becomes one IDAT-chunk, so no part of the encoder ever
+# holds more than one segment
+#
+# segments are compressed independently of each other (each ends on a sync-flush), which
+# lets them be produced in parallel and concatenated into one valid zlib-stream afterwards
+#
+class PNGWriter:
+
+    signature : bytes = b"\x89PNG\r\n\x1a\n"
+
+    COLOR_RGB  : int = 2
+    COLOR_RGBA : int = 6
+
+    def __init__(self, stream : BinaryIO, width : int, height : int, colorType : int = COLOR_RGB) -> None:
+        self.stream : BinaryIO = stream
+        self.width : int = width
+        self.height : int = height
+        self.colorType : int = colorType
+        self.__adler__ : int = 1
+        self.__started__ : bool = False
+        self.stream.write(PNGWriter.signature)
+        self.__chunk__(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, colorType, 0, 0, 0))
+    #
+    # append one compressed segment, 'rows' is the uncompressed (filtered) data it was made from,
+    # which is only needed for the running checksum of the zlib-stream
+    #
+    def writeSegment(self, segment : bytes, rows : bytes) -> None:
+        self.__adler__ = zlib.adler32(rows, self.__adler__)
+        if not (self.__started__):
+            segment = b"\x78\x9c" + segment # zlib-header (deflate, 32k window)
+            self.__started__ = True
+        self.__chunk__(b"IDAT", segment)
+
+    def finish(self) -> None:
+        self.__chunk__(b"IDAT", struct.pack(">I", self.__adler__))
+        self.__chunk__(b"IEND", b"")
+
+    def __chunk__(self, type : bytes, data : bytes) -> None:
+        self.stream.write(struct.pack(">I", len(data)))
+        self.stream.write(type)
+        self.stream.write(data)
+        self.stream.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(type))))
+#
+# prefix the first 'rowCount' rows of a packed RGB888/RGBA8888-image with png's 'none'-filter byte
+#
+def filterRows(image : QImage, rowBytes : int, rowCount : int) -> bytes:
+    data : memoryview = image.constBits()
+    stride : int = image.bytesPerLine()
+    return b"".join(b"\0" + data[row * stride:row * stride + rowBytes] for row in range(rowCount))
+#
+# deflate one segment of rows as raw deflate-data that can be concatenated with other segments
+#
+def compressRows(rows : bytes, last : bool, level : int = 6) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(rows) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+#
+# raster-export class
+#
+# renders a rectangular area of a scene into a png of any size, band by band
+#
+# every worker-thread owns one band-sized image that is reused for all of its bands, a band is
+# rendered through a painter translated onto it, converted, filtered and compressed, and the
+# main-thread writes the finished bands in order, so peak memory depends on band-height and
+# the number of workers, not on the size of the output
+#
+# bands only draw the shapes the spatial-index returns for them, the workers draw copies of their
+# painterpaths taken before the first band is rendered (see snapshotShapes()), so the scene may be
+# edited while the export runs (e.g. by an animation) without changing what the workers read
+#
+class RasterExport:
+
+    bandHeight : int = 256          # pixel-rows rendered at once
+    compressionLevel : int = 6
+
+    def __init__(self, scene : Scene, area : QRectF, width : int, height : int,
+                 transparent : bool = False, workers : int | None = None) -> None:
+        self.scene : Scene = scene
+        self.area : QRectF = area.normalized()
+        self.width : int = width
+        self.height : int = height
+        self.transparent : bool = transparent
+        self.workers : int = workers if (workers is not None) else (os.cpu_count() or 1)
+        self.__buffers__ : threading.local = threading.local()
+
+    @property
+    def bandCount(self) -> int:
+        return (self.height + self.bandHeight - 1) // self.bandHeight
+
+    def write(self, file : os.path, progress : Callable[[int, int], None] | None = None) -> None:
+        # painterpaths and index have to be up to date before they are copied for the workers
+        self.scene.update()
+        snapshots : dict[Shape, list[RenderItem]] = {}
+        band_items : list[list[RenderItem]] = []
+        for band in range(self.bandCount):
+            items : list[RenderItem] = []
+            for shape in sorted(self.scene.index.queryRect(self.__band_area__(band)), key=lambda shape : shape.__z_index__):
+                if not (shape in snapshots):
+                    snapshots[shape] = snapshotShapes([shape])
+                items.extend(snapshots[shape])
+            band_items.append(items)
+        background : QColor = QColor(0, 0, 0, 0) if (self.transparent) else QColor(self.scene.backgroundColor)
+        color_type : int = PNGWriter.COLOR_RGBA if (self.transparent) else PNGWriter.COLOR_RGB
+        with open(file, "wb") as stream:
+            writer : PNGWriter = PNGWriter(stream, self.width, self.height, color_type)
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                # at most two bands per worker are in flight, finished ones are written in order
+                pending : list[Future] = []
+                next_band : int = 0
+                for band in range(self.bandCount):
+                    while (next_band < self.bandCount and len(pending) < 2 * self.workers):
+                        pending.append(executor.submit(self.__render_band__, next_band, band_items[next_band], background))
+                        next_band += 1
+                    segment, rows = pending.pop(0).result()
+                    writer.writeSegment(segment, rows)
+                    if (progress is not None):
+                        progress(band + 1, self.bandCount)
+            writer.finish()
+
+    def __render_band__(self, band : int, items : list[RenderItem], background : QColor) -> tuple[bytes, bytes]:
+        top : int = band * self.bandHeight
+        height : int = min(self.bandHeight, self.height - top)
+        image : QImage = self.__band_buffer__()
+
+        scale_x : float = self.width / self.area.width()
+        scale_y : float = self.height / self.area.height()
+        transform : QTransform = QTransform()
+        transform.translate(0.0, -top)
+        transform.scale(scale_x, scale_y)
+        transform.translate(-self.area.left(), -self.area.top())
+
+        image.fill(background)
+        painter : QPainter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, True)
+        drawRenderItems(painter, items, transform)
+        painter.end()
+
+        converted : QImage = image.convertToFormat(QImage.Format.Format_RGBA8888 if (self.transparent) else QImage.Format.Format_RGB888)
+        rows : bytes = filterRows(converted, self.width * (4 if (self.transparent) else 3), height)
+        return (compressRows(rows, band == self.bandCount - 1, self.compressionLevel), rows)
+
+    # world-area of a band, grown by one pixel for antialiasing
+    def __band_area__(self, band : int) -> QRectF:
+        top : int = band * self.bandHeight
+        height : int = min(self.bandHeight, self.height - top)
+        scale_x : float = self.width / self.area.width()
+        scale_y : float = self.height / self.area.height()
+        return QRectF(self.area.left(), self.area.top() + top / scale_y,
+                      self.area.width(), height / scale_y).adjusted(-1.0 / scale_x, -1.0 / scale_y, 1.0 / scale_x, 1.0 / scale_y)
+
+    def __band_buffer__(self) -> QImage:
+        image : QImage | None = getattr(self.__buffers__, "image", None)
+        if (image is None):
+            image = QImage(self.width, self.bandHeight,
+                           QImage.Format.Format_ARGB32_Premultiplied if (self.transparent) else QImage.Format.Format_RGB32)
+            self.__buffers__.image = image
+        return image
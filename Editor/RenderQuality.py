@@ -0,0 +1,95 @@
+from PySide6.QtCore import QTimer
+
+from typing import Callable
+
+import Utility
+#
+# render-quality class
+#
+# settings one frame is rendered with:
+#
+#   antialiasing        whether edges are antialiased
+#   lodPixels           shapes smaller than this on screen (in pixels) are drawn as their bounding-box
+#   minStrokePixels     outlines thinner than this on screen are not drawn
+#
+class RenderQuality:
+    def __init__(self, antialiasing : bool = True, lodPixels : float = 0.0, minStrokePixels : float = 0.0) -> None:
+        self.antialiasing : bool = antialiasing
+        self.lodPixels : float = lodPixels
+        self.minStrokePixels : float = minStrokePixels
+
+    # whether anything is left out compared to a full-quality frame
+    @property
+    def draft(self) -> bool:
+        return not self.antialiasing or self.lodPixels > 0.0 or self.minStrokePixels > 0.0
+
+    # frames rendered with equal keys look the same
+    @property
+    def key(self) -> tuple[bool, float, float]:
+        return (self.antialiasing, self.lodPixels, self.minStrokePixels)
+
+#
+# quality-controller class
+#
+# while the user is dragging (panning the camera, editing or drawing a shape) nobody can tell the
+# difference between a draft- and a full-quality frame, so frames are rendered without antialiasing,
+# with small shapes reduced to their bounding-boxes and without sub-pixel outlines
+#
+# every interaction restarts a timer, once input has been idle for 'idleDelay' the 'refine'-callback
+# is invoked to render one full-quality frame
+#
+# the size below which shapes are reduced follows the measured draft-frames: it grows while they
+# take longer than 'frameBudget' and shrinks again while they take less than half of it
+#
+class QualityController:
+
+    frameBudget : float = 1.0 / 60.0    # seconds one frame should take during interaction
+    idleDelay : int = 150               # milliseconds without input until a full-quality frame is rendered
+    minLodPixels : float = 2.0
+    maxLodPixels : float = 64.0
+    minStrokePixels : float = 1.0
+
+    def __init__(self, refine : Callable[[], None], frameBudget : float = frameBudget) -> None:
+        self.frameBudget : float = frameBudget
+        self.enabled : bool = True
+        self.lodPixels : float = QualityController.minLodPixels
+        self.lastFrameTime : float = 0.0
+        self.__interacting__ : bool = False
+        self.__refine__ : Callable[[], None] = refine
+        self.__timer__ : QTimer = QTimer()
+        self.__timer__.setSingleShot(True)
+        self.__timer__.timeout.connect(self.__idle__)
+    #
+    # to be called on every input-event that is part of an interaction
+    #
+    def interact(self) -> None:
+        if not (self.enabled):
+            return
+        self.__interacting__ = True
+        self.__timer__.start(self.idleDelay)
+
+    @property
+    def interacting(self) -> bool:
+        return self.__interacting__
+    #
+    # quality the next frame is to be rendered with
+    #
+    def quality(self) -> RenderQuality:
+        if (self.__interacting__):
+            return RenderQuality(False, self.lodPixels, self.minStrokePixels)
+        return RenderQuality()
+    #
+    # report how long a frame rendered with 'quality' took (in seconds)
+    #
+    def frameRendered(self, quality : RenderQuality, seconds : float) -> None:
+        self.lastFrameTime = seconds
+        if not (quality.draft):
+            return
+        if (seconds > self.frameBudget):
+            self.lodPixels = Utility.Clamp(2.0 * self.lodPixels, self.minLodPixels, self.maxLodPixels)
+        elif (seconds < 0.5 * self.frameBudget):
+            self.lodPixels = Utility.Clamp(0.5 * self.lodPixels, self.minLodPixels, self.maxLodPixels)
+
+    def __idle__(self) -> None:
+        self.__interacting__ = False
+        self.__refine__()
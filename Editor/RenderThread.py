@@ -0,0 +1,241 @@
+from PySide6.QtCore import QObject, QRectF, QSize, Signal
+from PySide6.QtGui import QBrush, QColor, QImage, QPainter, QPainterPath, QPen, QTransform
+
+import threading
+import time
+
+from Editor.Shapes.Shape import Shape
+from Editor.Shapes.Aggregate import AggregateShape
+from Editor.Shapes.Instance import InstanceShape
+from Editor.Scene import Scene
+from Editor.RenderQuality import RenderQuality
+
+# one shape as the render-thread sees it: (painterpath, fill-color or None, outline-color or None, outline-width,
+# transformation of the painterpath or None)
+RenderItem = tuple[QPainterPath, QColor | None, QColor | None, float, QTransform | None]
+#
+# copy everything needed to draw the shapes within 'area' into a list of render-items (in drawing-order)
+#
+# painterpaths are updated in place, so they are copied (qt shares their data implicitly, later
+# edits of the shapes detach from the copies instead of changing them under the render-thread),
+# colors of shapes are only ever replaced and are referenced as they are
+#
+# instances share the painterpath of their master as well, drawn with the transformations of all
+# instances they are placed by (like InstanceShape.drawBody() does)
+#
+# with a draft-quality small shapes and thin outlines are simplified like drawDraft() does, 'zoom' is
+# the scale of the view-transformation the items are rendered with
+#
+def snapshotScene(scene : Scene, area : QRectF, quality : RenderQuality | None = None, zoom : float = 1.0) -> list[RenderItem]:
+    return snapshotShapes(sorted(scene.index.queryRect(area), key=lambda shape : shape.__z_index__), quality, zoom)
+
+def snapshotShapes(shapes : list[Shape], quality : RenderQuality | None = None, zoom : float = 1.0) -> list[RenderItem]:
+    draft : RenderQuality | None = quality if (quality is not None and quality.draft) else None
+    items : list[RenderItem] = []
+    for shape in shapes:
+        __snapshot_shape__(shape, items, None, draft, zoom)
+    return items
+
+def __snapshot_shape__(shape : Shape, items : list[RenderItem], transform : QTransform | None,
+                       draft : RenderQuality | None, zoom : float) -> None:
+    if (isinstance(shape, AggregateShape)):
+        for child in shape.children:
+            __snapshot_shape__(child, items, transform, draft, zoom)
+        return
+    if (isinstance(shape, InstanceShape) and isinstance(shape.master, AggregateShape)):
+        inner : QTransform = shape.transform if (transform is None) else shape.transform * transform
+        __snapshot_shape__(shape.master, items, inner, draft, zoom * shape.__scale__())
+        return
+    if (draft is not None):
+        bounding_box : QRectF = shape.boundingBox.normalized()
+        if (max(bounding_box.width(), bounding_box.height()) * zoom < draft.lodPixels):
+            color : QColor | None = shape.__fill_color__ if (shape.__show_fill_body__) else (
+                                    shape.__outline_color__ if (shape.__outline_width__ > 0) else None)
+            if (color is not None):
+                box : QPainterPath = QPainterPath()
+                box.addRect(bounding_box)
+                items.append((box, color, None, 0.0, transform))
+            return
+    path : QPainterPath = shape.__painterpath__
+    width : float = shape.__outline_width__
+    outline : QColor | None = shape.__outline_color__ if (width > 0) else None
+    if (isinstance(shape, InstanceShape)):
+        path = shape.master.__painterpath__
+        width = width / shape.__scale__()
+        transform = shape.transform if (transform is None) else shape.transform * transform
+    elif (draft is not None and width * zoom < draft.minStrokePixels):
+        outline = None
+    items.append((QPainterPath(path),
+                  shape.__fill_color__ if (shape.__show_fill_body__) else None,
+                  outline,
+                  width,
+                  transform))
+
+#
+# render-statistics
+#
+# latency is measured from submitting a snapshot until its frame is completed, the render-time
+# only covers drawing it on the worker-thread, a frame counts as
+# dropped if it was cancelled while rendering, replaced before rendering started or completed but
+# replaced by a newer one before it could be presented
+#
+class RenderStats:
+    def __init__(self) -> None:
+        self.submitted : int = 0
+        self.completed : int = 0
+        self.presented : int = 0
+        self.dropped : int = 0
+        self.lastLatency : float = 0.0  # seconds
+        self.totalLatency : float = 0.0
+        self.lastRenderTime : float = 0.0
+
+    @property
+    def averageLatency(self) -> float:
+        return self.totalLatency / self.completed if (self.completed) else 0.0
+
+    def __str__(self) -> str:
+        return (f"frames submitted: {self.submitted}\n"
+                f"frames completed: {self.completed}\n"
+                f"frames presented: {self.presented}\n"
+                f"frames dropped: {self.dropped}\n"
+                f"render-queue latency: {1000.0 * self.lastLatency:.1f} ms (average {1000.0 * self.averageLatency:.1f} ms)\n"
+                f"render-time: {1000.0 * self.lastRenderTime:.1f} ms")
+
+#
+# render-thread class
+#
+# renders scene-snapshots on a dedicated worker-thread into a back-buffer, the gui-thread only
+# submits snapshots and presents the newest completed frame (the front-buffer), so a slow frame
+# never blocks input-handling
+#
+# only the newest submitted snapshot is kept, submitting while a frame is rendered cancels that
+# frame (checked every 'cancelInterval' items), as its scene- or view-state is outdated anyway
+#
+# finished frames are announced through 'frameReady', which is emitted from the worker-thread
+# (connected slots of gui-objects are queued to the gui-thread by qt)
+#
+class RenderThread(QObject):
+
+    cancelInterval : int = 64 # render-items drawn between two checks for a newer snapshot
+
+    frameReady = Signal()
+
+    def __init__(self, size : QSize) -> None:
+        super().__init__()
+        self.stats : RenderStats = RenderStats()
+        self.__front__ : QImage | None = None
+        self.__back__ : QImage = QImage(size, QImage.Format.Format_RGB32)
+        self.__front_key__ : object = None
+        self.__front_time__ : float = 0.0
+        self.__front_presented__ : bool = True
+        # newest snapshot not yet picked up by the worker, as (generation, key, items, transform, background, size, antialiasing, submit-time)
+        self.__pending__ : tuple | None = None
+        self.__generation__ : int = 0
+        self.__condition__ : threading.Condition = threading.Condition()
+        self.__running__ : bool = False
+        self.__thread__ : threading.Thread | None = None
+
+    def start(self) -> None:
+        if (self.__thread__ is not None):
+            return
+        self.__running__ = True
+        self.__thread__ = threading.Thread(target=self.__run__, name="render-thread", daemon=True)
+        self.__thread__.start()
+
+    def stop(self) -> None:
+        with self.__condition__:
+            self.__running__ = False
+            self.__generation__ += 1
+            self.__condition__.notify()
+        if (self.__thread__ is not None):
+            self.__thread__.join()
+            self.__thread__ = None
+    #
+    # queue a snapshot (see snapshotScene()) to be rendered with the passed view-transform,
+    # 'key' identifies the scene- and view-state it was taken from
+    #
+    def submit(self, key : object, items : list[RenderItem], transform : QTransform, background : QColor, size : QSize,
+               antialiasing : bool = True) -> None:
+        with self.__condition__:
+            self.__generation__ += 1
+            if (self.__pending__ is not None):
+                self.stats.dropped += 1
+            self.__pending__ = (self.__generation__, key, items, QTransform(transform), QColor(background), QSize(size),
+                                antialiasing, time.perf_counter())
+            self.stats.submitted += 1
+            self.__condition__.notify()
+    #
+    # newest completed frame, the key of its snapshot (None before the first frame is done) and the
+    # seconds it took to render, the latter only the first time the frame is presented (None otherwise)
+    #
+    # the returned image shares its pixels with the front-buffer, should the worker start drawing
+    # into that buffer again while the image is still in use, qt detaches it (copy-on-write)
+    #
+    def present(self) -> tuple[QImage | None, object, float | None]:
+        with self.__condition__:
+            if (self.__front__ is None):
+                return (None, None, None)
+            seconds : float | None = None
+            if not (self.__front_presented__):
+                self.__front_presented__ = True
+                self.stats.presented += 1
+                seconds = self.__front_time__
+            return (QImage(self.__front__), self.__front_key__, seconds)
+
+    def __run__(self) -> None:
+        while (True):
+            with self.__condition__:
+                while (self.__running__ and self.__pending__ is None):
+                    self.__condition__.wait()
+                if not (self.__running__):
+                    return
+                job : tuple = self.__pending__
+                self.__pending__ = None
+            generation, key, items, transform, background, size, antialiasing, submitted = job
+            if (self.__back__.size() != size):
+                self.__back__ = QImage(size, QImage.Format.Format_RGB32)
+            start : float = time.perf_counter()
+            if not (self.__render__(generation, items, transform, background, antialiasing)):
+                with self.__condition__:
+                    self.stats.dropped += 1
+                continue
+            with self.__condition__:
+                if not (self.__front_presented__):
+                    self.stats.dropped += 1
+                # swap buffers, the old front-buffer is reused for the next frame
+                self.__front__, self.__back__ = self.__back__, (self.__front__ if (self.__front__ is not None) else QImage(size, QImage.Format.Format_RGB32))
+                self.__front_key__ = key
+                self.__front_time__ = time.perf_counter() - start
+                self.__front_presented__ = False
+                self.stats.completed += 1
+                self.stats.lastLatency = time.perf_counter() - submitted
+                self.stats.totalLatency += self.stats.lastLatency
+                self.stats.lastRenderTime = self.__front_time__
+            self.frameReady.emit()
+    #
+    # returns False if the frame was cancelled by a newer snapshot
+    #
+    def __render__(self, generation : int, items : list[RenderItem], transform : QTransform, background : QColor, antialiasing : bool) -> bool:
+        self.__back__.fill(background)
+        painter : QPainter = QPainter(self.__back__)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, antialiasing)
+        painter.setTransform(transform)
+        try:
+            for start in range(0, len(items), self.cancelInterval):
+                if (self.__generation__ != generation):
+                    return False
+                drawRenderItems(painter, items[start:start + self.cancelInterval], transform)
+        finally:
+            painter.end()
+        return self.__generation__ == generation
+#
+# draw render-items (see snapshotScene()) with a painter whose transformation maps the scene onto its device
+#
+def drawRenderItems(painter : QPainter, items : list[RenderItem], transform : QTransform) -> None:
+    for path, fill, outline, width, path_transform in items:
+        painter.setTransform(transform if (path_transform is None) else path_transform * transform)
+        if (fill is not None):
+            painter.fillPath(path, QBrush(fill))
+        if (outline is not None):
+            painter.setPen(QPen(outline, width))
+            painter.drawPath(path)
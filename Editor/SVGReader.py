@@ -0,0 +1,181 @@
+from PySide6.QtCore import QPointF, QSizeF, QRectF
+from PySide6.QtGui import QColor, QTransform
+
+from typing import BinaryIO, Callable
+
+import gzip
+import os
+import re
+import xml.etree.ElementTree as XMLTree
+
+from Editor.Shapes.Shape import Shape
+from Editor.Shapes.Primitives import Rectangle, Ellipse, Circle, Polygon
+from Editor.Shapes.Aggregate import AggregateShape
+from Editor.Shapes.Instance import InstanceShape
+
+#
+# svg-import
+#
+# parses an svg-file incrementally using iterparse, every supported element is converted to a shape
+# as soon as its end-tag is read and then cleared, so the parsed document never lives in memory as
+# a whole (only the resulting shapes do)
+#
+# supported elements are rect, ellipse, circle, polygon and g (groups become aggregate-shapes),
+# everything else (including transform-attributes) is skipped
+#
+# symbols and the use-elements referring to them (as written for instance-shapes) become masters and
+# their instances, so the content of a symbol is read once however often it is used, transformations
+# of use-elements are only read as far as instances can express them (scale and translation)
+#
+
+# called with (bytes read, total bytes) while parsing
+ProgressCallback = Callable[[int, int], None]
+
+progressInterval : int = 1000 # elements to parse between two progress-reports
+
+def readShapesFromSVG(file : os.path, progress : ProgressCallback | None = None) -> list[Shape]:
+    total : int = os.path.getsize(file)
+    with open(file, "rb") as raw:
+        stream : BinaryIO = raw
+        if (str(file).lower().endswith(".svgz")):
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        # shapes of every currently open group, the first list holds all top-level shapes
+        groups : list[list[Shape]] = [[]]
+        parents : list[XMLTree.Element] = []
+        # masters of the symbols read so far by their ids
+        symbols : dict[str, Shape] = {}
+        count : int = 0
+        for event, element in XMLTree.iterparse(stream, events=("start", "end")):
+            tag : str = __local_name__(element.tag)
+            if (event == "start"):
+                if (tag in ("g", "symbol")):
+                    groups.append([])
+                parents.append(element)
+                continue
+            parents.pop()
+            shape : Shape | None = None
+            if (tag == "g"):
+                children : list[Shape] = groups.pop()
+                if (len(children)):
+                    shape = AggregateShape(children)
+            elif (tag == "symbol"):
+                # not drawn itself, only through use-elements
+                children : list[Shape] = groups.pop()
+                if (len(children) and "id" in element.attrib):
+                    symbols[element.attrib["id"]] = children[0] if (len(children) == 1) else AggregateShape(children)
+            elif (tag == "use"):
+                shape = __parse_use__(element.attrib, symbols)
+            elif (tag in __element_parsers__):
+                shape = __element_parsers__[tag](element.attrib)
+                if (shape is not None):
+                    __apply_style__(shape, element.attrib)
+            if (shape is not None):
+                groups[-1].append(shape)
+            # drop the parsed element (and its reference from the parent) to keep memory bounded
+            element.clear()
+            if (len(parents)):
+                parents[-1].remove(element)
+            count += 1
+            if (progress is not None and count % progressInterval == 0):
+                progress(raw.tell(), total)
+        if (progress is not None):
+            progress(total, total)
+    return groups[0]
+
+#
+# element-parsers, returning None for degenerate elements
+#
+
+def __parse_rect__(attributes : dict[str, str]) -> Shape | None:
+    return Rectangle(QPointF(parseLength(attributes.get("x")), parseLength(attributes.get("y"))),
+                     QSizeF(parseLength(attributes.get("width")), parseLength(attributes.get("height"))))
+
+def __parse_ellipse__(attributes : dict[str, str]) -> Shape | None:
+    return Ellipse(QPointF(parseLength(attributes.get("cx")), parseLength(attributes.get("cy"))),
+                   QSizeF(parseLength(attributes.get("rx")), parseLength(attributes.get("ry"))))
+
+def __parse_circle__(attributes : dict[str, str]) -> Shape | None:
+    return Circle(QPointF(parseLength(attributes.get("cx")), parseLength(attributes.get("cy"))),
+                  parseLength(attributes.get("r")))
+
+def __parse_polygon__(attributes : dict[str, str]) -> Shape | None:
+    numbers : list[float] = [float(n) for n in re.split(r"[\s,]+", attributes.get("points", "").strip()) if len(n)]
+    if (len(numbers) < 6):
+        return None
+    return Polygon([QPointF(numbers[i], numbers[i + 1]) for i in range(0, len(numbers) - 1, 2)])
+
+__number_pattern__ : re.Pattern = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+#
+# instance of a symbol read before, placed by a 'matrix(...)'-transformation without rotation or shear
+# (outlines of instances are written scaled down along with the symbol, see InstanceShape.writeSVG())
+#
+def __parse_use__(attributes : dict[str, str], symbols : dict[str, Shape]) -> Shape | None:
+    reference : str = attributes.get("{http://www.w3.org/1999/xlink}href", attributes.get("href", ""))
+    master : Shape | None = symbols.get(reference[1:]) if (reference.startswith("#")) else None
+    if (master is None):
+        return None
+    transform : QTransform = QTransform()
+    match : re.Match | None = re.fullmatch(r"\s*matrix\((.*)\)\s*", attributes.get("transform", ""))
+    if (match is not None):
+        numbers : list[float] = [float(n) for n in __number_pattern__.findall(match.group(1))]
+        if (len(numbers) != 6 or numbers[1] != 0.0 or numbers[2] != 0.0):
+            return None
+        transform = QTransform(numbers[0], 0.0, 0.0, numbers[3], numbers[4], numbers[5])
+    master_box : QRectF = master.boundingBox.normalized()
+    instance : InstanceShape = InstanceShape(master, QRectF(transform.map(master_box.topLeft()), transform.map(master_box.bottomRight())))
+    __apply_style__(instance, attributes)
+    instance.__outline_width__ *= instance.__scale__()
+    return instance
+
+__element_parsers__ : dict[str, Callable[[dict[str, str]], Shape | None]] = { "rect" : __parse_rect__,
+                                                                                "ellipse" : __parse_ellipse__,
+                                                                                "circle" : __parse_circle__,
+                                                                                "polygon" : __parse_polygon__ }
+
+#
+# style-parsing, presentation-attributes are overridden by the style-attribute (like in svg)
+#
+def __apply_style__(shape : Shape, attributes : dict[str, str]) -> None:
+    style : dict[str, str] = {}
+    for key in ("fill", "stroke", "stroke-width"):
+        if (key in attributes):
+            style[key] = attributes[key]
+    for declaration in attributes.get("style", "").split(";"):
+        if (":" in declaration):
+            key, value = declaration.split(":", 1)
+            style[key.strip()] = value.strip()
+
+    fill : str = style.get("fill", "black") # svg fills with black if nothing is specified
+    shape.__show_fill_body__ = (fill != "none")
+    if (shape.__show_fill_body__):
+        shape.__fill_color__ = parseColor(fill)
+
+    stroke : str = style.get("stroke", "none")
+    if (stroke != "none"):
+        shape.__outline_color__ = parseColor(stroke)
+        shape.__outline_width__ = parseLength(style.get("stroke-width", "1"))
+
+def __local_name__(tag : str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+__length_pattern__ : re.Pattern = re.compile(r"[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?")
+#
+# parse a length like '12.5', '3mm' or '1e3px' (units are ignored), missing values are 0
+#
+def parseLength(value : str | None) -> float:
+    if (value is None):
+        return 0.0
+    match : re.Match | None = __length_pattern__.match(value.strip())
+    if (match is None):
+        return 0.0
+    return float(match.group(0))
+
+__rgb_pattern__ : re.Pattern = re.compile(r"rgb\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)")
+#
+# parse an svg-color ('rgb(r,g,b)', '#rrggbb', '#rgb' or a color-name)
+#
+def parseColor(value : str) -> QColor:
+    match : re.Match | None = __rgb_pattern__.fullmatch(value.strip())
+    if (match is not None):
+        return QColor(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+    return QColor(value.strip())
@@ -0,0 +1,477 @@
+from PySide6.QtGui import QPolygonF
+
+from typing import BinaryIO
+
+import gzip
+import os
+import re
+import xml.etree.ElementTree as XMLTree
+#
+# svg-optimization options
+#
+# 'precision'       decimal places coordinates are rounded to (None keeps them as they are)
+# 'styleClasses'    replace inline style-attributes by classes of a css-stylesheet, so every
+#                   shared style is only written once (see SVGWriter.writeStyleSheet)
+# 'pathPolygons'    write polygons as path-elements with relative coordinates instead of absolute 'points'
+#
+class SVGOptimization:
+    def __init__(self, precision : int | None = 2, styleClasses : bool = True, pathPolygons : bool = True) -> None:
+        self.precision : int | None = precision
+        self.styleClasses : bool = styleClasses
+        self.pathPolygons : bool = pathPolygons
+#
+# result of an optimized export, sizes are in characters of the (uncompressed) document,
+# 'originalSize' is what the document would have had without optimization
+#
+class SVGOptimizationReport:
+    def __init__(self, originalSize : int, optimizedSize : int, roundedNumbers : int, styleClasses : int, encodedPolygons : int) -> None:
+        self.originalSize : int = originalSize
+        self.optimizedSize : int = optimizedSize
+        self.roundedNumbers : int = roundedNumbers
+        self.styleClasses : int = styleClasses
+        self.encodedPolygons : int = encodedPolygons
+
+    @property
+    def savedBytes(self) -> int:
+        return self.originalSize - self.optimizedSize
+
+    @property
+    def savedRatio(self) -> float:
+        return self.savedBytes / self.originalSize if (self.originalSize > 0) else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.originalSize} -> {self.optimizedSize} bytes, saved {self.savedBytes} ({100.0 * self.savedRatio:.1f}%)\n"
+                f"{self.roundedNumbers} numbers rounded, {self.styleClasses} style-classes, {self.encodedPolygons} polygons as paths")
+
+#
+# svg-writer class
+#
+# streams an svg-document element by element into a binary file, instead of building
+# the whole element-tree in memory first and serializing it at the end
+#
+# output is collected in a small buffer that is encoded and written out whenever it
+# exceeds 'bufferSize', so memory-usage only depends on the largest single element
+#
+# files ending with '.svgz' are written gzip-compressed
+#
+# with an SVGOptimization elements are rewritten while streaming (rounded coordinates, style-classes,
+# relative path-data) and the size the plain document would have had is tracked for the report
+#
+class SVGWriter:
+
+    bufferSize : int = 1 << 16      # characters to collect before writing to the file
+    pointsPerChunk : int = 4096     # vertices formatted at once when writing polygon-points
+
+    # attributes of shape-elements holding coordinates or lengths (numbers of transform-attributes are rounded as well)
+    coordinateAttributes : frozenset[str] = frozenset(("x", "y", "width", "height", "cx", "cy", "r", "rx", "ry"))
+
+    def __init__(self, stream : BinaryIO, indent : bool = False, optimization : SVGOptimization | None = None) -> None:
+        self.stream : BinaryIO = stream
+        self.indent : bool = indent
+        self.optimization : SVGOptimization | None = optimization
+        self.__buffer__ : list[str] = []
+        self.__buffered__ : int = 0
+        self.__depth__ : int = 0
+        self.__open_tags__ : list[str] = []
+        # ids of the symbols written so far by what they were written for, and per open symbol whether
+        # its content inherits the style of the <use>-elements
+        self.__symbols__ : dict[object, str] = {}
+        self.__inherit_style__ : list[bool] = []
+        self.bytesWritten : int = 0
+        # statistics for the optimization-report
+        self.__characters__ : int = 0
+        self.__plain_characters__ : int = 0
+        self.__rounded_numbers__ : int = 0
+        self.__encoded_polygons__ : int = 0
+        self.__style_classes__ : dict[str, str] = {}
+        # text written since the outermost writeShape() began, and how often symbols were looked up
+        self.__captured__ : list[str] | None = None
+        self.__symbol_lookups__ : int = 0
+        self.__fragment_key__ : tuple | None = None
+        self.reusedFragments : int = 0
+    #
+    # open a file for writing (gzip-compressed for .svgz), the writer has to be closed afterwards
+    #
+    @staticmethod
+    def open(file : os.path, indent : bool = False, optimization : SVGOptimization | None = None) -> "SVGWriter":
+        if (str(file).lower().endswith(".svgz")):
+            return SVGWriter(gzip.open(file, "wb", compresslevel=6), indent, optimization)
+        return SVGWriter(open(file, "wb"), indent, optimization)
+
+    @property
+    def report(self) -> SVGOptimizationReport:
+        return SVGOptimizationReport(self.__plain_characters__, self.__characters__, self.__rounded_numbers__,
+                                     len(self.__style_classes__), self.__encoded_polygons__)
+
+    def __enter__(self) -> "SVGWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.flush()
+        self.stream.close()
+
+    def flush(self) -> None:
+        if (len(self.__buffer__)):
+            data : bytes = "".join(self.__buffer__).encode("utf-8")
+            self.stream.write(data)
+            self.bytesWritten += len(data)
+            self.__buffer__.clear()
+            self.__buffered__ = 0
+    #
+    # document-level
+    #
+    def writeHeader(self, attributes : dict[str, str], title : str, description : str) -> None:
+        self.__write__("<?xml version='1.0' encoding='utf-8'?>")
+        if not (self.indent):
+            self.__write__("\n")
+        self.begin("svg", attributes)
+        self.textElement("title", title)
+        self.textElement("desc", description)
+
+    def writeFooter(self) -> None:
+        while (len(self.__open_tags__)):
+            self.end()
+        if (self.indent):
+            self.__write__("\n")
+    #
+    # stylesheet with one class per passed inline-style (with optimization and 'styleClasses' only),
+    # elements using one of these styles get its class instead of the style-attribute afterwards
+    #
+    # has to be written before the elements (right after the header), as not every reader applies
+    # stylesheets to elements that precede them
+    #
+    def writeStyleSheet(self, styles : list[str]) -> None:
+        if (self.optimization is None or not self.optimization.styleClasses or not len(styles)):
+            return
+        self.__fragment_key__ = None
+        for style in styles:
+            self.__style_classes__.setdefault(compactStyle(style, self.optimization.precision), f"s{len(self.__style_classes__)}")
+        rules : str = "".join(f".{name}{{{style}}}" for style, name in self.__style_classes__.items())
+        if (self.indent):
+            self.__write__("\n" + "\t" * self.__depth__, 0)
+        self.__write__(f"<style>{escape(rules)}</style>", 0)
+    #
+    # element-level
+    #
+    def begin(self, tag : str, attributes : dict[str, str] | None = None) -> None:
+        self.__newline__()
+        self.__write__(f"<{tag}{formatAttributes(attributes if (attributes is not None) else {})}>")
+        self.__open_tags__.append(tag)
+        self.__depth__ += 1
+
+    def end(self) -> None:
+        tag : str = self.__open_tags__.pop()
+        self.__depth__ -= 1
+        self.__newline__()
+        self.__write__(f"</{tag}>")
+
+    def element(self, tag : str, attributes : dict[str, str]) -> None:
+        self.__newline__()
+        self.__write__(f"<{tag}")
+        self.__element_end__(attributes)
+
+    #
+    # write the element(s) of 'shape' (see Shape.writeSVG()), the text is kept on the shape and written
+    # again as it is by later exports, until the shape is marked dirty (members of groups are reused
+    # one by one, so a changed member only re-serializes itself and the groups around it)
+    #
+    # text is only reused by writers set up the same way (indentation, optimization, style-classes), shapes
+    # writing <use>-elements are always written again, as only the first <use> of a symbol defines it
+    #
+    def writeShape(self, shape) -> None:
+        key : tuple = self.__shape_key__()
+        fragment : tuple | None = shape.__svg_fragment__
+        if (fragment is not None and fragment[0] == key):
+            self.__write_fragments__([fragment])
+            return
+        outermost : bool = self.__captured__ is None
+        if (outermost):
+            self.__captured__ = []
+        start : int = len(self.__captured__)
+        counts : tuple[int, int, int, int] = (self.__plain_characters__, self.__rounded_numbers__,
+                                              self.__encoded_polygons__, self.__symbol_lookups__)
+        try:
+            shape.writeSVG(self)
+            if (self.__symbol_lookups__ == counts[3]):
+                shape.__svg_fragment__ = (key, "".join(self.__captured__[start:]), self.__plain_characters__ - counts[0],
+                                          self.__rounded_numbers__ - counts[1], self.__encoded_polygons__ - counts[2])
+        finally:
+            if (outermost):
+                self.__captured__ = None
+
+    #
+    # writeShape() for every shape, runs of reused text are written in pieces of about 'bufferSize' at once
+    #
+    def writeShapes(self, shapes : list) -> None:
+        key : tuple = self.__shape_key__()
+        run : list[tuple] = []
+        run_length : int = 0
+        for shape in shapes:
+            fragment : tuple | None = shape.__svg_fragment__
+            if (fragment is not None and fragment[0] == key):
+                run.append(fragment)
+                run_length += len(fragment[1])
+                if (run_length < SVGWriter.bufferSize):
+                    continue
+                self.__write_fragments__(run)
+            else:
+                self.__write_fragments__(run)
+                self.writeShape(shape)
+            run = []
+            run_length = 0
+        self.__write_fragments__(run)
+
+    def __write_fragments__(self, fragments : list[tuple]) -> None:
+        if not (len(fragments)):
+            return
+        self.__write__("".join([fragment[1] for fragment in fragments]), sum([fragment[2] for fragment in fragments]))
+        self.__rounded_numbers__ += sum([fragment[3] for fragment in fragments])
+        self.__encoded_polygons__ += sum([fragment[4] for fragment in fragments])
+        self.reusedFragments += len(fragments)
+
+    def __shape_key__(self) -> tuple:
+        if (self.__fragment_key__ is None):
+            optimization : SVGOptimization | None = self.optimization
+            self.__fragment_key__ = ((None if (optimization is None) else (optimization.precision, optimization.pathPolygons)),
+                                     tuple(self.__style_classes__.items()))
+        return (self.__fragment_key__, self.__depth__ if (self.indent) else -1,
+                len(self.__inherit_style__) > 0 and self.__inherit_style__[-1])
+    #
+    # symbols hold content written once and placed any number of times by <use>-elements (see InstanceShape),
+    # 'key' is what the content was written for (e.g. the master-shape), with 'inheritStyle' the style-attributes
+    # of the content are left out, so it is drawn in the style of each <use>
+    #
+    def symbolId(self, key : object) -> str | None:
+        self.__symbol_lookups__ += 1
+        return self.__symbols__.get(key)
+
+    def beginSymbol(self, key : object, inheritStyle : bool) -> str:
+        name : str = f"symbol{len(self.__symbols__)}"
+        self.__symbols__[key] = name
+        self.begin("symbol", { "id" : name, "overflow" : "visible" })
+        self.__inherit_style__.append(inheritStyle)
+        return name
+
+    def endSymbol(self) -> None:
+        self.__inherit_style__.pop()
+        self.end()
+
+    def textElement(self, tag : str, text : str) -> None:
+        self.__newline__()
+        self.__write__(f"<{tag}>{escape(text)}</{tag}>")
+    #
+    # element with a 'points'-attribute (polygon/polyline) whose vertices are formatted
+    # chunk by chunk, so no string containing all coordinates is ever built
+    #
+    def pointsElement(self, tag : str, polygon : QPolygonF, attributes : dict[str, str]) -> None:
+        self.__newline__()
+        if (self.optimization is not None and self.optimization.pathPolygons and tag == "polygon"):
+            self.__path_element__(polygon, attributes)
+            return
+        precision : int | None = None if (self.optimization is None) else self.optimization.precision
+        self.__write__(f"<{tag} points=\"")
+        count : int = polygon.size()
+        for start in range(0, count, SVGWriter.pointsPerChunk):
+            points : list = polygon.mid(start, SVGWriter.pointsPerChunk)
+            plain : str = " ".join([f"{point.x()!r},{point.y()!r}" for point in points])
+            if (precision is None):
+                self.__write__(plain)
+            else:
+                self.__write__(" ".join([f"{formatNumber(point.x(), precision)},{formatNumber(point.y(), precision)}" for point in points]), len(plain))
+                self.__rounded_numbers__ += 2 * len(points)
+            if (start + SVGWriter.pointsPerChunk < count):
+                self.__write__(" ")
+        self.__write__("\"")
+        self.__element_end__(attributes)
+    #
+    # path-element of several closed rings (see CompoundPolygon), with optimization and 'pathPolygons'
+    # every ring is written relative like a single polygon (see __path_element__()), otherwise with
+    # absolute coordinates
+    #
+    def ringsElement(self, rings : list[QPolygonF], attributes : dict[str, str]) -> None:
+        self.__newline__()
+        self.__write__("<path d=\"")
+        if (self.optimization is not None and self.optimization.pathPolygons):
+            start : tuple[float, float] = (0.0, 0.0)
+            for i, ring in enumerate(rings):
+                # 'M', 'Z' and the space between two rings of the plain path-data
+                start = self.__relative_ring__(ring, start, 2 + (i > 0))
+            self.__encoded_polygons__ += len(rings)
+        else:
+            precision : int | None = None if (self.optimization is None) else self.optimization.precision
+            for i, ring in enumerate(rings):
+                self.__write__(" M" if (i > 0) else "M")
+                for start in range(0, ring.size(), SVGWriter.pointsPerChunk):
+                    points : list = ring.mid(start, SVGWriter.pointsPerChunk)
+                    if (start > 0):
+                        self.__write__(" ")
+                    plain : str = " ".join([f"{point.x()!r},{point.y()!r}" for point in points])
+                    if (precision is None):
+                        self.__write__(plain)
+                    else:
+                        self.__write__(" ".join([f"{formatNumber(point.x(), precision)},{formatNumber(point.y(), precision)}" for point in points]), len(plain))
+                        self.__rounded_numbers__ += 2 * len(points)
+                self.__write__("Z")
+        self.__write__("\"")
+        self.__element_end__(attributes)
+    #
+    # polygon as path-element, the first vertex is a relative moveto from the origin and all further
+    # vertices are implicit relative linetos, so only the (short) offsets between vertices are written
+    #
+    # with a precision the vertices are rounded before taking differences, so rounding-errors don't add up
+    #
+    def __path_element__(self, polygon : QPolygonF, attributes : dict[str, str]) -> None:
+        self.__write__("<path d=\"", len("<polygon points=\""))
+        self.__relative_ring__(polygon, (0.0, 0.0), 0)
+        self.__write__("\"")
+        self.__encoded_polygons__ += 1
+        self.__element_end__(attributes)
+    #
+    # one closed ring as relative path-data ('m...z'), 'origin' is the current point before it (in rounded
+    # units), which after a 'z' is the first vertex of the previous ring, the first vertex of this ring is
+    # returned for the next one
+    #
+    # 'plainExtra' is what the ring adds to the plain document besides its vertices
+    #
+    def __relative_ring__(self, polygon : QPolygonF, origin : tuple[float, float], plainExtra : int) -> tuple[float, float]:
+        precision : int | None = self.optimization.precision
+        scale : float = 10.0 ** precision if (precision is not None) else 1.0
+        self.__write__("m", 0)
+        previous_x, previous_y = origin
+        start : tuple[float, float] = origin
+        first : bool = True
+        count : int = polygon.size()
+        for chunk in range(0, count, SVGWriter.pointsPerChunk):
+            points : list = polygon.mid(chunk, SVGWriter.pointsPerChunk)
+            plain_length : int = len(" ".join([f"{point.x()!r},{point.y()!r}" for point in points])) + (chunk > 0)
+            parts : list[str] = []
+            for point in points:
+                x : float = point.x()
+                y : float = point.y()
+                if (precision is not None):
+                    x = round(x * scale)
+                    y = round(y * scale)
+                if (not first and x == previous_x and y == previous_y):
+                    continue # repeated vertex
+                if (first):
+                    start = (x, y)
+                for offset in (x - previous_x, y - previous_y):
+                    number : str = formatNumber(offset / scale, precision)
+                    # a minus-sign already separates two numbers
+                    if (not first and not number.startswith("-")):
+                        parts.append(" ")
+                    parts.append(number)
+                    first = False
+                previous_x = x
+                previous_y = y
+            self.__write__("".join(parts), plain_length)
+        self.__write__("z", plainExtra)
+        if (precision is not None):
+            self.__rounded_numbers__ += 2 * count
+        return start
+
+    def __element_end__(self, attributes : dict[str, str]) -> None:
+        if (len(self.__inherit_style__) and self.__inherit_style__[-1]):
+            attributes = { key : value for key, value in attributes.items() if key != "style" }
+        plain : str = f"{formatAttributes(attributes)} />"
+        if (self.optimization is None):
+            self.__write__(plain)
+            return
+        self.__write__(f"{formatAttributes(self.__optimize_attributes__(attributes))} />", len(plain))
+    #
+    # rounded coordinate-attributes and style-attributes replaced by stylesheet-classes
+    #
+    def __optimize_attributes__(self, attributes : dict[str, str]) -> dict[str, str]:
+        result : dict[str, str] = {}
+        precision : int | None = self.optimization.precision
+        for key, value in attributes.items():
+            if (key == "style"):
+                style : str = compactStyle(value, precision)
+                if (style in self.__style_classes__):
+                    result["class"] = self.__style_classes__[style]
+                else:
+                    result["style"] = style
+            elif (key in SVGWriter.coordinateAttributes and precision is not None):
+                result[key] = formatNumber(float(value), precision)
+                self.__rounded_numbers__ += 1
+            elif (key == "transform" and precision is not None):
+                result[key] = __decimal_pattern__.sub(lambda match : formatNumber(float(match.group(0)), precision), value)
+                self.__rounded_numbers__ += len(__decimal_pattern__.findall(value))
+            else:
+                result[key] = value
+        return result
+    #
+    # fallback for shapes that only provide toSVG(), the (small) subtree of one shape is serialized at once
+    #
+    def elementTree(self, element : XMLTree.Element) -> None:
+        if (self.indent):
+            XMLTree.indent(element, space="\t", level=self.__depth__)
+        self.__newline__()
+        self.__write__(XMLTree.tostring(element, encoding="unicode"))
+
+    def __newline__(self) -> None:
+        if (self.indent):
+            self.__write__("\n" + "\t" * self.__depth__)
+    #
+    # 'plainLength' is the length the text would have had without optimization (if it differs)
+    #
+    def __write__(self, text : str, plainLength : int | None = None) -> None:
+        self.__characters__ += len(text)
+        self.__plain_characters__ += len(text) if (plainLength is None) else plainLength
+        if (self.__captured__ is not None):
+            self.__captured__.append(text)
+        self.__buffer__.append(text)
+        self.__buffered__ += len(text)
+        if (self.__buffered__ >= SVGWriter.bufferSize):
+            self.flush()
+#
+# replace the characters xml reserves (and any additional 'entities') by their entity-references
+#
+# same as xml.sax.saxutils.escape(), which is not used as importing it pulls in urllib, http and
+# email and noticeably slows down the start of the editor
+#
+def escape(text : str, entities : dict[str, str] | None = None) -> str:
+    text = text.replace("&", "&amp;").replace(">", "&gt;").replace("<", "&lt;")
+    if (entities is not None):
+        for key, value in entities.items():
+            text = text.replace(key, value)
+    return text
+#
+# format attributes as ' key="value" ...' with xml-escaped values
+#
+__attribute_entities__ : dict[str, str] = { "\"" : "&quot;" }
+
+def formatAttributes(attributes : dict[str, str]) -> str:
+    return "".join(f" {key}=\"{escape(str(value), __attribute_entities__)}\"" for key, value in attributes.items())
+#
+# shortest form of a number with at most 'precision' decimal places (all places if None),
+# without trailing zeros and leading zero ('0.50' -> '.5')
+#
+def formatNumber(value : float, precision : int | None = None) -> str:
+    text : str = repr(value) if (precision is None) else f"{value:.{precision}f}"
+    if ("." in text and not ("e" in text)):
+        text = text.rstrip("0").rstrip(".")
+    if (text.startswith("0.")):
+        text = text[1:]
+    elif (text.startswith("-0.")):
+        text = "-" + text[2:]
+    if (text in ("", "-", "-0")):
+        text = "0"
+    return text
+
+__rgb_pattern__ : re.Pattern = re.compile(r"rgb\((\d+),(\d+),(\d+)\)")
+__decimal_pattern__ : re.Pattern = re.compile(r"\d*\.\d+")
+#
+# inline-style with hex-colors ('#rgb' where possible) and shortened numbers
+#
+def compactStyle(style : str, precision : int | None = None) -> str:
+    def hex_color(match : re.Match) -> str:
+        text : str = "".join(f"{int(channel):02x}" for channel in match.groups())
+        if (text[0] == text[1] and text[2] == text[3] and text[4] == text[5]):
+            text = text[0] + text[2] + text[4]
+        return "#" + text
+    style = __rgb_pattern__.sub(hex_color, style)
+    return __decimal_pattern__.sub(lambda match : formatNumber(float(match.group(0)), precision), style)
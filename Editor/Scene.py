@@ -1,11 +1,20 @@
 
 
-from PySide6.QtGui import QColor, QPainter, QImage, QPolygonF
-from PySide6.QtCore import QPointF, QSizeF, QSize, QRect
+from PySide6.QtGui import QColor, QPainter, QImage, QTransform, QBrush, QPen
+from PySide6.QtCore import QPointF, QSize, QRect, QRectF
 from Editor.Shapes.Shape import Shape
-from Editor.Shapes.Primitives import Rectangle, Ellipse, Circle, Star, Polygon, Triangle
 from Editor.Shapes.Aggregate import AggregateShape
-from Editor.Shapes.DeformShapes import MultiSubdividePolygon, DeformPolygon
+from Editor.Shapes.Instance import InstanceShape, instanceOf, repeatInstance
+from Editor.SceneIndex import SceneIndex
+from Editor.SceneListener import SceneListener
+from Editor.RenderQuality import RenderQuality
+
+from math import sqrt
+from typing import TYPE_CHECKING
+if (TYPE_CHECKING):
+    from Editor.SceneInspector import SceneReport
+    from Editor.Flatten import FlattenReport
+    from Editor.Overlaps import OverlapTracker
 
 #
 # scene class 
@@ -21,99 +30,354 @@ class Scene:
     def __init__(self) -> None:
         self.attachedShapes : list[Shape] = []
         self.backgroundColor : QColor = QColor(255, 255, 255)
+        # spatial-index over the bounding-boxes of all attached shapes for fast picking
+        self.index : SceneIndex = SceneIndex()
+        self.__next_z_index__ : int = 0
+        self.__next_uid__ : int = 1
+        # observers that are notified about every edit of the scene
+        self.listeners : list[SceneListener] = []
+        # increased with every change of the scene's content, so renderers can tell whether
+        # a previously drawn frame is still valid
+        self.revision : int = 0
+        # created by the first overlap-query (see the overlaps-property)
+        self.__overlaps__ : "OverlapTracker | None" = None
 
     def attach_object(self, object : Shape) -> None:
         self.attachedShapes.append(object)
+        self.__assign_z_index__(object)
+        self.__assign_uids__(object)
+        self.index.insert(object)
+        self.revision += 1
+        for listener in self.listeners:
+            listener.shapesAttached([object])
     
-    # append list of elements
+    # append list of elements (the spatial-index is rebuilt once if that is cheaper than inserting one by one)
     def attach_objects(self, objects : list[Shape]) -> None:
         for obj in objects:
             self.attachedShapes.append(obj)
+            self.__assign_z_index__(obj)
+            self.__assign_uids__(obj)
+        if (len(objects) > len(self.index)):
+            self.index.rebuild(self.attachedShapes)
+        else:
+            for obj in objects:
+                self.index.insert(obj)
+        self.revision += 1
+        for listener in self.listeners:
+            listener.shapesAttached(objects)
 
     def moveToFront(self, shape : Shape):
-        for i in range(0, len(self.attachedShapes)):
-            if (self.attachedShapes[i] is shape):
-                self.attachedShapes.append(self.attachedShapes[i])
-                self.attachedShapes.pop(i)
+        if not (shape in self.attachedShapes):
+            return
+        self.reorderShape(shape, len(self.attachedShapes) - 1, self.__next_z_index__)
+        self.__next_z_index__ += 1
+    #
+    # move a shape to position 'index' of the drawing-order and give it the passed z-index
+    # ('currentIndex' can be passed if the current position of the shape is already known)
+    #
+    def reorderShape(self, shape : Shape, index : int, zIndex : int, currentIndex : int | None = None) -> None:
+        previous_index : int
+        if (currentIndex is not None and currentIndex < len(self.attachedShapes) and self.attachedShapes[currentIndex] is shape):
+            previous_index = currentIndex
+        else:
+            previous_index = self.attachedShapes.index(shape)
+        previous_z_index : int = shape.__z_index__
+        self.attachedShapes.pop(previous_index)
+        self.attachedShapes.insert(index, shape)
+        shape.__z_index__ = zIndex
+        self.revision += 1
+        for listener in self.listeners:
+            listener.shapeReordered(shape, index, previous_index, previous_z_index)
+    #
+    # remove shapes from the scene (shapes attached last are searched first, as
+    # detaching usually reverts attaching them)
+    #
+    def detach_objects(self, objects : list[Shape]) -> None:
+        for obj in objects:
+            for i in range(len(self.attachedShapes) - 1, -1, -1):
+                if (self.attachedShapes[i] is obj):
+                    self.attachedShapes.pop(i)
+                    break
+            self.index.remove(obj)
+        self.revision += 1
+        for listener in self.listeners:
+            listener.shapesDetached(objects)
+
+    #
+    # apply one affine transformation to a whole set of shapes at once
+    #
+    # only bounding-boxes (and vertex-data) are transformed here, the painterpaths of all
+    # affected shapes are regenerated together during the next update()
+    #
+    def transformShapes(self, shapes : list[Shape], transform : QTransform) -> None:
+        for shape in shapes:
+            shape.applyTransform(transform)
+        self.revision += 1
+        for listener in self.listeners:
+            listener.shapesTransformed(shapes, transform)
+    #
+    # to be called by editor-components after they changed bounding-boxes of shapes directly
+    # (e.g. at the end of a drag, with the bounding-boxes from before it), so listeners can pick up the edit
+    #
+    def notifyShapesEdited(self, shapes : list[Shape], previous : list[QRectF]) -> None:
+        for listener in self.listeners:
+            listener.shapesEdited(shapes, previous)
+    #
+    # set the bounding-boxes of shapes directly (e.g. to revert an edit)
+    #
+    def setBoundingBoxes(self, shapes : list[Shape], boundingBoxes : list[QRectF]) -> None:
+        previous : list[QRectF] = [QRectF(shape.boundingBox) for shape in shapes]
+        for shape, bounding_box in zip(shapes, boundingBoxes):
+            shape.__bounding_box__ = QRectF(bounding_box)
+            shape.markDirty()
+        self.revision += 1
+        self.notifyShapesEdited(shapes, previous)
+
+    #
+    # replace all attached shapes by 'shapes' (in drawing-order) at once
+    #
+    # shapes keep the z-indices and uids they have, so a shape that takes the place of others
+    # should be given the z-index of one of them, shapes without a uid are assigned one
+    #
+    def replaceAttached(self, shapes : list[Shape]) -> None:
+        previous : list[Shape] = self.attachedShapes
+        self.attachedShapes = list(shapes)
+        for shape in self.attachedShapes:
+            self.__assign_uids__(shape)
+            self.__next_z_index__ = max(self.__next_z_index__, shape.__z_index__ + 1)
+        self.index.rebuild(self.attachedShapes)
+        self.revision += 1
+        for listener in self.listeners:
+            listener.shapesReplaced(previous)
+
+    def __assign_z_index__(self, shape : Shape) -> None:
+        shape.__z_index__ = self.__next_z_index__
+        self.__next_z_index__ += 1
+
+    # shapes (and group-members) keep uids they already have (e.g. from a scene-file)
+    def __assign_uids__(self, shape : Shape) -> None:
+        if (shape.__uid__ == 0):
+            shape.__uid__ = self.__next_uid__
+        self.__next_uid__ = max(self.__next_uid__, shape.__uid__ + 1)
+        if (isinstance(shape, AggregateShape)):
+            for child in shape.children:
+                self.__assign_uids__(child)
+        elif (isinstance(shape, InstanceShape)):
+            self.__assign_uids__(shape.master)
     #
     # updates each shape in the scene, possibly performing vertex-recalculations
     #
-    def update(self) -> None:
+    # with an 'area' (e.g. the visible part of the scene) only the shapes inside it are updated, the others
+    # are only moved to their current bounding-boxes in the index, so shapes read lazily from a scene-file
+    # (see Polygon.fromVertexData()) keep their vertices unread until they are shown or queried
+    #
+    def update(self, area : QRectF | None = None) -> None:
+        if (area is None):
+            self.refresh(self.attachedShapes)
+            return
         for shape in self.attachedShapes:
-            shape.update()
+            if (shape.dirty):
+                self.index.update(shape)
+        self.refresh([shape for shape in self.index.queryRect(area) if shape.dirty])
+    #
+    # update only the passed (attached) shapes, e.g. the few that changed since an index was last queried
+    #
+    def refresh(self, shapes : list[Shape]) -> None:
+        for shape in shapes:
+            if (shape.refresh()):
+                self.__reindex__(shape)
+                self.revision += 1
+
+    #
+    # shapes whose vertex-data was changed for display only (see SceneListener.shapesDeformed()), they are
+    # re-indexed right away, their painterpaths are updated with the next frame they are shown in
+    #
+    def notifyShapesDeformed(self, shapes : list[Shape]) -> None:
+        for shape in shapes:
+            self.__reindex__(shape)
+        self.revision += 1
+        for listener in self.listeners:
+            listener.shapesDeformed(shapes)
+
+    # groups fit their children into their own bounding-box, so those have to be re-indexed as well
+    def __reindex__(self, shape : Shape) -> None:
+        self.index.update(shape)
+        if (isinstance(shape, AggregateShape)):
+            for child in shape.children:
+                self.__reindex__(child)
+    #
+    # find the topmost shape that is exactly hit by the passed point
+    #
+    # the spatial-index only returns shapes whose bounding-boxes contain the point,
+    # only those are tested against their actual painterpaths (from the front to the back)
+    #
+    def findShapeAt(self, point : QPointF, tolerance : float = 0.0) -> Shape | None:
+        candidates : list[Shape] = self.index.queryPoint(point, tolerance)
+        candidates.sort(key=lambda shape : shape.__z_index__, reverse=True)
+        for shape in candidates:
+            if (shape.refresh()): # painterpath could still be outdated if no frame was drawn since the last edit
+                self.__reindex__(shape)
+                self.revision += 1
+            if (shape.containsPoint(point, tolerance)):
+                return shape
+        return None
     #
     # render the entire scene using the passed painter onto the passed image
     #
-    def draw(self, painter : QPainter, image : QImage) -> None:
+    # with a draft-quality (see Editor/RenderQuality.py) small shapes and thin outlines are simplified
+    #
+    def draw(self, painter : QPainter, image : QImage, quality : RenderQuality | None = None) -> None:
         image.fill(self.backgroundColor)
+        if (quality is not None and quality.draft):
+            zoom : float = sqrt(abs(painter.worldTransform().determinant()))
+            for shape in self.attachedShapes:
+                drawDraft(shape, painter, quality, zoom)
+            return
         for shape in self.attachedShapes:
             shape.draw(painter)
+    #
+    # render only the shapes whose bounding-boxes intersect the passed world-area (in drawing-order),
+    # the painter is expected to be clipped to that area and the area to be cleared already
+    #
+    def drawArea(self, painter : QPainter, area : QRectF, quality : RenderQuality | None = None) -> None:
+        shapes : list[Shape] = sorted(self.index.queryRect(area), key=lambda shape : shape.__z_index__)
+        if (quality is not None and quality.draft):
+            zoom : float = sqrt(abs(painter.worldTransform().determinant()))
+            for shape in shapes:
+                drawDraft(shape, painter, quality, zoom)
+            return
+        for shape in shapes:
+            shape.draw(painter)
+
+    #
+    # find all shapes within the passed rectangle, either entirely contained or just touched by it
+    #
+    # candidates come from the spatial-index, contained shapes can be decided on their bounds alone,
+    # touched shapes are additionally tested exactly against their painterpaths
+    #
+    def findShapesInRect(self, rect : QRectF, contained : bool) -> set[Shape]:
+        area : QRectF = rect.normalized()
+        result : set[Shape] = set()
+        for shape in self.index.queryRect(area):
+            if (shape.refresh()):
+                self.__reindex__(shape)
+                self.revision += 1
+            if (contained):
+                bounds : tuple[float, float, float, float] = self.index.bounds(shape)
+                if (area.left() <= bounds[0] and bounds[2] <= area.right() and area.top() <= bounds[1] and bounds[3] <= area.bottom()):
+                    result.add(shape)
+            elif (shape.intersectsRect(area)):
+                result.add(shape)
+        return result
 
     def clear(self) -> None:
         self.attachedShapes.clear()
+        self.index.clear()
+        self.revision += 1
+        for listener in self.listeners:
+            listener.sceneCleared()
+    #
+    # total memory in bytes held by render-caches of all shapes in the scene
+    # (shapes that are part of multiple groups or also directly attached are only counted once)
+    #
+    def cacheMemory(self) -> int:
+        total : int = 0
+        visited : set[int] = set()
+        stack : list[Shape] = list(self.attachedShapes)
+        while (len(stack)):
+            shape : Shape = stack.pop()
+            if (id(shape) in visited):
+                continue
+            visited.add(id(shape))
+            total += shape.cacheBytes()
+            if (isinstance(shape, AggregateShape)):
+                stack.extend(shape.children)
+            elif (isinstance(shape, InstanceShape)):
+                stack.append(shape.master)
+        return total
+    #
+    # per shape-type counts, group-depths, cache-sizes and largest shapes of the scene
+    # (see Editor/SceneInspector.py)
+    #
+    def inspect(self, largest : int = 10) -> "SceneReport":
+        from Editor.SceneInspector import inspectScene
+        return inspectScene(self, largest)
+    #
+    # merge abutting/overlapping shapes of the same style into compound-polygons (see Editor/Flatten.py)
+    #
+    def flatten(self, workers : int | None = None) -> "FlattenReport":
+        from Editor.Flatten import flattenScene
+        return flattenScene(self, workers)
+    #
+    # replace attached 'shapes' by instances of themselves (see Editor/Shapes/Instance.py) and place 'count'
+    # further instances of each in a row to its right, all in one step (undone at once), returns the new instances
+    #
+    # shapes that are also members of groups are skipped, as edits of the group would move every instance
+    #
+    def repeatAsInstances(self, shapes : list[Shape], count : int, gap : float = 0.0) -> list[InstanceShape]:
+        replaced : dict[Shape, InstanceShape] = {}
+        repeats : list[InstanceShape] = []
+        for shape in shapes:
+            if (len(shape.__parent_groups__) or shape in replaced):
+                continue
+            instance : InstanceShape = instanceOf(shape)
+            replaced[shape] = instance
+            for repeat in repeatInstance(instance, count, gap):
+                repeat.__z_index__ = self.__next_z_index__ + len(repeats)
+                repeats.append(repeat)
+        if not (len(replaced)):
+            return []
+        self.replaceAttached([replaced.get(shape, shape) for shape in self.attachedShapes] + repeats)
+        return [instance for shape, instance in replaced.items() if instance is not shape] + repeats
+    #
+    # all pairs of attached shapes that overlap, by their bounding-boxes or with 'exact' by their visible
+    # areas (see Editor/Overlaps.py), repeated queries only look at the shapes that changed since
+    #
+    def overlappingPairs(self, exact : bool = False) -> list[tuple[Shape, Shape]]:
+        return self.overlaps.pairs(exact)
 
-def exampleScene1(scene : Scene) -> None:
-    scene.clear()
-
-    rectangle_1 : Rectangle = Rectangle(QPointF(100.0, 100.0), QSizeF(100.0, 100.0))
-    rectangle_1.__show_fill_body__ = False
-    rectangle_1.__outline_color__ = QColor(0, 0, 255)
-    rectangle_1.__outline_width__ = 2.0
-
-    circle_1 : Circle = Circle(QPointF(150.0, 150.0), 50.0)
-    circle_1.__show_fill_body__ = False
-    circle_1.__outline_color__ = QColor(255, 0, 0)
-    circle_1.__outline_width__ = 2.0
-
-    scene.attach_objects([rectangle_1, circle_1])
-
-def exampleScene2(scene : Scene) -> None:
-    scene.clear()
-
-    padding : float = 5.0
-    rectangles : list[Rectangle] = [Rectangle(QPointF(200.0 + padding, 100.0), QSizeF(100.0, 100.0)),
-                                    Rectangle(QPointF(300.0 + 2 * padding, 100.0), QSizeF(100.0, 100.0)),
-                                    Rectangle(QPointF(100.0, 200.0 + padding), QSizeF(100.0, 100.0)),
-                                    Rectangle(QPointF(200.0 + padding, 300.0 + 2 * padding), QSizeF(100.0, 100.0)),
-                                    Rectangle(QPointF(300.0 + 2 * padding, 300.0 + 2 * padding), QSizeF(100.0, 100.0)),
-                                    Rectangle(QPointF(400.0 + 3 * padding, 200.0 + padding), QSizeF(100.0, 100.0))]
-
-    circles : list[Circle] = [Circle(QPointF(150.0, 150.0), 50.0), 
-                                Circle(QPointF(450.0 + 3 * padding, 150.0), 50.0), 
-                                Circle(QPointF(450.0 + 3 * padding, 350.0 + 2 * padding), 50.0), 
-                                Circle(QPointF(150.0, 350.0 + 2 * padding), 50.0)]
-
-    for rect in rectangles:
-        rect.__fill_color__ = QColor(0, 0, 255)
-        rect.__outline_color__ = QColor(255, 0, 0)
-        rect.__outline_width__ = 2.0
-
-    for circ in circles:
-        circ.__fill_color__ = QColor(255, 0, 0)
-        circ.__outline_color__ = QColor(0, 0, 255)
-        circ.__outline_width__ = 2.0
-
-    scene.attach_objects(rectangles)
-    scene.attach_objects(circles)
+    @property
+    def overlaps(self) -> "OverlapTracker":
+        if (self.__overlaps__ is None):
+            from Editor.Overlaps import OverlapTracker
+            self.__overlaps__ = OverlapTracker(self)
+        return self.__overlaps__
 
 #
-# example scene 2, but all shapes are converted to polygons, subdivided and deformed
+# draw a shape with draft-quality, 'zoom' is the scale of the painter's transformation
 #
-def exampleScene3(scene : Scene) -> None:
-    scene.clear()
-    example_scene_2 : Scene = Scene()
-    exampleScene2(example_scene_2)
-    
-    for shape in example_scene_2.attachedShapes:
-        shape.update()
-
-        polygon : QPolygonF = shape.describeShape()
-        polygon_subdivided : QPolygonF = MultiSubdividePolygon(polygon, 2)
-        polygon_deformed : QPolygonF = DeformPolygon(polygon_subdivided, 20.0, 0.2, 0.0)
-        polygon_shape : Polygon = Polygon(polygon_deformed.toList())
-
-        polygon_shape.__fill_color__ = shape.__fill_color__
-        polygon_shape.__outline_color__ = shape.__outline_color__
-        polygon_shape.__outline_width__ = shape.__outline_width__
+# shapes smaller than 'quality.lodPixels' on screen become a rectangle in their fill- (or outline-)color,
+# outlines thinner than 'quality.minStrokePixels' are left out, groups draw their members directly
+#
+def drawDraft(shape : Shape, painter : QPainter, quality : RenderQuality, zoom : float) -> None:
+    __draw_draft_body__(shape, painter, quality, zoom)
+    shape.drawOverlay(painter)
 
-        scene.attach_object(polygon_shape)
\ No newline at end of file
+def __draw_draft_body__(shape : Shape, painter : QPainter, quality : RenderQuality, zoom : float) -> None:
+    if (isinstance(shape, AggregateShape)):
+        for child in shape.children:
+            __draw_draft_body__(child, painter, quality, zoom)
+        return
+    if (isinstance(shape, InstanceShape) and isinstance(shape.master, AggregateShape)):
+        # members of the master are drawn scaled like the instance
+        painter.save()
+        painter.setTransform(shape.transform, True)
+        __draw_draft_body__(shape.master, painter, quality, zoom * shape.__scale__())
+        painter.restore()
+        return
+    bounding_box : QRectF = shape.boundingBox.normalized()
+    if (max(bounding_box.width(), bounding_box.height()) * zoom < quality.lodPixels):
+        if (shape.__show_fill_body__):
+            painter.fillRect(bounding_box, shape.__fill_color__)
+        elif (shape.__outline_width__ > 0):
+            painter.fillRect(bounding_box, shape.__outline_color__)
+        return
+    if (isinstance(shape, InstanceShape)):
+        # the master's painterpath is only replayed, an instance has none of its own
+        shape.drawBody(painter)
+        return
+    if (shape.__show_fill_body__):
+        painter.fillPath(shape.__painterpath__, QBrush(shape.__fill_color__))
+    if (shape.__outline_width__ > 0 and shape.__outline_width__ * zoom >= quality.minStrokePixels):
+        painter.setPen(QPen(shape.__outline_color__, shape.__outline_width__))
+        painter.drawPath(shape.__painterpath__)
@@ -0,0 +1,365 @@
+from PySide6.QtCore import QPointF, QSizeF, QRectF
+from PySide6.QtGui import QColor
+
+from array import array
+from typing import BinaryIO
+
+import mmap
+import os
+import struct
+
+from Editor.Shapes.Shape import Shape
+from Editor.Shapes.Primitives import Rectangle, Ellipse, Circle, Polygon, Triangle, Star, CompoundPolygon
+from Editor.Shapes.Aggregate import AggregateShape
+from Editor.Shapes.Instance import InstanceShape
+
+#
+# native binary scene-format (.vgs)
+#
+# layout (all little-endian):
+#
+#   header          magic, version, table-counts and -offsets, journal-sequence (see __header__)
+#   vertex-section  contiguous float32/float64 x/y-blocks of every (compound-)polygon, 8-byte aligned
+#   shape-table     one fixed-size record per shape (type, bounding-box, style-index, parent-group,
+#                   location of its vertex-block, star-parameters, uid), children always precede their groups
+#   style-table     one record per distinct style (fill-/outline-color, outline-width, fill-flag)
+#   member-table    (group, child) index-pairs in child-order, one group can contain a shape that
+#                   is also attached directly or part of other groups, an instance has its master
+#                   as only member (stored once, however many instances refer to it)
+#   attached-table  indices of all shapes attached to the scene in drawing-order
+#
+# on load the file is memory-mapped and polygons only keep a view onto their vertex-block, which
+# is turned into a QPolygonF the first time it is needed (usually the first draw)
+#
+# files are read in two steps, into plain SceneData (no qt-objects, usable from any thread) and from
+# there into shapes, version-1 files (without uids and sequence-number) can still be read
+#
+
+MAGIC : bytes = b"VGES"
+VERSION : int = 2
+
+class ShapeType:
+    RECTANGLE : int = 1
+    ELLIPSE   : int = 2
+    CIRCLE    : int = 3
+    POLYGON   : int = 4
+    TRIANGLE  : int = 5
+    STAR      : int = 6
+    AGGREGATE : int = 7
+    COMPOUND  : int = 8 # vertex-block holds all rings, each followed by a (nan, nan)-pair
+    INSTANCE  : int = 9 # its only member is the master, the bounding-box can be mirrored
+
+__header__ : struct.Struct = struct.Struct("<4sHHIIIIQQQQQ")
+# magic, version, reserved, shape-count, style-count, member-count, attached-count,
+# shape-table-offset, style-table-offset, member-table-offset, attached-table-offset,
+# sequence-number of the last journal-entry contained in the file (see Editor/Journal.py)
+
+__shape_record__ : struct.Struct = struct.Struct("<BBHIi4dQIIddQ")
+# type, vertex-type ('f'/'d' as byte), reserved, style-index, parent-group-index (-1 if none),
+# bounding-box (x, y, width, height), vertex-offset (relative to the vertex-section), vertex-count,
+# star spike-number, star inner-size (width, height), uid of the shape
+
+__style_record__ : struct.Struct = struct.Struct("<8BdB7x")
+# fill-rgba, outline-rgba, outline-width, show-fill-flag
+
+__member_record__ : struct.Struct = struct.Struct("<II")
+
+__index_record__ : struct.Struct = struct.Struct("<I")
+
+# version 1 had no sequence-number in the header and no uids in the shape-records
+__header_v1__ : struct.Struct = struct.Struct("<4sHHIIIIQQQQ")
+__shape_record_v1__ : struct.Struct = struct.Struct("<BBHIi4dQIIdd")
+
+#
+# shape-record class
+#
+# plain-data description of one shape as it is stored in a scene-file, without any qt-types,
+# so scene-data can be read, modified and written outside of the gui-thread
+#
+# 'boundingBox' is (x, y, width, height), 'style' is the tuple produced by __style_key__, 'vertices'
+# holds flat x/y-floats (polygons only), 'star' is (spike-number, inner-width, inner-height) and
+# 'children' the uids of the members of a group
+#
+class ShapeRecord:
+    __slots__ = ("uid", "type", "boundingBox", "style", "vertices", "star", "children")
+
+    def __init__(self, uid : int, type : int, boundingBox : tuple, style : tuple,
+                 vertices = None, star : tuple = (0, 0.0, 0.0), children : list[int] | None = None) -> None:
+        self.uid : int = uid
+        self.type : int = type
+        self.boundingBox : tuple[float, float, float, float] = boundingBox
+        self.style : tuple = style
+        self.vertices = vertices
+        self.star : tuple[int, float, float] = star
+        self.children : list[int] = list(children) if (children is not None) else []
+#
+# scene-data class
+#
+# the contents of a scene-file: all shape-records by uid and the uids of the attached shapes in
+# drawing-order, 'sequence' is the number of the last journal-entry already applied to it
+#
+class SceneData:
+    def __init__(self) -> None:
+        self.records : dict[int, ShapeRecord] = {}
+        self.attached : list[int] = []
+        self.sequence : int = 0
+#
+# write all shapes of 'shapes' (and everything they contain) into a scene-file
+#
+# 'vertexType' selects the precision of the vertex-blocks, 'f' (float32) or 'd' (float64)
+#
+def writeSceneFile(shapes : list[Shape], file : os.path, vertexType : str = "d") -> None:
+    writeSceneData(sceneDataFromShapes(shapes), file, vertexType)
+#
+# read a scene-file, returns the attached shapes in drawing-order
+#
+# vertex-blocks stay memory-mapped until the polygons using them are materialized
+#
+def readSceneFile(file : os.path) -> list[Shape]:
+    return shapesFromSceneData(readSceneData(file))
+
+def writeSceneData(data : SceneData, file : os.path, vertexType : str = "d") -> None:
+    if not (vertexType in ("f", "d")):
+        raise AttributeError("vertexType must be 'f' or 'd'")
+    # children are numbered before their groups, so groups can be constructed from them when loading,
+    # records no longer reachable from an attached shape are dropped
+    ordered : list[ShapeRecord] = []
+    indices : dict[int, int] = {}
+    for uid in data.attached:
+        __number_records__(data.records, uid, ordered, indices)
+
+    styles : dict[tuple, int] = {}
+    records : list[bytes] = []
+    members : list[tuple[int, int]] = []
+    parents : dict[int, int] = {}
+    for record in ordered:
+        for child in record.children:
+            members.append((indices[record.uid], indices[child]))
+            parents.setdefault(indices[child], indices[record.uid])
+
+    # written next to the target first and moved over it at the end: polygons read from the target
+    # may still be mapped to it (see readSceneFile()), truncating it would pull their pages away
+    temporary : os.path = f"{file}.tmp"
+    with open(temporary, "wb") as stream:
+        stream.write(b"\0" * __header__.size) # patched at the end
+        vertex_section : int = stream.tell()
+        for index, record in enumerate(ordered):
+            style_index : int = styles.setdefault(tuple(record.style), len(styles))
+            vertex_offset : int = 0
+            vertex_count : int = 0
+            if (record.vertices is not None):
+                vertex_offset = stream.tell() - vertex_section
+                vertex_count = __write_vertices__(stream, record.vertices, vertexType)
+            records.append(__shape_record__.pack(record.type, ord(vertexType), 0,
+                                                 style_index, parents.get(index, -1),
+                                                 *record.boundingBox,
+                                                 vertex_offset, vertex_count,
+                                                 *record.star, record.uid))
+
+        shape_table : int = stream.tell()
+        stream.write(b"".join(records))
+        style_table : int = stream.tell()
+        for style in styles:
+            stream.write(__style_record__.pack(*style))
+        member_table : int = stream.tell()
+        for member in members:
+            stream.write(__member_record__.pack(*member))
+        attached_table : int = stream.tell()
+        for uid in data.attached:
+            stream.write(__index_record__.pack(indices[uid]))
+
+        stream.seek(0)
+        stream.write(__header__.pack(MAGIC, VERSION, 0, len(ordered), len(styles), len(members), len(data.attached),
+                                     shape_table, style_table, member_table, attached_table, data.sequence))
+    os.replace(temporary, file)
+
+def readSceneData(file : os.path) -> SceneData:
+    with open(file, "rb") as stream:
+        mapping : mmap.mmap = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+    view : memoryview = memoryview(mapping)
+
+    magic, version = struct.unpack_from("<4sH", view, 0)
+    if (magic != MAGIC):
+        raise ValueError("not a VGEditor scene-file")
+    if (version > VERSION):
+        raise ValueError(f"scene-file version {version} is not supported")
+    data : SceneData = SceneData()
+    header : struct.Struct = __header__ if (version >= 2) else __header_v1__
+    shape_record : struct.Struct = __shape_record__ if (version >= 2) else __shape_record_v1__
+    fields : tuple = header.unpack_from(view, 0)
+    shape_count, style_count, member_count, attached_count, \
+        shape_table, style_table, member_table, attached_table = fields[3:11]
+    if (version >= 2):
+        data.sequence = fields[11]
+    vertex_section : int = header.size
+
+    styles : list[tuple] = [__style_record__.unpack_from(view, style_table + i * __style_record__.size) for i in range(style_count)]
+    children : dict[int, list[int]] = {}
+    for group, child in __member_record__.iter_unpack(view[member_table:member_table + member_count * __member_record__.size]):
+        children.setdefault(group, []).append(child)
+
+    uids : list[int] = []
+    for index, fields in enumerate(shape_record.iter_unpack(view[shape_table:shape_table + shape_count * shape_record.size])):
+        shape_type, vertex_type, reserved, style_index, parent, x, y, width, height, \
+            vertex_offset, vertex_count, spike_num, inner_width, inner_height = fields[:14]
+        uid : int = fields[14] if (version >= 2) else index + 1
+        vertices : memoryview | None = None
+        if (shape_type in (ShapeType.POLYGON, ShapeType.TRIANGLE, ShapeType.STAR, ShapeType.COMPOUND)):
+            item_size : int = 4 if (chr(vertex_type) == "f") else 8
+            start : int = vertex_section + vertex_offset
+            vertices = view[start:start + 2 * vertex_count * item_size].cast(chr(vertex_type))
+        data.records[uid] = ShapeRecord(uid, shape_type, (x, y, width, height), styles[style_index], vertices,
+                                        (spike_num, inner_width, inner_height),
+                                        [uids[child] for child in children.get(index, [])])
+        uids.append(uid)
+
+    data.attached = [uids[index] for (index,) in __index_record__.iter_unpack(view[attached_table:attached_table + attached_count * __index_record__.size])]
+    return data
+#
+# conversion between shapes and their records
+#
+
+def recordFromShape(shape : Shape) -> ShapeRecord:
+    bounding_box : QRectF = shape.boundingBox
+    record : ShapeRecord = ShapeRecord(shape.__uid__, __shape_type__(shape),
+                                       (bounding_box.x(), bounding_box.y(), bounding_box.width(), bounding_box.height()),
+                                       __style_key__(shape))
+    if (isinstance(shape, Polygon)):
+        if (shape.materialized):
+            points : list[QPointF] = shape.describeShape().toList()
+            record.vertices = array("d", [coordinate for point in points for coordinate in (point.x(), point.y())])
+        else:
+            # still untouched since loading, the mapped block can be used as it is
+            record.vertices = shape.__vertex_data__
+    if (isinstance(shape, CompoundPolygon)):
+        record.vertices = array("d", shape.vertexData())
+    if (isinstance(shape, Star)):
+        record.star = (shape.SpikeNum, shape.InnerSize.width(), shape.InnerSize.height())
+    if (isinstance(shape, AggregateShape)):
+        record.children = [child.__uid__ for child in shape.children]
+    if (isinstance(shape, InstanceShape)):
+        record.children = [shape.master.__uid__]
+    return record
+#
+# records of 'shapes' and everything they contain, shapes without a uid (not attached to a scene
+# so far) are numbered after the highest uid in use
+#
+def sceneDataFromShapes(shapes : list[Shape]) -> SceneData:
+    ordered : list[Shape] = []
+    visited : set[Shape] = set()
+    for shape in shapes:
+        __collect_shapes__(shape, ordered, visited)
+    next_uid : int = 1 + max([shape.__uid__ for shape in ordered], default=0)
+    for shape in ordered:
+        if (shape.__uid__ == 0):
+            shape.__uid__ = next_uid
+            next_uid += 1
+
+    data : SceneData = SceneData()
+    for shape in ordered:
+        data.records[shape.__uid__] = recordFromShape(shape)
+    data.attached = [shape.__uid__ for shape in shapes]
+    return data
+
+def shapesFromSceneData(data : SceneData) -> list[Shape]:
+    shapes : dict[int, Shape] = {}
+    return [__shape_from_record__(data.records, uid, shapes) for uid in data.attached]
+
+def __shape_from_record__(records : dict[int, ShapeRecord], uid : int, shapes : dict[int, Shape]) -> Shape:
+    if (uid in shapes):
+        return shapes[uid]
+    record : ShapeRecord = records[uid]
+    bounding_box : QRectF = QRectF(*record.boundingBox)
+    shape : Shape
+    if (record.type in (ShapeType.POLYGON, ShapeType.TRIANGLE, ShapeType.STAR)):
+        polygon_class : type = { ShapeType.POLYGON : Polygon, ShapeType.TRIANGLE : Triangle, ShapeType.STAR : Star }[record.type]
+        shape = polygon_class.fromVertexData(record.vertices, bounding_box)
+        if (record.type == ShapeType.STAR):
+            shape.__spike_num__ = record.star[0]
+            shape.__inner_size__ = QSizeF(record.star[1], record.star[2])
+    elif (record.type == ShapeType.COMPOUND):
+        shape = CompoundPolygon.fromVertexData(record.vertices, bounding_box)
+    elif (record.type == ShapeType.AGGREGATE):
+        shape = AggregateShape([__shape_from_record__(records, child, shapes) for child in record.children])
+        shape.__bounding_box__ = bounding_box
+    elif (record.type == ShapeType.INSTANCE):
+        shape = InstanceShape(__shape_from_record__(records, record.children[0], shapes), bounding_box)
+    elif (record.type == ShapeType.RECTANGLE):
+        shape = Rectangle(QPointF(), QSizeF())
+        shape.__bounding_box__ = bounding_box
+    elif (record.type == ShapeType.CIRCLE):
+        shape = Circle(QPointF(), 0.0)
+        shape.__bounding_box__ = bounding_box
+    elif (record.type == ShapeType.ELLIPSE):
+        shape = Ellipse(QPointF(), QSizeF())
+        shape.__bounding_box__ = bounding_box
+    else:
+        raise ValueError(f"unknown shape-type {record.type} in scene-file")
+    __apply_style__(shape, record.style)
+    shape.__uid__ = uid
+    shapes[uid] = shape
+    return shape
+
+def __collect_shapes__(shape : Shape, ordered : list[Shape], visited : set[Shape]) -> None:
+    if (shape in visited):
+        return
+    visited.add(shape)
+    if (isinstance(shape, AggregateShape)):
+        for child in shape.children:
+            __collect_shapes__(child, ordered, visited)
+    elif (isinstance(shape, InstanceShape)):
+        __collect_shapes__(shape.master, ordered, visited)
+    ordered.append(shape)
+
+def __number_records__(records : dict[int, ShapeRecord], uid : int, ordered : list[ShapeRecord], indices : dict[int, int]) -> None:
+    if (uid in indices):
+        return
+    record : ShapeRecord = records[uid]
+    for child in record.children:
+        __number_records__(records, child, ordered, indices)
+    indices[uid] = len(ordered)
+    ordered.append(record)
+
+def __shape_type__(shape : Shape) -> int:
+    # subclasses before their base-classes
+    if (isinstance(shape, Star)):
+        return ShapeType.STAR
+    if (isinstance(shape, Triangle)):
+        return ShapeType.TRIANGLE
+    if (isinstance(shape, Polygon)):
+        return ShapeType.POLYGON
+    if (isinstance(shape, Circle)):
+        return ShapeType.CIRCLE
+    if (isinstance(shape, Ellipse)):
+        return ShapeType.ELLIPSE
+    if (isinstance(shape, Rectangle)):
+        return ShapeType.RECTANGLE
+    if (isinstance(shape, CompoundPolygon)):
+        return ShapeType.COMPOUND
+    if (isinstance(shape, AggregateShape)):
+        return ShapeType.AGGREGATE
+    if (isinstance(shape, InstanceShape)):
+        return ShapeType.INSTANCE
+    raise TypeError(f"shape-type {type(shape).__name__} cannot be stored in a scene-file")
+
+def __write_vertices__(stream : BinaryIO, vertices, vertexType : str) -> int:
+    if (isinstance(vertices, memoryview) and vertices.format == vertexType):
+        # a mapped block in the requested precision can be copied as it is
+        stream.write(vertices.tobytes())
+    else:
+        stream.write(array(vertexType, vertices).tobytes())
+    stream.write(b"\0" * (-stream.tell() % 8))
+    return len(vertices) // 2
+
+def __style_key__(shape : Shape) -> tuple:
+    fill : QColor = shape.__fill_color__
+    outline : QColor = shape.__outline_color__
+    return (fill.red(), fill.green(), fill.blue(), fill.alpha(),
+            outline.red(), outline.green(), outline.blue(), outline.alpha(),
+            float(shape.__outline_width__), int(shape.__show_fill_body__))
+
+def __apply_style__(shape : Shape, style : tuple) -> None:
+    shape.__fill_color__ = QColor(style[0], style[1], style[2], style[3])
+    shape.__outline_color__ = QColor(style[4], style[5], style[6], style[7])
+    shape.__outline_width__ = style[8]
+    shape.__show_fill_body__ = bool(style[9])
@@ -0,0 +1,178 @@
+from PySide6.QtCore import QPointF, QRectF
+
+from math import floor
+
+import sys
+
+from Editor.Shapes.Shape import Shape
+#
+# scene-index class
+#
+# uniform-grid spatial-hash over the bounding-boxes of all shapes in a scene
+#
+# every shape is registered in all grid-cells its (normalized, outline-padded) bounding-box
+# overlaps, so point- and rectangle-queries only have to look at the shapes in a few cells
+# instead of testing every shape of the scene
+#
+# shapes that would cover too many cells are kept in a separate list that every query checks
+#
+class SceneIndex:
+
+    cellSize : float = 128.0        # edge-length of one grid-cell in world-units
+    maxCellsPerShape : int = 256    # shapes covering more cells than this are stored as 'large'
+
+    def __init__(self, cellSize : float = cellSize) -> None:
+        self.cellSize : float = cellSize
+        self.__cells__ : dict[tuple[int, int], set[Shape]] = {}
+        self.__large__ : set[Shape] = set()
+        # per shape: its bounds as (left, top, right, bottom) and the covered cell-range (or None if large)
+        self.__bounds__ : dict[Shape, tuple[float, float, float, float]] = {}
+        self.__ranges__ : dict[Shape, tuple[int, int, int, int] | None] = {}
+
+    def __len__(self) -> int:
+        return len(self.__bounds__)
+
+    def __contains__(self, shape : Shape) -> bool:
+        return shape in self.__bounds__
+
+    def clear(self) -> None:
+        self.__cells__.clear()
+        self.__large__.clear()
+        self.__bounds__.clear()
+        self.__ranges__.clear()
+    #
+    # drop everything and index all passed shapes at once
+    #
+    def rebuild(self, shapes : list[Shape]) -> None:
+        self.clear()
+        for shape in shapes:
+            self.insert(shape)
+
+    def insert(self, shape : Shape) -> None:
+        if (shape in self.__bounds__):
+            self.remove(shape)
+        bounds : tuple[float, float, float, float] = shapeBounds(shape)
+        cell_range : tuple[int, int, int, int] = self.__cell_range__(bounds)
+        self.__bounds__[shape] = bounds
+        if ((cell_range[2] - cell_range[0] + 1) * (cell_range[3] - cell_range[1] + 1) > self.maxCellsPerShape):
+            self.__ranges__[shape] = None
+            self.__large__.add(shape)
+            return
+        self.__ranges__[shape] = cell_range
+        for cx in range(cell_range[0], cell_range[2] + 1):
+            for cy in range(cell_range[1], cell_range[3] + 1):
+                cell : set[Shape] | None = self.__cells__.get((cx, cy))
+                if (cell is None):
+                    cell = set()
+                    self.__cells__[(cx, cy)] = cell
+                cell.add(shape)
+
+    def remove(self, shape : Shape) -> None:
+        if not (shape in self.__bounds__):
+            return
+        cell_range : tuple[int, int, int, int] | None = self.__ranges__.pop(shape)
+        del self.__bounds__[shape]
+        if (cell_range is None):
+            self.__large__.discard(shape)
+            return
+        for cx in range(cell_range[0], cell_range[2] + 1):
+            for cy in range(cell_range[1], cell_range[3] + 1):
+                cell : set[Shape] = self.__cells__[(cx, cy)]
+                cell.discard(shape)
+                if not (len(cell)):
+                    del self.__cells__[(cx, cy)]
+    #
+    # re-register a shape after its bounding-box changed (no-op for shapes that aren't indexed)
+    #
+    def update(self, shape : Shape) -> None:
+        if not (shape in self.__bounds__):
+            return
+        bounds : tuple[float, float, float, float] = shapeBounds(shape)
+        if (bounds == self.__bounds__[shape]):
+            return
+        if (self.__ranges__[shape] is not None and self.__cell_range__(bounds) == self.__ranges__[shape]):
+            self.__bounds__[shape] = bounds # still in the same cells, only the prefilter-bounds change
+            return
+        self.insert(shape)
+    #
+    # all shapes whose bounds contain the passed point (grown by 'tolerance')
+    #
+    def queryPoint(self, point : QPointF, tolerance : float = 0.0) -> list[Shape]:
+        x : float = point.x()
+        y : float = point.y()
+        result : list[Shape] = []
+        candidates : set[Shape] = set(self.__large__)
+        cell : set[Shape] | None = self.__cells__.get((floor(x / self.cellSize), floor(y / self.cellSize)))
+        if (cell is not None):
+            candidates.update(cell)
+        if (tolerance > 0.0):
+            # the tolerance-area could reach into neighbouring cells
+            for neighbour in self.__cells_in__((x - tolerance, y - tolerance, x + tolerance, y + tolerance)):
+                candidates.update(neighbour)
+        for shape in candidates:
+            bounds : tuple[float, float, float, float] = self.__bounds__[shape]
+            if (bounds[0] - tolerance <= x <= bounds[2] + tolerance and bounds[1] - tolerance <= y <= bounds[3] + tolerance):
+                result.append(shape)
+        return result
+    #
+    # all shapes whose bounds intersect the passed rectangle
+    #
+    def queryRect(self, rect : QRectF) -> set[Shape]:
+        area : QRectF = rect.normalized()
+        query : tuple[float, float, float, float] = (area.left(), area.top(), area.right(), area.bottom())
+        cell_range : tuple[int, int, int, int] = self.__cell_range__(query)
+        candidates : set[Shape] = set(self.__large__)
+        if ((cell_range[2] - cell_range[0] + 1) * (cell_range[3] - cell_range[1] + 1) > len(self.__cells__)):
+            # more cells covered than exist, testing every shape directly is cheaper
+            candidates = set(self.__bounds__)
+        else:
+            for cell in self.__cells_in__(query):
+                candidates.update(cell)
+        result : set[Shape] = set()
+        for shape in candidates:
+            bounds : tuple[float, float, float, float] = self.__bounds__[shape]
+            if (bounds[0] <= query[2] and bounds[2] >= query[0] and bounds[1] <= query[3] and bounds[3] >= query[1]):
+                result.add(shape)
+        return result
+
+    def bounds(self, shape : Shape) -> tuple[float, float, float, float]:
+        return self.__bounds__[shape]
+
+    @property
+    def cellCount(self) -> int:
+        return len(self.__cells__)
+    #
+    # estimated memory held by the index in bytes (its containers, keys and bounds-tuples)
+    #
+    def memoryBytes(self) -> int:
+        total : int = (sys.getsizeof(self.__cells__) + sys.getsizeof(self.__large__) +
+                       sys.getsizeof(self.__bounds__) + sys.getsizeof(self.__ranges__))
+        for key, cell in self.__cells__.items():
+            total += sys.getsizeof(key) + sys.getsizeof(cell)
+        for bounds in self.__bounds__.values():
+            total += sys.getsizeof(bounds)
+        for cell_range in self.__ranges__.values():
+            total += sys.getsizeof(cell_range) if (cell_range is not None) else 0
+        return total
+
+    def __cell_range__(self, bounds : tuple[float, float, float, float]) -> tuple[int, int, int, int]:
+        return (floor(bounds[0] / self.cellSize), floor(bounds[1] / self.cellSize),
+                floor(bounds[2] / self.cellSize), floor(bounds[3] / self.cellSize))
+
+    def __cells_in__(self, bounds : tuple[float, float, float, float]) -> list[set[Shape]]:
+        cell_range : tuple[int, int, int, int] = self.__cell_range__(bounds)
+        result : list[set[Shape]] = []
+        for cx in range(cell_range[0], cell_range[2] + 1):
+            for cy in range(cell_range[1], cell_range[3] + 1):
+                cell : set[Shape] | None = self.__cells__.get((cx, cy))
+                if (cell is not None):
+                    result.append(cell)
+        return result
+#
+# bounds of a shape as (left, top, right, bottom) including half of its outline-width
+# (bounding-boxes can be mirrored, so they are normalized first)
+#
+def shapeBounds(shape : Shape) -> tuple[float, float, float, float]:
+    rect : QRectF = shape.boundingBox.normalized()
+    margin : float = shape.strokeMargin()
+    return (rect.left() - margin, rect.top() - margin, rect.right() + margin, rect.bottom() + margin)
@@ -0,0 +1,223 @@
+from PySide6.QtGui import QPainterPath
+
+from shiboken6 import Shiboken
+
+import heapq
+import os
+import sys
+
+from Editor.Shapes.Shape import Shape
+from Editor.Shapes.Aggregate import AggregateShape
+from Editor.Shapes.Instance import InstanceShape
+from Editor.Scene import Scene
+
+#
+# memory-model
+#
+# python-objects are measured with sys.getsizeof(), the data qt allocates behind its wrappers is not
+# visible to python and is estimated from the element-sizes of the c++-types instead
+#
+pathElementBytes : int = 24     # QPainterPath::Element (x, y as double and the element-type)
+pathBytes : int = 64            # QPainterPath's shared data without its elements
+vertexBytes : int = 16          # QPointF in a QPolygonF
+qtValueBytes : int = 32         # c++-side of any other qt value held by a shape (QRectF, QColor, ...)
+
+#
+# memory of a single shape as reported in the list of the largest shapes
+#
+class ShapeMemory:
+    def __init__(self, uid : int, type : str, vertices : int, pathElements : int, size : int, depth : int) -> None:
+        self.uid : int = uid
+        self.type : str = type
+        self.vertices : int = vertices
+        self.pathElements : int = pathElements
+        self.bytes : int = size
+        self.depth : int = depth # 0 for shapes attached to the scene directly
+
+    def toDict(self) -> dict:
+        return { "uid" : self.uid, "type" : self.type, "vertices" : self.vertices,
+                 "pathElements" : self.pathElements, "bytes" : self.bytes, "depth" : self.depth }
+
+#
+# totals of all shapes of one type
+#
+class ShapeTypeStats:
+    def __init__(self) -> None:
+        self.count : int = 0
+        self.vertices : int = 0
+        self.pathElements : int = 0
+        self.bytes : int = 0
+
+    def toDict(self) -> dict:
+        return { "count" : self.count, "vertices" : self.vertices, "pathElements" : self.pathElements, "bytes" : self.bytes }
+
+#
+# scene-report class
+#
+# result of inspectScene(), all byte-counts are estimates (see the memory-model above)
+#
+#   types               per shape-type (class-name): instances, stored vertices, painterpath-elements, bytes
+#   depths              number of shapes per group-depth (0 = attached to the scene directly)
+#   renderCacheBytes    QPicture-/QImage-caches of groups (see Editor/Shapes/Aggregate.py)
+#   strokeCacheBytes    outline-paths cached for picking
+#   indexBytes          spatial-index of the scene (see Editor/SceneIndex.py)
+#   largest             the shapes with the most estimated bytes, largest first
+#
+class SceneReport:
+    def __init__(self) -> None:
+        self.types : dict[str, ShapeTypeStats] = {}
+        self.depths : dict[int, int] = {}
+        self.attachedCount : int = 0
+        self.cacheModes : dict[str, int] = {}
+        self.renderCacheBytes : int = 0
+        self.strokeCacheBytes : int = 0
+        self.indexBytes : int = 0
+        self.indexCells : int = 0
+        self.largest : list[ShapeMemory] = []
+
+    @property
+    def shapeCount(self) -> int:
+        return sum(stats.count for stats in self.types.values())
+
+    @property
+    def maxGroupDepth(self) -> int:
+        return max(self.depths) if (len(self.depths)) else 0
+
+    # shapes themselves (their caches included), plus the spatial-index
+    @property
+    def totalBytes(self) -> int:
+        return sum(stats.bytes for stats in self.types.values()) + self.indexBytes
+
+    def toDict(self) -> dict:
+        return { "shapeCount" : self.shapeCount,
+                 "attachedCount" : self.attachedCount,
+                 "totalBytes" : self.totalBytes,
+                 "types" : { name : stats.toDict() for name, stats in sorted(self.types.items()) },
+                 "groups" : { "maxDepth" : self.maxGroupDepth,
+                              "shapesPerDepth" : { str(depth) : count for depth, count in sorted(self.depths.items()) },
+                              "cacheModes" : dict(sorted(self.cacheModes.items())) },
+                 "caches" : { "renderBytes" : self.renderCacheBytes,
+                              "strokeBytes" : self.strokeCacheBytes,
+                              "indexBytes" : self.indexBytes,
+                              "indexCells" : self.indexCells },
+                 "largest" : [shape.toDict() for shape in self.largest] }
+
+    def write(self, file : os.path) -> None:
+        import json
+        with open(file, "w") as stream:
+            json.dump(self.toDict(), stream, indent=2)
+
+    def __str__(self) -> str:
+        lines : list[str] = [f"{self.shapeCount} shapes ({self.attachedCount} attached), about {formatBytes(self.totalBytes)}"]
+        for name, stats in sorted(self.types.items(), key=lambda item : item[1].bytes, reverse=True):
+            lines.append(f"  {name}: {stats.count}x, {stats.vertices} vertices, {stats.pathElements} path-elements, {formatBytes(stats.bytes)}")
+        lines.append(f"group-depth: {self.maxGroupDepth}")
+        lines.append(f"render-caches: {formatBytes(self.renderCacheBytes)}, stroke-caches: {formatBytes(self.strokeCacheBytes)}, "
+                     f"spatial-index: {formatBytes(self.indexBytes)} ({self.indexCells} cells)")
+        if (len(self.largest)):
+            lines.append("largest shapes:")
+            for shape in self.largest:
+                lines.append(f"  #{shape.uid} {shape.type}: {formatBytes(shape.bytes)} ({shape.pathElements} path-elements)")
+        return "\n".join(lines)
+
+def formatBytes(count : float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if (count < 1024):
+            return f"{count:.0f} {unit}" if (unit == "B") else f"{count:.1f} {unit}"
+        count /= 1024
+    return f"{count:.1f} GiB"
+
+#
+# inspect all shapes of a scene, group-members and masters of instances included
+#
+# every shape is counted once (shapes that are part of multiple groups or also attached directly
+# at the depth they are reached at first), the 'largest' biggest shapes are kept in a bounded
+# min-heap, so the inspection itself never holds more than that many entries
+#
+# lazily read vertex-data (see Polygon.fromVertexData()) is counted without being materialized
+#
+def inspectScene(scene : Scene, largest : int = 10) -> SceneReport:
+    report : SceneReport = SceneReport()
+    report.attachedCount = len(scene.attachedShapes)
+    report.indexBytes = scene.index.memoryBytes()
+    report.indexCells = scene.index.cellCount
+    # (bytes, visit-order, shape, vertices, path-elements, depth), the order breaks ties between equal sizes
+    heap : list[tuple[int, int, Shape, int, int, int]] = []
+    visited : set[int] = set()
+    stack : list[tuple[Shape, int]] = [(shape, 0) for shape in reversed(scene.attachedShapes)]
+    while (len(stack)):
+        shape, depth = stack.pop()
+        if (id(shape) in visited):
+            continue
+        visited.add(id(shape))
+
+        vertices : int = shape.vertexCount()
+        elements : int = shape.__painterpath__.elementCount()
+        stroke_bytes : int = strokeCacheBytes(shape)
+        render_bytes : int = shape.cacheBytes()
+        size : int = shapeBytes(shape, vertices, elements) + stroke_bytes + render_bytes
+
+        report.strokeCacheBytes += stroke_bytes
+        report.renderCacheBytes += render_bytes
+        report.depths[depth] = report.depths.get(depth, 0) + 1
+        stats : ShapeTypeStats = report.types.setdefault(type(shape).__name__, ShapeTypeStats())
+        stats.count += 1
+        stats.vertices += vertices
+        stats.pathElements += elements
+        stats.bytes += size
+
+        if (largest > 0):
+            if (len(heap) < largest):
+                heapq.heappush(heap, (size, -len(visited), shape, vertices, elements, depth))
+            elif (size > heap[0][0]):
+                heapq.heapreplace(heap, (size, -len(visited), shape, vertices, elements, depth))
+
+        if (isinstance(shape, AggregateShape)):
+            mode : str = shape.cacheMode.name
+            report.cacheModes[mode] = report.cacheModes.get(mode, 0) + 1
+            stack.extend((child, depth + 1) for child in reversed(shape.children))
+        elif (isinstance(shape, InstanceShape)):
+            stack.append((shape.master, depth + 1))
+    report.largest = [ShapeMemory(shape.__uid__, type(shape).__name__, vertices, elements, size, depth)
+                      for size, order, shape, vertices, elements, depth in sorted(heap, key=lambda entry : entry[:2], reverse=True)]
+    return report
+
+#
+# estimated bytes of a shape itself (without caches), groups include their member-list but not the members
+#
+def shapeBytes(shape : Shape, vertices : int, pathElements : int) -> int:
+    attributes : dict = vars(shape)
+    total : int = sys.getsizeof(shape) + sys.getsizeof(attributes)
+    for value in attributes.values():
+        extra : int | None = __attribute_types__.get(type(value), -1)
+        if (extra == -1):
+            extra = __attribute_type__(type(value))
+        if (extra is not None):
+            total += sys.getsizeof(value) + extra
+    total += pathBytes + pathElementBytes * pathElements
+    # vertex-data that is still only mapped from a file is not part of the process' heap
+    if (getattr(shape, "__polygon_data__", None) is not None):
+        total += vertexBytes * vertices
+    if (isinstance(shape, AggregateShape)):
+        for member in shape.__shapes__:
+            total += sys.getsizeof(member) + sys.getsizeof(member[1]) + sys.getsizeof(member[2])
+    return total
+
+# per type of attribute: the bytes qt holds behind a value of it (0 for lists), or None if values of it
+# are not counted (numbers, flags, None and tuples are small or shared), shapes only use a few types
+__attribute_types__ : dict[type, int | None] = {}
+
+def __attribute_type__(valueType : type) -> int | None:
+    extra : int | None = None
+    if (issubclass(valueType, Shiboken.Object)):
+        extra = qtValueBytes
+    elif (issubclass(valueType, list)):
+        extra = 0
+    __attribute_types__[valueType] = extra
+    return extra
+
+def strokeCacheBytes(shape : Shape) -> int:
+    if (shape.__stroke_cache__ is None):
+        return 0
+    path : QPainterPath = shape.__stroke_cache__[1]
+    return pathBytes + pathElementBytes * path.elementCount()
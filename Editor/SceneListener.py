@@ -0,0 +1,45 @@
+from PySide6.QtCore import QRectF
+from PySide6.QtGui import QTransform
+
+from Editor.Shapes.Shape import Shape
+
+#
+# interface class for an observer of a scene
+#
+# listeners registered in 'Scene.listeners' are told about every edit of the scene together
+# with the state before it (used e.g. by the journal for autosaving and by the undo-history)
+#
+class SceneListener:
+    # shapes were attached to the scene (at the end of the drawing-order)
+    def shapesAttached(self, shapes : list[Shape]) -> None:
+        pass
+
+    # shapes were removed from the scene
+    def shapesDetached(self, shapes : list[Shape]) -> None:
+        pass
+
+    # bounding-boxes of shapes were edited directly (moved/scaled/created by dragging),
+    # 'previous' holds their bounding-boxes before the edit
+    def shapesEdited(self, shapes : list[Shape], previous : list[QRectF]) -> None:
+        pass
+
+    # shapes (and their vertex-data) were transformed as a batch
+    def shapesTransformed(self, shapes : list[Shape], transform : QTransform) -> None:
+        pass
+
+    # a shape was moved from 'previousIndex' to 'index' in the drawing-order
+    def shapeReordered(self, shape : Shape, index : int, previousIndex : int, previousZIndex : int) -> None:
+        pass
+
+    # all attached shapes were replaced at once (e.g. by merged ones, see Scene.flatten()),
+    # 'previous' holds the attached shapes before in drawing-order
+    def shapesReplaced(self, previous : list[Shape]) -> None:
+        pass
+
+    # vertex-data of shapes was changed for display only (e.g. by an animation, see Editor/Animation.py),
+    # this is no edit: indices of the geometry have to follow it, records of the scene must not
+    def shapesDeformed(self, shapes : list[Shape]) -> None:
+        pass
+
+    def sceneCleared(self) -> None:
+        pass
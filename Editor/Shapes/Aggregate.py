@@ -1,45 +1,212 @@
 from PySide6.QtCore import QRectF, QSizeF, QPointF
 
-from PySide6.QtGui import QPainter, QColor, QPainterPath, QPen, QBrush, QPolygonF, QTransform
+from PySide6.QtGui import QPainter, QColor, QPainterPath, QBrush, QPolygonF, QTransform, QPicture, QImage
 
 from PySide6.QtCore import Qt
 
 import xml.etree.ElementTree as XMLTree
+from enum import Enum
+from math import ceil, sqrt
 
-import Utility
+from VectorMath import Vec2, Box
 from Editor.Shapes.Shape import Shape, findBoundingBoxShapes
 
+#
+# enum to describe how the children of an aggregate-shape are cached between frames
+#
+class RenderCacheMode(Enum):
+    NONE    = 1 # children are drawn directly every frame
+    PICTURE = 2 # child draw-calls are recorded into a QPicture and replayed (zoom-independent)
+    IMAGE   = 3 # children are rasterized into a QImage for the current zoom-level and blitted
 #
 # shape that consists of multiple shapes itself
 #
 # information about the child-shapes is preserved, functions more like a shape-list
 # with it's own bounding-box
 #
+# as long as neither the group nor any of its children are dirty, the child draw-calls
+# are replayed from a render-cache instead of being issued again every frame
+#
 class AggregateShape(Shape):
+
+    # heuristic-thresholds for choosing a RenderCacheMode
+    cacheMinChildren : int = 8              # below this, recording costs more than it saves
+    rasterMinChildren : int = 256           # from here on, blitting one image beats replaying every call
+    rasterMaxPixels : int = 2048 * 2048     # never allocate raster-caches bigger than this
     
     def __init__(self, shapes : list[Shape]) -> None:
         # shapes need to be associated with a ratio of position and size of the bounding-box
         # to be able to transform the correctly later
-        self.__shapes__ : list[tuple[Shape, QPointF, QSizeF]] = []
+        self.__shapes__ : list[tuple[Shape, Vec2, Vec2]] = []
+        # the bounding-box as plain floats, reused for every fit
+        self.__box__ : Box = Box()
         super().__init__(findBoundingBoxShapes(shapes))
         self.__calc_ratios__(shapes)
+        for shape in shapes:
+            shape.__parent_groups__.append(self)
+
+        self.__cache_mode__ : RenderCacheMode = RenderCacheMode.NONE
+        self.__cache_picture__ : QPicture | None = None
+        self.__cache_image__ : QImage | None = None
+        self.__cache_zoom__ : float = 0.0
+        self.__cache_rect__ : QRectF = QRectF()
+
+    @property
+    def children(self) -> list[Shape]:
+        return [__shape__[0] for __shape__ in self.__shapes__]
 
     #
     # specialization of draw() because multiple painterpaths need to be drawn
     #
-    def draw(self, painter : QPainter) -> None:
+    def drawBody(self, painter : QPainter) -> None:
+        zoom : float = self.__painter_zoom__(painter)
+        mode : RenderCacheMode = self.__choose_cache_mode__(zoom)
+        if (mode != self.__cache_mode__):
+            self.invalidateCache()
+            self.__cache_mode__ = mode
+
+        if (mode == RenderCacheMode.NONE):
+            for __shape__ in self.__shapes__:
+                __shape__[0].drawBody(painter)
+        elif (mode == RenderCacheMode.PICTURE):
+            if (self.__cache_picture__ is None):
+                self.__record_picture__(painter)
+            painter.drawPicture(0, 0, self.__cache_picture__)
+        elif (mode == RenderCacheMode.IMAGE):
+            if (self.__cache_image__ is None or self.__cache_zoom__ != zoom):
+                self.__record_image__(painter, zoom)
+            painter.save()
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, True)
+            painter.drawImage(self.__cache_rect__, self.__cache_image__)
+            painter.restore()
+
+    def drawOverlay(self, painter : QPainter) -> None:
+        # overlays of the children are not part of the cache, as selecting a child doesn't make it dirty
         for __shape__ in self.__shapes__:
-            __shape__[0].draw(painter)
-        if (self.__show_bounding_box__):
-            painter.setPen(QPen(Shape.boundingBoxColor, Shape.boundingBoxWidth))
-            painter.drawRect(QRectF(self.boundingBox.topLeft(), 
-                                    self.boundingBox.size()))
+            __shape__[0].drawOverlay(painter)
+        super().drawOverlay(painter)
 
     def update(self) -> None:
         # update and fit all subshapes into shared-bounding-box
         self.__fit_shapes_to_bounding_box__()
         for __shape__ in self.__shapes__:
-            __shape__[0].update()
+            __shape__[0].refresh()
+        self.invalidateCache()
+
+    #
+    # a group is hit wherever one of its children is hit, children are descended
+    # (with a cheap bounding-box test first) from the topmost one downwards
+    #
+    def containsPoint(self, point : QPointF, tolerance : float = 0.0) -> bool:
+        for __shape__ in reversed(self.__shapes__):
+            margin : float = __shape__[0].strokeMargin() + tolerance
+            if not (__shape__[0].boundingBox.normalized().adjusted(-margin, -margin, margin, margin).contains(point)):
+                continue
+            if (__shape__[0].containsPoint(point, tolerance)):
+                return True
+        return False
+
+    def intersectsRect(self, rect : QRectF) -> bool:
+        for __shape__ in self.__shapes__:
+            if (__shape__[0].intersectsRect(rect)):
+                return True
+        return False
+
+    def intersectsPath(self, path : QPainterPath) -> bool:
+        for __shape__ in self.__shapes__:
+            if (__shape__[0].intersectsPath(path)):
+                return True
+        return False
+
+    def intersectsShape(self, other : Shape) -> bool:
+        for __shape__ in self.__shapes__:
+            if (__shape__[0].intersectsShape(other)):
+                return True
+        return False
+
+    def strokeMargin(self) -> float:
+        res : float = super().strokeMargin()
+        for __shape__ in self.__shapes__:
+            res = max(res, __shape__[0].strokeMargin())
+        return res
+
+    #
+    # transformations are passed on to every child, afterwards the bounding-box and the ratios
+    # are recalculated from the transformed children
+    #
+    def applyTransform(self, transform : QTransform) -> None:
+        self.__fit_shapes_to_bounding_box__()
+        shapes : list[Shape] = self.children
+        for shape in shapes:
+            shape.applyTransform(transform)
+        self.__bounding_box__ = findBoundingBoxShapes(shapes)
+        self.__shapes__.clear()
+        self.__calc_ratios__(shapes)
+        self.markDirty()
+
+    def invalidateCache(self) -> None:
+        self.__cache_picture__ = None
+        self.__cache_image__ = None
+        self.__cache_zoom__ = 0.0
+
+    @property
+    def cacheMode(self) -> RenderCacheMode:
+        return self.__cache_mode__
+
+    def cacheBytes(self) -> int:
+        if (self.__cache_picture__ is not None):
+            return self.__cache_picture__.size()
+        if (self.__cache_image__ is not None):
+            return self.__cache_image__.sizeInBytes()
+        return 0
+
+    #
+    # render-cache helpers
+    #
+
+    # scale-factor from world- to device-coordinates of the passed painter
+    def __painter_zoom__(self, painter : QPainter) -> float:
+        transform : QTransform = painter.worldTransform()
+        return sqrt(abs(transform.determinant()))
+
+    def __choose_cache_mode__(self, zoom : float) -> RenderCacheMode:
+        count : int = len(self.__shapes__)
+        if (count < AggregateShape.cacheMinChildren):
+            return RenderCacheMode.NONE
+        if (count >= AggregateShape.rasterMinChildren):
+            rect : QRectF = self.__cache_bounds__()
+            pixels : float = (rect.width() * zoom) * (rect.height() * zoom)
+            if (pixels <= AggregateShape.rasterMaxPixels):
+                return RenderCacheMode.IMAGE
+        return RenderCacheMode.PICTURE
+
+    # area covered by all children including their outlines (which reach out of the bounding-boxes)
+    def __cache_bounds__(self) -> QRectF:
+        margin : float = self.strokeMargin() + 1.0
+        return self.boundingBox.normalized().adjusted(-margin, -margin, margin, margin)
+
+    def __record_picture__(self, painter : QPainter) -> None:
+        self.__cache_picture__ = QPicture()
+        recorder : QPainter = QPainter(self.__cache_picture__)
+        recorder.setRenderHints(painter.renderHints())
+        for __shape__ in self.__shapes__:
+            __shape__[0].drawBody(recorder)
+        recorder.end()
+
+    def __record_image__(self, painter : QPainter, zoom : float) -> None:
+        self.__cache_rect__ = self.__cache_bounds__()
+        self.__cache_zoom__ = zoom
+        self.__cache_image__ = QImage(max(1, ceil(self.__cache_rect__.width() * zoom)),
+                                      max(1, ceil(self.__cache_rect__.height() * zoom)),
+                                      QImage.Format.Format_ARGB32_Premultiplied)
+        self.__cache_image__.fill(Qt.GlobalColor.transparent)
+        recorder : QPainter = QPainter(self.__cache_image__)
+        recorder.setRenderHints(painter.renderHints())
+        recorder.scale(zoom, zoom)
+        recorder.translate(-self.__cache_rect__.topLeft())
+        for __shape__ in self.__shapes__:
+            __shape__[0].drawBody(recorder)
+        recorder.end()
 
 
     def describeShape(self) -> QPolygonF:
@@ -47,6 +214,12 @@ class AggregateShape(Shape):
         for __shape__ in self.__shapes__:
             res = res.united(__shape__[0].describeShape())
         return res
+
+    def snapOutlines(self) -> list[QPolygonF]:
+        return [outline for __shape__ in self.__shapes__ for outline in __shape__[0].snapOutlines()]
+
+    def snapPoints(self) -> list[QPointF]:
+        return [point for __shape__ in self.__shapes__ for point in __shape__[0].snapPoints()]
     
     def toSVG(self) -> XMLTree.Element:
         res : XMLTree.Element = XMLTree.Element("g")
@@ -54,19 +227,26 @@ class AggregateShape(Shape):
             res.append(__shape__[0].toSVG()) # potentially recursive call to another Aggregate, but should be allowed hence the tree structure
         return res
 
+    def writeSVG(self, writer) -> None:
+        writer.begin("g")
+        writer.writeShapes([__shape__[0] for __shape__ in self.__shapes__])
+        writer.end()
+
     def __calc_ratios__(self, shapes : list[Shape]) -> None:
-        for shape in shapes:
+        if (len(shapes)):
             if (self.size.width() == 0):
                 self.size = QSizeF(0.01, self.size.height())
             if (self.size.height() == 0):
                 self.size = QSizeF(self.size.width(), 0.01)
-            pos_ratio : QPointF = Utility.QPointFAbs(Utility.QPointFDivide(shape.topLeft - self.__true_topleft__(), Utility.toQPointF(self.size)))
-            size_ratio : QSizeF = Utility.QSizeFAbs(Utility.QSizeFDivide(shape.size, self.size))
+        self.__box__.assign(self.__bounding_box__)
+        for shape in shapes:
+            pos_ratio, size_ratio = self.__box__.ratiosOf(shape.__bounding_box__)
             self.__shapes__.append((shape, pos_ratio, size_ratio))
 
     def __fit_shapes_to_bounding_box__(self) -> None:
         # determine topleft and size of every shape
-        # and adjust to new bounding-box size
-        for __shape__ in self.__shapes__:
-            __shape__[0].topLeft = self.__true_topleft__() + Utility.QPointFMultiply(__shape__[1], Utility.toQPointF(Utility.QSizeFAbs(self.size)))
-            __shape__[0].size = Utility.QSizeFMultiply(__shape__[2], Utility.QSizeFAbs(self.size))
\ No newline at end of file
+        # and adjust to new bounding-box size (the bounding-boxes are changed in place)
+        self.__box__.assign(self.__bounding_box__)
+        for shape, pos_ratio, size_ratio in self.__shapes__:
+            self.__box__.fitRect(pos_ratio, size_ratio, shape.__bounding_box__)
+            shape.markDirty()
\ No newline at end of file
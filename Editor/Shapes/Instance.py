@@ -0,0 +1,236 @@
+from PySide6.QtCore import QRectF, QPointF
+
+from PySide6.QtGui import QPainter, QColor, QPainterPath, QPen, QBrush, QPolygonF, QTransform, QPainterPathStroker
+
+from PySide6.QtCore import Qt
+
+from math import sqrt
+
+import xml.etree.ElementTree as XMLTree
+
+from Editor.Shapes.Shape import Shape
+from Editor.Shapes.Aggregate import AggregateShape
+#
+# instance-shape
+#
+# one placement of a shared master-shape (e.g. a deformed star or a group repeated all over a drawing),
+# the instance only keeps its own bounding-box and style, the master's vertices and painterpath exist once
+# no matter how often it is placed
+#
+# the master is not attached to any scene itself, it keeps its own coordinates and is drawn through
+# the transformation that maps its bounding-box onto the one of the instance (so mirrored bounding-boxes
+# mirror the instance), a master has to be left as it is while instances refer to it
+#
+# instances of plain masters are filled and outlined with their own style (the outline keeps its width
+# however the instance is scaled), instances of groups show the styles of the group-members
+#
+# the instance's own painterpath stays empty, hit-tests map the tested geometry into the master's
+# coordinates instead of mapping the master's geometry out of them
+#
+class InstanceShape(Shape):
+
+    def __init__(self, master : Shape, boundingBox : QRectF | None = None) -> None:
+        if (isinstance(master, InstanceShape)):
+            raise TypeError("the master of an instance-shape cannot be an instance itself")
+        self.__master__ : Shape = master
+        super().__init__(QRectF(master.boundingBox.normalized()) if (boundingBox is None) else QRectF(boundingBox))
+        self.__fill_color__ = QColor(master.__fill_color__)
+        self.__outline_color__ = QColor(master.__outline_color__)
+        self.__outline_width__ = master.__outline_width__
+        self.__show_fill_body__ = master.__show_fill_body__
+
+    @property
+    def master(self) -> Shape:
+        return self.__master__
+    #
+    # maps the master's coordinates onto the bounding-box of the instance
+    #
+    @property
+    def transform(self) -> QTransform:
+        master_box : QRectF = self.__master__.boundingBox.normalized()
+        master_width : float = master_box.width() if (master_box.width() != 0) else 0.01
+        master_height : float = master_box.height() if (master_box.height() != 0) else 0.01
+        rect : QRectF = self.__bounding_box__
+        transform : QTransform = QTransform()
+        transform.translate(rect.left(), rect.top())
+        transform.scale(rect.width() / master_width, rect.height() / master_height)
+        transform.translate(-master_box.left(), -master_box.top())
+        return transform
+
+    def drawBody(self, painter : QPainter) -> None:
+        painter.save()
+        painter.setTransform(self.transform, True)
+        if (isinstance(self.__master__, AggregateShape)):
+            self.__master__.drawBody(painter)
+        else:
+            path : QPainterPath = self.__master__.__painterpath__
+            if (self.__show_fill_body__):
+                painter.fillPath(path, QBrush(self.__fill_color__))
+            if (self.__outline_width__ > 0):
+                painter.setPen(QPen(self.__outline_color__, self.__outline_width__ / self.__scale__()))
+                painter.drawPath(path)
+        painter.restore()
+
+    def update(self) -> None:
+        # only the (shared) master has data that depends on anything
+        self.__master__.refresh()
+
+    def containsPoint(self, point : QPointF, tolerance : float = 0.0) -> bool:
+        inverse, invertible = self.transform.inverted()
+        if not (invertible):
+            return False
+        local : QPointF = inverse.map(point)
+        scale : float = self.__scale__()
+        if (isinstance(self.__master__, AggregateShape)):
+            return self.__master__.containsPoint(local, tolerance / scale)
+        if (self.__show_fill_body__ and self.__master__.__painterpath__.contains(local)):
+            return True
+        stroke_width : float = (self.__outline_width__ + 2.0 * tolerance) / scale
+        if (stroke_width <= 0.0):
+            return False
+        return self.__stroke_path__(stroke_width).contains(local)
+
+    def intersectsRect(self, rect : QRectF) -> bool:
+        inverse, invertible = self.transform.inverted()
+        if not (invertible):
+            return False
+        # instances are only scaled and mirrored, so the mapped rectangle is exact
+        local : QRectF = inverse.mapRect(rect)
+        if (isinstance(self.__master__, AggregateShape)):
+            return self.__master__.intersectsRect(local)
+        if (self.__show_fill_body__ and self.__master__.__painterpath__.intersects(local)):
+            return True
+        if (self.__outline_width__ <= 0.0):
+            return False
+        return self.__stroke_path__(self.__outline_width__ / self.__scale__()).intersects(local)
+
+    def intersectsPath(self, path : QPainterPath) -> bool:
+        inverse, invertible = self.transform.inverted()
+        if not (invertible):
+            return False
+        local : QPainterPath = inverse.map(path)
+        if (isinstance(self.__master__, AggregateShape)):
+            return self.__master__.intersectsPath(local)
+        if (self.__show_fill_body__ and self.__master__.__painterpath__.intersects(local)):
+            return True
+        if (self.__outline_width__ <= 0.0):
+            return False
+        return self.__stroke_path__(self.__outline_width__ / self.__scale__()).intersects(local)
+    #
+    # the other shape only tests against paths, so the instance's area is mapped out of the master once
+    # (for groups the outlines of the members are left out)
+    #
+    def intersectsShape(self, other : Shape) -> bool:
+        transform : QTransform = self.transform
+        if (isinstance(self.__master__, AggregateShape)):
+            return other.intersectsPath(transform.map(areaPath(self.__master__)))
+        if (self.__show_fill_body__ and other.intersectsPath(transform.map(self.__master__.__painterpath__))):
+            return True
+        if (self.__outline_width__ <= 0.0):
+            return False
+        return other.intersectsPath(transform.map(self.__stroke_path__(self.__outline_width__ / self.__scale__())))
+    #
+    # outline-area in the master's coordinates, 'stroke_width' has to be given in those as well
+    #
+    def __stroke_path__(self, stroke_width : float) -> QPainterPath:
+        if (self.__stroke_cache__ is None or self.__stroke_cache__[0] != stroke_width):
+            stroker : QPainterPathStroker = QPainterPathStroker()
+            stroker.setWidth(stroke_width)
+            self.__stroke_cache__ = (stroke_width, stroker.createStroke(self.__master__.__painterpath__))
+        return self.__stroke_cache__[1]
+
+    def strokeMargin(self) -> float:
+        if (isinstance(self.__master__, AggregateShape)):
+            return self.__master__.strokeMargin() * self.__scale__()
+        return super().strokeMargin()
+
+    def describeShape(self) -> QPolygonF:
+        return self.transform.map(self.__master__.describeShape())
+
+    def snapOutlines(self) -> list[QPolygonF]:
+        transform : QTransform = self.transform
+        return [transform.map(outline) for outline in self.__master__.snapOutlines()]
+
+    def snapPoints(self) -> list[QPointF]:
+        transform : QTransform = self.transform
+        return [transform.map(point) for point in self.__master__.snapPoints()]
+    #
+    # mirroring transformations swap the corners of the bounding-box, which mirrors the instance
+    #
+    def applyTransform(self, transform : QTransform) -> None:
+        self.__bounding_box__ = QRectF(transform.map(self.__bounding_box__.topLeft()),
+                                       transform.map(self.__bounding_box__.bottomRight()))
+        self.markDirty()
+    #
+    # standalone element with its own copy of the master's geometry, writeSVG() shares it through a symbol
+    #
+    def toSVG(self) -> XMLTree.Element:
+        transform : QTransform = self.transform
+        res : XMLTree.Element = XMLTree.Element("g", {"transform" : f"matrix({transform.m11()!r} 0 0 {transform.m22()!r} {transform.dx()!r} {transform.dy()!r})"})
+        element : XMLTree.Element = self.__master__.toSVG()
+        if not (isinstance(self.__master__, AggregateShape)):
+            element.set("style", self.__make_SVG_style__())
+        res.append(element)
+        return res
+    #
+    # the master is written into a <symbol> by the first of its instances, every instance is a <use>-element
+    # referring to it, symbols of plain masters take the style of each <use>
+    #
+    def writeSVG(self, writer) -> None:
+        aggregate : bool = isinstance(self.__master__, AggregateShape)
+        name : str | None = writer.symbolId(self.__master__)
+        if (name is None):
+            name = writer.beginSymbol(self.__master__, not aggregate)
+            self.__master__.writeSVG(writer)
+            writer.endSymbol()
+        transform : QTransform = self.transform
+        attributes : dict[str, str] = { "xlink:href" : f"#{name}",
+                                        "transform" : f"matrix({transform.m11()!r} 0 0 {transform.m22()!r} {transform.dx()!r} {transform.dy()!r})" }
+        if not (aggregate):
+            attributes["style"] = self.__make_SVG_style__()
+        writer.element("use", attributes)
+
+    # outlines are scaled along with the symbol in svg, so they are written thinner by the same factor
+    def __make_SVG_style__(self, outlineScale : float = 1.0) -> str:
+        return super().__make_SVG_style__(outlineScale / self.__scale__())
+
+    # (mean) factor the master is scaled by
+    def __scale__(self) -> float:
+        return max(sqrt(abs(self.transform.determinant())), 1e-9)
+#
+# instance taking the place of 'shape' (the shape itself if it is an instance already), a new instance
+# turns the shape into its master, so the shape must not be attached to a scene afterwards
+#
+def instanceOf(shape : Shape) -> InstanceShape:
+    if (isinstance(shape, InstanceShape)):
+        return shape
+    instance : InstanceShape = InstanceShape(shape, shape.boundingBox)
+    instance.__z_index__ = shape.__z_index__
+    return instance
+#
+# 'count' further instances of the master of 'instance', placed in a row to its right with 'gap' between them
+#
+def repeatInstance(instance : InstanceShape, count : int, gap : float) -> list[InstanceShape]:
+    res : list[InstanceShape] = []
+    step : float = instance.boundingBox.normalized().width() + gap
+    for i in range(1, count + 1):
+        copy : InstanceShape = InstanceShape(instance.master, instance.boundingBox.translated(i * step, 0.0))
+        copy.__fill_color__ = QColor(instance.__fill_color__)
+        copy.__outline_color__ = QColor(instance.__outline_color__)
+        copy.__outline_width__ = instance.__outline_width__
+        copy.__show_fill_body__ = instance.__show_fill_body__
+        res.append(copy)
+    return res
+#
+# filled area of a shape as one path (group-members added up, instances mapped out of their masters)
+#
+def areaPath(shape : Shape) -> QPainterPath:
+    if (isinstance(shape, InstanceShape)):
+        return shape.transform.map(areaPath(shape.master))
+    if (isinstance(shape, AggregateShape)):
+        res : QPainterPath = QPainterPath()
+        res.setFillRule(Qt.FillRule.WindingFill)
+        for child in shape.children:
+            res.addPath(areaPath(child))
+        return res
+    return shape.__painterpath__
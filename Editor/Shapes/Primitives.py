@@ -8,7 +8,6 @@ from math import sin, cos, radians, pi
 
 import xml.etree.ElementTree as XMLTree
 
-import Utility
 from Editor.Shapes.Shape import Shape
 #
 # polygon primitive
@@ -22,8 +21,45 @@ from Editor.Shapes.Shape import Shape
 class Polygon(Shape):
 
     def __init__(self, vertices : list[QPointF]) -> None:
+        self.__vertex_data__ : memoryview | None = None
         self.__polygon__ : QPolygonF = QPolygonF(vertices)
         super().__init__(self.__polygon__.boundingRect())
+    #
+    # construct a polygon whose vertices are only read from 'vertices' (flat x/y-floats,
+    # e.g. a memory-mapped block of a scene-file) once they are needed for the first time
+    #
+    @classmethod
+    def fromVertexData(cls, vertices : memoryview, boundingBox : QRectF) -> "Polygon":
+        polygon : Polygon = cls.__new__(cls)
+        Shape.__init__(polygon, boundingBox)
+        polygon.__polygon_data__ = None
+        polygon.__vertex_data__ = vertices
+        return polygon
+    #
+    # vertex-data is materialized lazily into a QPolygonF on first access
+    #
+    @property
+    def __polygon__(self) -> QPolygonF:
+        if (self.__polygon_data__ is None):
+            data : memoryview = self.__vertex_data__
+            self.__polygon_data__ = QPolygonF([QPointF(data[i], data[i + 1]) for i in range(0, len(data) - 1, 2)])
+            self.__vertex_data__ = None
+        return self.__polygon_data__
+
+    @__polygon__.setter
+    def __polygon__(self, value : QPolygonF) -> None:
+        self.__polygon_data__ = value
+        self.__vertex_data__ = None
+
+    @property
+    def materialized(self) -> bool:
+        return self.__polygon_data__ is not None
+
+    # counted without materializing lazily read vertex-data
+    def vertexCount(self) -> int:
+        if (self.__polygon_data__ is None):
+            return len(self.__vertex_data__) // 2
+        return self.__polygon_data__.size()
 
     def update(self) -> None:
         # fit polygon into bounding-box
@@ -36,12 +72,23 @@ class Polygon(Shape):
     def describeShape(self) -> QPolygonF:
         return self.__polygon__
 
+    def snapOutlines(self) -> list[QPolygonF]:
+        return [self.__polygon__]
+
+    def applyTransform(self, transform : QTransform) -> None:
+        # fit vertices into the current bounding-box first, then transform them directly
+        self.__fit_polygon_to_bounding_box__()
+        self.__polygon__ = transform.map(self.__polygon__)
+        self.__bounding_box__ = self.__polygon__.boundingRect()
+        self.markDirty()
+
     def toSVG(self) -> XMLTree.Element:
-        points : str = ""
-        for point in self.__polygon__.toList():
-            points += f"{point.x()},{point.y()} "
+        points : str = " ".join([f"{point.x()},{point.y()}" for point in self.__polygon__.toList()])
         return XMLTree.Element("polygon", {"points" : points,
                                            "style" : self.__make_SVG_style__()})
+
+    def writeSVG(self, writer) -> None:
+        writer.pointsElement("polygon", self.__polygon__, {"style" : self.__make_SVG_style__()})
     #
     # method to fit the polygon-data into the bounding-box
     #
@@ -53,30 +100,31 @@ class Polygon(Shape):
     # this can be simplified to directly scaling from old-size to new-size
     #
     def __fit_polygon_to_bounding_box__(self) -> None:
-
-        old_pos : QPointF = self.__polygon__.boundingRect().topLeft()
-        old_size : QSizeF = self.__polygon__.boundingRect().size()
-        old_center : QPointF  = self.__polygon__.boundingRect().center()
+        # read everything as plain floats once, the three steps are combined into one transformation
+        # that maps the vertices in a single pass
+        old_bounds : QRectF = self.__polygon__.boundingRect()
+        old_center : QPointF = old_bounds.center()
 
         # set size artificially here, or else division by zero occurs
         # effect should be barely noticeable
-        if (old_size.width() == 0):
-            old_size.setWidth(0.01)
-        if (old_size.height() == 0):
-            old_size.setHeight(0.01)
+        old_width : float = old_bounds.width() if (old_bounds.width() != 0) else 0.01
+        old_height : float = old_bounds.height() if (old_bounds.height() != 0) else 0.01
 
-        delta_pos  : QPointF = self.__true_topleft__() - old_pos
-        delta_scale : QSizeF = Utility.QSizeFDivide(Utility.QSizeFAbs(self.size), old_size)
+        rect : QRectF = self.__bounding_box__
+        delta_x : float = min(rect.left(), rect.right()) - old_bounds.left()
+        delta_y : float = min(rect.top(), rect.bottom()) - old_bounds.top()
+        scale_x : float = abs(rect.width()) / old_width
+        scale_y : float = abs(rect.height()) / old_height
 
-        if (delta_scale.width() == 0 or delta_scale.height() == 0):
+        if (scale_x == 0 or scale_y == 0):
             return # return here, because scaling would lose all data by multiplying with 0
 
-        # now apply all transformations
-        scale_transform : QTransform = QTransform.fromScale(delta_scale.width(), delta_scale.height())
         # for scaling to apply correctly polygon's center is moved to origin, then scaled, then translated back
-        self.__polygon__.translate(-old_center)
-        self.__polygon__ = scale_transform.map(self.__polygon__)
-        self.__polygon__.translate(old_center + delta_pos)
+        transform : QTransform = QTransform()
+        transform.translate(old_center.x() + delta_x, old_center.y() + delta_y)
+        transform.scale(scale_x, scale_y)
+        transform.translate(-old_center.x(), -old_center.y())
+        self.__polygon__ = transform.map(self.__polygon__)
     
 #
 # triangle primitive that consists of a single 3-sided polygon
@@ -106,13 +154,22 @@ class Rectangle(Shape):
 
     def describeShape(self) -> QPolygonF:
         return self.__painterpath__.toFillPolygon()
+
+    def snapOutlines(self) -> list[QPolygonF]:
+        return [QPolygonF(self.__bounding_box__.normalized())]
     
     def toSVG(self) -> XMLTree.Element:
-        return XMLTree.Element("rect", { "x" : str(self.topLeft.x()),
-                                         "y" : str(self.topLeft.y()),
-                                         "width" : str(self.size.width()),
-                                         "height" : str(self.size.height()),
-                                         "style" : self.__make_SVG_style__()})
+        return XMLTree.Element("rect", self.__svg_attributes__())
+
+    def writeSVG(self, writer) -> None:
+        writer.element("rect", self.__svg_attributes__())
+
+    def __svg_attributes__(self) -> dict[str, str]:
+        return { "x" : str(self.topLeft.x()),
+                 "y" : str(self.topLeft.y()),
+                 "width" : str(self.size.width()),
+                 "height" : str(self.size.height()),
+                 "style" : self.__make_SVG_style__()}
 
 #
 # ellipse primitive
@@ -134,13 +191,26 @@ class Ellipse(Shape):
 
     def describeShape(self) -> QPolygonF:
         return self.__painterpath__.toFillPolygon()
+
+    # center and the ends of both axes
+    def snapPoints(self) -> list[QPointF]:
+        box : QRectF = self.__bounding_box__.normalized()
+        center : QPointF = box.center()
+        return [center, QPointF(box.left(), center.y()), QPointF(box.right(), center.y()),
+                QPointF(center.x(), box.top()), QPointF(center.x(), box.bottom())]
     
     def toSVG(self) -> XMLTree.Element:
-        return XMLTree.Element("ellipse", {"cx" : str(self.center.x()), 
-                                           "cy" : str(self.center.y()),
-                                           "rx" : str(self.radii.width()),
-                                           "ry" : str(self.radii.height()),
-                                           "style" : self.__make_SVG_style__()})
+        return XMLTree.Element("ellipse", self.__svg_attributes__())
+
+    def writeSVG(self, writer) -> None:
+        writer.element("ellipse", self.__svg_attributes__())
+
+    def __svg_attributes__(self) -> dict[str, str]:
+        return {"cx" : str(self.center.x()), 
+                "cy" : str(self.center.y()),
+                "rx" : str(self.radii.width()),
+                "ry" : str(self.radii.height()),
+                "style" : self.__make_SVG_style__()}
     
     @property 
     def radii(self) -> QSizeF:
@@ -159,10 +229,16 @@ class Circle(Ellipse):
         super().__init__(center, QSizeF(radius, radius))
     
     def toSVG(self) -> XMLTree.Element:
-        return XMLTree.Element("circle", {"cx" : str(self.center.x()), 
-                                          "cy" : str(self.center.y()),
-                                          "r" : str(self.radius),
-                                          "style" : self.__make_SVG_style__()})
+        return XMLTree.Element("circle", self.__svg_attributes__())
+
+    def writeSVG(self, writer) -> None:
+        writer.element("circle", self.__svg_attributes__())
+
+    def __svg_attributes__(self) -> dict[str, str]:
+        return {"cx" : str(self.center.x()), 
+                "cy" : str(self.center.y()),
+                "r" : str(self.radius),
+                "style" : self.__make_SVG_style__()}
 
     @property
     def radius(self) -> float:
@@ -177,6 +253,7 @@ class Circle(Ellipse):
     def size(self, value : QSizeF) -> None:
         abs_min : float = min(abs(value.width()), abs(value.height())) # constraint that a circle must have a square boundingBox
         self.boundingBox.setSize(QSizeF(abs_min, abs_min))
+        self.markDirty()
 
 #
 # star primitive
@@ -226,6 +303,113 @@ class Star(Polygon):
 
         return res
 
+#
+# compound-polygon primitive
+#
+# area bounded by several closed rings, e.g. the union of many shapes (see Editor/Flatten.py),
+# filled with the even-odd-rule, so rings inside other rings are holes
+#
+class CompoundPolygon(Shape):
+
+    def __init__(self, rings : list[QPolygonF]) -> None:
+        self.__rings__ : list[QPolygonF] = [QPolygonF(ring) for ring in rings]
+        super().__init__(__rings_bounds__(self.__rings__))
+    #
+    # construct from flat x/y-floats with every ring followed by a (nan, nan)-pair (as stored in scene-files)
+    #
+    @classmethod
+    def fromVertexData(cls, vertices, boundingBox : QRectF) -> "CompoundPolygon":
+        rings : list[QPolygonF] = []
+        ring : list[QPointF] = []
+        for i in range(0, len(vertices) - 1, 2):
+            if (vertices[i] != vertices[i]): # nan
+                rings.append(QPolygonF(ring))
+                ring = []
+            else:
+                ring.append(QPointF(vertices[i], vertices[i + 1]))
+        if (len(ring)):
+            rings.append(QPolygonF(ring))
+        shape : CompoundPolygon = cls(rings)
+        shape.__bounding_box__ = boundingBox
+        return shape
+
+    def vertexData(self) -> list[float]:
+        data : list[float] = []
+        for ring in self.__rings__:
+            for point in ring.toList():
+                data.append(point.x())
+                data.append(point.y())
+            data.append(float("nan"))
+            data.append(float("nan"))
+        return data
+
+    @property
+    def rings(self) -> list[QPolygonF]:
+        return self.__rings__
+
+    def vertexCount(self) -> int:
+        return sum(ring.size() for ring in self.__rings__)
+
+    def snapOutlines(self) -> list[QPolygonF]:
+        return self.__rings__
+
+    def update(self) -> None:
+        self.__fit_rings_to_bounding_box__()
+        self.__painterpath__.clear()
+        self.__painterpath__.setFillRule(Qt.FillRule.OddEvenFill)
+        for ring in self.__rings__:
+            self.__painterpath__.addPolygon(ring)
+            self.__painterpath__.closeSubpath()
+
+    def describeShape(self) -> QPolygonF:
+        return self.__painterpath__.toFillPolygon()
+
+    def applyTransform(self, transform : QTransform) -> None:
+        self.__fit_rings_to_bounding_box__()
+        self.__rings__ = [transform.map(ring) for ring in self.__rings__]
+        self.__bounding_box__ = __rings_bounds__(self.__rings__)
+        self.markDirty()
+
+    def toSVG(self) -> XMLTree.Element:
+        data : str = " ".join("M" + " ".join(f"{point.x()},{point.y()}" for point in ring.toList()) + "Z" for ring in self.__rings__)
+        return XMLTree.Element("path", {"d" : data,
+                                        "fill-rule" : "evenodd",
+                                        "style" : self.__make_SVG_style__()})
+
+    def writeSVG(self, writer) -> None:
+        writer.ringsElement(self.__rings__, {"fill-rule" : "evenodd", "style" : self.__make_SVG_style__()})
+    #
+    # same as the fit of polygons (see Polygon.__fit_polygon_to_bounding_box__()), for all rings at once
+    #
+    def __fit_rings_to_bounding_box__(self) -> None:
+        old_bounds : QRectF = __rings_bounds__(self.__rings__)
+        old_center : QPointF = old_bounds.center()
+        old_width : float = old_bounds.width() if (old_bounds.width() != 0) else 0.01
+        old_height : float = old_bounds.height() if (old_bounds.height() != 0) else 0.01
+
+        rect : QRectF = self.__bounding_box__
+        delta_x : float = min(rect.left(), rect.right()) - old_bounds.left()
+        delta_y : float = min(rect.top(), rect.bottom()) - old_bounds.top()
+        scale_x : float = abs(rect.width()) / old_width
+        scale_y : float = abs(rect.height()) / old_height
+
+        if (scale_x == 0 or scale_y == 0):
+            return
+        if (delta_x == 0 and delta_y == 0 and scale_x == 1 and scale_y == 1):
+            return
+
+        transform : QTransform = QTransform()
+        transform.translate(old_center.x() + delta_x, old_center.y() + delta_y)
+        transform.scale(scale_x, scale_y)
+        transform.translate(-old_center.x(), -old_center.y())
+        self.__rings__ = [transform.map(ring) for ring in self.__rings__]
+
+def __rings_bounds__(rings : list[QPolygonF]) -> QRectF:
+    bounds : QRectF = QRectF()
+    for ring in rings:
+        bounds = bounds.united(ring.boundingRect())
+    return bounds
+
 #
 # utility functions to approximate shapes into triangles for deformations
 #
@@ -1,13 +1,13 @@
 
 from PySide6.QtCore import QRectF, QSizeF, QPointF
 
-from PySide6.QtGui import QPainter, QColor, QPainterPath, QPen, QBrush, QPolygonF, QTransform
+from PySide6.QtGui import QPainter, QColor, QPainterPath, QPen, QBrush, QPolygonF, QTransform, QPainterPathStroker
 
 from PySide6.QtCore import Qt
 
 import xml.etree.ElementTree as XMLTree
 
-import Utility
+from VectorMath import unitedBox
 #
 # base class for all other shapes
 #
@@ -27,17 +27,135 @@ class Shape:
         self.__show_fill_body__ : bool = True
         self.__show_bounding_box__ : bool = False
         self.__bounding_box__ : QRectF = boundingBox
+        # a shape is dirty as long as its painterpath does not reflect its bounding-box / style
+        self.__dirty__ : bool = True
+        # aggregate-shapes this shape is a member of, they need to know when this shape changes
+        self.__parent_groups__ : list[Shape] = []
+        # position in the drawing-order of the scene this shape is attached to (higher is drawn later)
+        self.__z_index__ : int = 0
+        # identifies the shape across saves and journal-entries, assigned when attached to a scene (0 = none yet)
+        self.__uid__ : int = 0
+        # outline-area used for picking, cached as (stroke-width, path) until the shape changes
+        self.__stroke_cache__ : tuple[float, QPainterPath] | None = None
+        # text the last svg-export wrote for this shape, reused until the shape changes (see SVGWriter.writeShape())
+        self.__svg_fragment__ : tuple | None = None
+        self.__svg_style__ : str | None = None
 
     def draw(self, painter : QPainter) -> None:
+        self.drawBody(painter)
+        self.drawOverlay(painter)
+    #
+    # drawBody() draws only fill and outline of the shape (everything that can be cached)
+    # drawOverlay() draws editor-decorations like the selection-bounding-box on top of it
+    #
+    def drawBody(self, painter : QPainter) -> None:
         if (self.__show_fill_body__):
             painter.fillPath(self.__painterpath__, QBrush(self.__fill_color__))
         if (self.__outline_width__ > 0):
             painter.setPen(QPen(self.__outline_color__, self.__outline_width__))
             painter.drawPath(self.__painterpath__)
+
+    def drawOverlay(self, painter : QPainter) -> None:
         if (self.__show_bounding_box__):
             painter.setPen(QPen(Shape.boundingBoxColor, Shape.boundingBoxWidth))
             painter.drawRect(QRectF(self.boundingBox.topLeft(), 
                                     self.boundingBox.size()))
+    #
+    # dirty-tracking
+    #
+    # every mutation of the bounding-box (or style) marks a shape as dirty, so update()
+    # only has to be performed on shapes that actually changed since the last frame
+    # the mark is propagated upwards to all groups containing this shape
+    #
+    def markDirty(self) -> None:
+        self.__dirty__ = True
+        self.__stroke_cache__ = None
+        self.__svg_fragment__ = None
+        self.__svg_style__ = None
+        for group in self.__parent_groups__:
+            group.markDirty()
+
+    @property
+    def dirty(self) -> bool:
+        return self.__dirty__
+    #
+    # calls update() if the shape is dirty, returns whether an update was performed
+    #
+    def refresh(self) -> bool:
+        if (self.__dirty__):
+            self.update()
+            self.__dirty__ = False
+            return True
+        return False
+    #
+    # exact hit-test against the painterpath of the shape
+    #
+    # the filled body counts only if it is shown, the outline counts with its full width
+    # which is grown by 'tolerance' (so thin or unfilled shapes can still be picked)
+    #
+    def containsPoint(self, point : QPointF, tolerance : float = 0.0) -> bool:
+        if (self.__show_fill_body__ and self.__painterpath__.contains(point)):
+            return True
+        stroke_width : float = self.__outline_width__ + 2.0 * tolerance
+        if (stroke_width <= 0.0):
+            return False
+        return self.__stroke_path__(stroke_width).contains(point)
+    #
+    # exact test whether any visible part of the shape touches the passed rectangle
+    #
+    def intersectsRect(self, rect : QRectF) -> bool:
+        if (self.__show_fill_body__ and self.__painterpath__.intersects(rect)):
+            return True
+        if (self.__outline_width__ <= 0.0):
+            return False
+        return self.__stroke_path__(self.__outline_width__).intersects(rect)
+
+    def intersectsPath(self, path : QPainterPath) -> bool:
+        if (self.__show_fill_body__ and self.__painterpath__.intersects(path)):
+            return True
+        if (self.__outline_width__ <= 0.0):
+            return False
+        return self.__stroke_path__(self.__outline_width__).intersects(path)
+    #
+    # exact test whether visible parts of both shapes overlap (or touch)
+    #
+    def intersectsShape(self, other : "Shape") -> bool:
+        if (self.__show_fill_body__ and other.intersectsPath(self.__painterpath__)):
+            return True
+        if (self.__outline_width__ <= 0.0):
+            return False
+        return other.intersectsPath(self.__stroke_path__(self.__outline_width__))
+
+    def __stroke_path__(self, stroke_width : float) -> QPainterPath:
+        if (self.__stroke_cache__ is None or self.__stroke_cache__[0] != stroke_width):
+            stroker : QPainterPathStroker = QPainterPathStroker()
+            stroker.setWidth(stroke_width)
+            self.__stroke_cache__ = (stroke_width, stroker.createStroke(self.__painterpath__))
+        return self.__stroke_cache__[1]
+    #
+    # how far the outline of this shape reaches out of its bounding-box
+    #
+    def strokeMargin(self) -> float:
+        return 0.5 * self.__outline_width__
+    #
+    # memory held by render-caches of this shape in bytes (plain shapes don't cache anything)
+    #
+    def cacheBytes(self) -> int:
+        return 0
+    #
+    # number of vertices the shape stores (parametric shapes like rectangles don't store any)
+    #
+    def vertexCount(self) -> int:
+        return 0
+    #
+    # geometry other shapes snap to while they are dragged (see Editor/Snapping.py): closed outlines,
+    # whose vertices and edges are snapped to, and single points (the bounding-box corners always are)
+    #
+    def snapOutlines(self) -> list[QPolygonF]:
+        return []
+
+    def snapPoints(self) -> list[QPointF]:
+        return []
     
     #
     # update() method should recalculate the shape-data to fit the bounding-box
@@ -56,13 +174,28 @@ class Shape:
     #
     def toSVG(self) -> XMLTree.Element:
         raise TypeError("cannot call toSVG() on base class")
+    #
+    # write the svg-element of this shape to a streaming SVGWriter
+    # (shapes should override this to write directly instead of building an element-tree first)
+    #
+    def writeSVG(self, writer) -> None:
+        writer.elementTree(self.toSVG())
+
+    # inline-style of the svg-element, kept until the shape changes
+    def svgStyle(self) -> str:
+        if (self.__svg_style__ is None):
+            self.__svg_style__ = self.__make_SVG_style__()
+        return self.__svg_style__
 
-    def __make_SVG_style__(self) -> str:
+    # 'outlineScale' scales the written outline-width (for elements whose coordinates are scaled in svg)
+    def __make_SVG_style__(self, outlineScale : float = 1.0) -> str:
         attributes : list[str] = []
         if self.__show_fill_body__:
             attributes.append(f"fill:rgb({self.__fill_color__.red()},{self.__fill_color__.green()},{self.__fill_color__.blue()})")
+        else:
+            attributes.append("fill:none") # svg would fill with black otherwise
         if (self.__outline_width__ > 0.0):
-            attributes.append(f"stroke-width:{self.__outline_width__}")
+            attributes.append(f"stroke-width:{self.__outline_width__ * outlineScale}")
             attributes.append(f"stroke:rgb({self.__outline_color__.red()},{self.__outline_color__.green()},{self.__outline_color__.blue()})")
         return ';'.join(attributes)
 
@@ -103,26 +236,33 @@ class Shape:
     @topLeft.setter
     def topLeft(self, value : QPointF) -> None:
         self.boundingBox.setTopLeft(value)
+        self.markDirty()
 
     @topRight.setter
     def topRight(self, value : QPointF) -> None:
         self.boundingBox.setTopRight(value)
+        self.markDirty()
 
     @bottomLeft.setter
     def bottomLeft(self, value : QPointF) -> None:
         self.boundingBox.setBottomLeft(value)
+        self.markDirty()
 
     @bottomRight.setter
     def bottomRight(self, value : QPointF) -> None:
         self.boundingBox.setBottomRight(value)
+        self.markDirty()
 
     @size.setter
     def size(self, value : QSizeF) -> None:
         self.boundingBox.setSize(value)
+        self.markDirty()
 
     @center.setter
     def center(self, value : QPointF) -> None:
-        self.boundingBox.setTopLeft(value - 0.5 * Utility.toQPointF(self.size))
+        size : QSizeF = self.boundingBox.size()
+        self.boundingBox.setTopLeft(QPointF(value.x() - 0.5 * size.width(), value.y() - 0.5 * size.height()))
+        self.markDirty()
     
     #
     # translate-methods
@@ -130,9 +270,20 @@ class Shape:
 
     def moveTo(self, value : QPointF) -> None:
         self.boundingBox.moveTo(value)
+        self.markDirty()
         
     def translate(self, offset : QPointF) -> None:
         self.boundingBox.translate(offset)
+        self.markDirty()
+    #
+    # apply an affine transformation (e.g. translate/scale/mirror) to the shape
+    #
+    # the default maps the bounding-box, shapes with own vertex-data also map those,
+    # so that mirroring actually flips them
+    #
+    def applyTransform(self, transform : QTransform) -> None:
+        self.__bounding_box__ = transform.mapRect(self.boundingBox.normalized())
+        self.markDirty()
 
     #
     # sometimes after transformations, it could be that the topleft point is now visually not
@@ -155,16 +306,11 @@ class Shape:
     #
     # similiar to __mirror_state__ this method returns what corner is currently visually in the topleft
     #
+    # (the smaller coordinate on each axis, read directly instead of through the corner-properties)
+    #
     def __true_topleft__(self) -> QPointF:
-        m_state : QPointF = self.__mirror_state__()
-        if (m_state.x() > 0 and m_state.y() > 0):
-            return self.topLeft
-        elif (m_state.x() > 0 and m_state.y() < 0):
-            return self.bottomLeft
-        elif (m_state.x() < 0 and m_state.y() > 0):
-            return self.topRight
-        elif (m_state.x() < 0 and m_state.y() < 0):
-            return self.bottomRight
+        rect : QRectF = self.__bounding_box__
+        return QPointF(min(rect.left(), rect.right()), min(rect.top(), rect.bottom()))
     #
     # equality operator to compare with address-values (needed for exactly comparing if a shape is another in a scene)
     # also other comparison isn't really sensible e.g. compare bounding-boxes? or color-values?
@@ -177,15 +323,4 @@ class Shape:
 # utility function to determine the smallest bounding-box to encompass a given set of shapes
 #
 def findBoundingBoxShapes(shapes : list[Shape]) -> QRectF:
-    topLeft : QPointF = shapes[0].topLeft.__copy__()
-    bottomRight : QPointF = shapes[0].bottomRight.__copy__()
-    for shape in shapes:
-        if shape.topLeft.x() < topLeft.x():
-            topLeft.setX(shape.topLeft.x())
-        if (shape.topLeft.y() < topLeft.y()):
-            topLeft.setY(shape.topLeft.y())
-        if (shape.bottomRight.x() > bottomRight.x()):
-            bottomRight.setX(shape.bottomRight.x())
-        if (shape.bottomRight.y() > bottomRight.y()):
-            bottomRight.setY(shape.bottomRight.y())
-    return QRectF(topLeft, Utility.toQSizeF(bottomRight - topLeft))
\ No newline at end of file
+    return unitedBox([shape.__bounding_box__ for shape in shapes]).toQRectF()
\ No newline at end of file
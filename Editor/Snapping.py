@@ -0,0 +1,417 @@
+from PySide6.QtCore import QPointF, QRectF
+from PySide6.QtGui import QPainter, QPen, QColor, QMouseEvent, QTransform
+from PySide6.QtCore import Qt
+
+from enum import Enum
+from math import ceil, sqrt
+
+from Editor.Shapes.Shape import Shape
+from Editor.SceneListener import SceneListener
+from Editor.Scene import Scene
+#
+# 2-d-tree class
+#
+# static tree over points given by their ids into the coordinate-lists 'xs' and 'ys', stored implicitly
+# in 'order': the point in the middle of a range splits it, the points before it are not above its
+# x- (even depths) or y-coordinate (odd depths), the points after it not below; ranges of at most
+# 'leafSize' points are not split any further and are scanned as a whole
+#
+class KDTree:
+
+    leafSize : int = 8
+
+    def __init__(self, ids : list[int], xs : list[float], ys : list[float]) -> None:
+        self.xs : list[float] = xs
+        self.ys : list[float] = ys
+        self.order : list[int] = list(ids)
+        stack : list[tuple[int, int, int]] = [(0, len(self.order), 0)]
+        while (len(stack)):
+            low, high, axis = stack.pop()
+            if (high - low <= KDTree.leafSize):
+                continue
+            keys : list[float] = xs if (axis == 0) else ys
+            self.order[low:high] = sorted(self.order[low:high], key=keys.__getitem__)
+            middle : int = (low + high) >> 1
+            stack.append((low, middle, 1 - axis))
+            stack.append((middle + 1, high, 1 - axis))
+
+    def __len__(self) -> int:
+        return len(self.order)
+    #
+    # closest accepted point that is nearer than sqrt('bestDistance'), returns (id, squared distance),
+    # or the passed 'best' and 'bestDistance' if there is none
+    #
+    def nearest(self, x : float, y : float, best : int, bestDistance : float, accept) -> tuple[int, float]:
+        xs : list[float] = self.xs
+        ys : list[float] = self.ys
+        order : list[int] = self.order
+        leaf_size : int = KDTree.leafSize
+        # (range, axis, squared distance of the range to the query-point at least)
+        stack : list[tuple[int, int, int, float]] = [(0, len(order), 0, 0.0)]
+        while (len(stack)):
+            low, high, axis, bound = stack.pop()
+            if (bound >= bestDistance):
+                continue
+            if (high - low <= leaf_size):
+                for point in order[low:high]:
+                    dx : float = xs[point] - x
+                    dy : float = ys[point] - y
+                    if (dx * dx + dy * dy < bestDistance and accept(point)):
+                        best, bestDistance = point, dx * dx + dy * dy
+                continue
+            middle : int = (low + high) >> 1
+            point : int = order[middle]
+            dx : float = xs[point] - x
+            dy : float = ys[point] - y
+            distance : float = dx * dx + dy * dy
+            if (distance < bestDistance and accept(point)):
+                best, bestDistance = point, distance
+            split : float = dx if (axis == 0) else dy
+            # the side of the query-point is searched first, the other one only if it can still be closer
+            if (split > 0.0):
+                stack.append((middle + 1, high, 1 - axis, split * split))
+                stack.append((low, middle, 1 - axis, 0.0))
+            else:
+                stack.append((low, middle, 1 - axis, split * split))
+                stack.append((middle + 1, high, 1 - axis, 0.0))
+        return (best, bestDistance)
+    #
+    # ids of all accepted points within 'radius'
+    #
+    def within(self, x : float, y : float, radius : float, accept, result : list[int]) -> None:
+        xs : list[float] = self.xs
+        ys : list[float] = self.ys
+        order : list[int] = self.order
+        leaf_size : int = KDTree.leafSize
+        limit : float = radius * radius
+        stack : list[tuple[int, int, int]] = [(0, len(order), 0)]
+        while (len(stack)):
+            low, high, axis = stack.pop()
+            if (high - low <= leaf_size):
+                for point in order[low:high]:
+                    dx : float = xs[point] - x
+                    dy : float = ys[point] - y
+                    if (dx * dx + dy * dy <= limit and accept(point)):
+                        result.append(point)
+                continue
+            middle : int = (low + high) >> 1
+            point : int = order[middle]
+            dx : float = xs[point] - x
+            dy : float = ys[point] - y
+            if (dx * dx + dy * dy <= limit and accept(point)):
+                result.append(point)
+            split : float = dx if (axis == 0) else dy
+            if (split >= -radius):
+                stack.append((low, middle, 1 - axis))
+            if (split <= radius):
+                stack.append((middle + 1, high, 1 - axis))
+#
+# snap-index class
+#
+# points of many owners (shapes) in a set of 2-d-trees that is updated incrementally
+#
+# inserted points are only collected and become a tree of their own at the next query, trees of at most
+# the same size are merged into it (the 'logarithmic method'), so there are never more than log2(n) trees
+# and every point is part of a rebuild only log2(n) times; removed points are only marked and dropped
+# once they make up half of all points
+#
+class SnapIndex:
+    def __init__(self) -> None:
+        self.xs : list[float] = []
+        self.ys : list[float] = []
+        # per point: its owner (None once removed) and what the caller passed along with it
+        self.owners : list[object | None] = []
+        self.data : list[object] = []
+        self.__ids__ : dict[object, list[int]] = {}
+        self.__trees__ : list[KDTree] = [] # largest first
+        self.__pending__ : list[int] = []
+        self.__removed__ : int = 0
+
+    def __len__(self) -> int:
+        return len(self.xs) - self.__removed__
+
+    def __contains__(self, owner : object) -> bool:
+        return owner in self.__ids__
+
+    def insert(self, owner : object, xs : list[float], ys : list[float], data : list[object]) -> None:
+        ids : range = range(len(self.xs), len(self.xs) + len(xs))
+        self.__ids__.setdefault(owner, []).extend(ids)
+        self.__pending__.extend(ids)
+        self.xs.extend(xs)
+        self.ys.extend(ys)
+        self.owners.extend([owner] * len(xs))
+        self.data.extend(data)
+
+    def remove(self, owner : object) -> None:
+        for point in self.__ids__.pop(owner, []):
+            self.owners[point] = None
+            self.__removed__ += 1
+    #
+    # closest point within 'radius' whose owner is not excluded, -1 if there is none
+    #
+    def nearest(self, x : float, y : float, radius : float, exclude : set | frozenset = frozenset()) -> int:
+        self.__flush__()
+        owners : list[object | None] = self.owners
+        accept = lambda point : owners[point] is not None and not (owners[point] in exclude)
+        best : int = -1
+        # slightly enlarged, so points exactly on the radius are still found
+        best_distance : float = radius * radius * (1.0 + 1e-9) + 1e-12
+        for tree in self.__trees__:
+            best, best_distance = tree.nearest(x, y, best, best_distance, accept)
+        return best
+
+    def within(self, x : float, y : float, radius : float, exclude : set | frozenset = frozenset()) -> list[int]:
+        self.__flush__()
+        owners : list[object | None] = self.owners
+        accept = lambda point : owners[point] is not None and not (owners[point] in exclude)
+        result : list[int] = []
+        for tree in self.__trees__:
+            tree.within(x, y, radius, accept, result)
+        return result
+
+    def __flush__(self) -> None:
+        if (self.__removed__ > 64 and 2 * self.__removed__ > len(self.xs)):
+            self.__compact__()
+        if not (len(self.__pending__)):
+            return
+        tree : KDTree = KDTree(self.__pending__, self.xs, self.ys)
+        self.__pending__ = []
+        while (len(self.__trees__) and len(self.__trees__[-1]) <= len(tree)):
+            smaller : KDTree = self.__trees__.pop()
+            tree = KDTree([point for point in smaller.order if (self.owners[point] is not None)] + tree.order, self.xs, self.ys)
+        self.__trees__.append(tree)
+    # drop removed points, everything left becomes pending and is rebuilt as one tree
+    def __compact__(self) -> None:
+        xs, ys, owners, data = self.xs, self.ys, self.owners, self.data
+        self.xs, self.ys, self.owners, self.data = [], [], [], []
+        self.__ids__ = {}
+        self.__trees__ = []
+        self.__pending__ = []
+        self.__removed__ = 0
+        for point in range(len(xs)):
+            if (owners[point] is not None):
+                self.__ids__.setdefault(owners[point], []).append(len(self.xs))
+                self.__pending__.append(len(self.xs))
+                self.xs.append(xs[point])
+                self.ys.append(ys[point])
+                self.owners.append(owners[point])
+                self.data.append(data[point])
+#
+# enum to describe what a snap-target lies on
+#
+class SnapKind(Enum):
+    VERTEX = 1  # vertex of an outline or a point of a shape (e.g. the center of an ellipse)
+    CORNER = 2  # corner of a bounding-box
+    EDGE   = 3  # closest point on an edge of an outline
+#
+# point a dragged point snapped to
+#
+class SnapTarget:
+    def __init__(self, point : QPointF, kind : SnapKind, shape : Shape) -> None:
+        self.point : QPointF = point
+        self.kind : SnapKind = kind
+        self.shape : Shape = shape
+#
+# snapping class
+#
+# snaps points dragged by the editor (new shapes, moved/scaled shapes) to vertices, bounding-box
+# corners and edges of the attached shapes within a radius
+#
+# vertices and corners are kept in one snap-index, edges in another one by their midpoints (edges
+# longer than 'maxEdgeLength' are split first, so every edge within the radius is found by looking
+# up the midpoints within the radius plus half that length), vertices win over edges
+#
+# as a scene-listener the indices are updated with every edit of the scene: edited shapes are only
+# marked and their points replaced before the next query, when they are up to date again
+#
+class Snapping(SceneListener):
+
+    maxEdgeLength : float = 64.0                        # in world-units
+    markerSize : float = 5.0                            # in screen-pixels
+    markerColor : QColor = QColor(255, 120, 0)
+
+    def __init__(self, scene : Scene) -> None:
+        self.scene : Scene = scene
+        self.enabled : bool = True
+        # target of the last snapped point, shown until the drag ends
+        self.target : SnapTarget | None = None
+        # built on the first query, None while the whole scene has to be indexed again
+        self.__points__ : SnapIndex | None = None
+        self.__edges__ : SnapIndex | None = None
+        self.__stale__ : dict[Shape, None] = {}
+        self.scene.listeners.append(self)
+    #
+    # whether points dragged with 'event' should be snapped (holding alt suspends snapping)
+    #
+    def active(self, event : QMouseEvent) -> bool:
+        return self.enabled and not (event.modifiers() & Qt.KeyboardModifier.AltModifier)
+    #
+    # closest snap-target within 'radius' (world-units) of 'point', shapes in 'exclude' are ignored
+    # (e.g. the dragged shapes themselves), the result is kept as 'target' to be drawn
+    #
+    def snap(self, point : QPointF, radius : float, exclude : set[Shape] | frozenset = frozenset()) -> SnapTarget | None:
+        self.__prepare__()
+        self.target = self.__find_vertex__(point.x(), point.y(), radius, exclude)
+        if (self.target is None):
+            self.target = self.__find_edge__(point.x(), point.y(), radius, exclude)
+        return self.target
+    #
+    # offset that snaps the closest of 'points' (e.g. the corners of a moved shape), None if none is in reach
+    # (a vertex in reach of any of the points wins over all edges)
+    #
+    def snapOffset(self, points : list[QPointF], radius : float, exclude : set[Shape] | frozenset = frozenset()) -> QPointF | None:
+        self.__prepare__()
+        self.target = None
+        offset : QPointF | None = None
+        for find in (self.__find_vertex__, self.__find_edge__):
+            for point in points:
+                target : SnapTarget | None = find(point.x(), point.y(), radius, exclude)
+                if (target is not None):
+                    offset = target.point - point
+                    radius = sqrt(QPointF.dotProduct(offset, offset))
+                    self.target = target
+            if (self.target is not None):
+                break
+        return offset
+
+    def clearTarget(self) -> None:
+        self.target = None
+
+    def drawTarget(self, painter : QPainter) -> None:
+        if (self.target is None):
+            return
+        zoom : float = sqrt(abs(painter.worldTransform().determinant()))
+        size : float = Snapping.markerSize / zoom
+        point : QPointF = self.target.point
+        painter.setPen(QPen(Snapping.markerColor, 1.5 / zoom))
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        if (self.target.kind == SnapKind.EDGE):
+            painter.drawLine(QPointF(point.x() - size, point.y() - size), QPointF(point.x() + size, point.y() + size))
+            painter.drawLine(QPointF(point.x() - size, point.y() + size), QPointF(point.x() + size, point.y() - size))
+        else:
+            painter.drawRect(QRectF(point.x() - size, point.y() - size, 2.0 * size, 2.0 * size))
+
+    def __find_vertex__(self, x : float, y : float, radius : float, exclude : set[Shape] | frozenset) -> SnapTarget | None:
+        point : int = self.__points__.nearest(x, y, radius, exclude)
+        if (point < 0):
+            return None
+        return SnapTarget(QPointF(self.__points__.xs[point], self.__points__.ys[point]),
+                          self.__points__.data[point], self.__points__.owners[point])
+
+    def __find_edge__(self, x : float, y : float, radius : float, exclude : set[Shape] | frozenset) -> SnapTarget | None:
+        best : SnapTarget | None = None
+        best_distance : float = radius * radius
+        for edge in self.__edges__.within(x, y, radius + 0.5 * Snapping.maxEdgeLength, exclude):
+            x0, y0, x1, y1 = self.__edges__.data[edge]
+            dx : float = x1 - x0
+            dy : float = y1 - y0
+            length : float = dx * dx + dy * dy
+            t : float = 0.0 if (length == 0.0) else min(1.0, max(0.0, ((x - x0) * dx + (y - y0) * dy) / length))
+            px : float = x0 + t * dx
+            py : float = y0 + t * dy
+            distance : float = (px - x) * (px - x) + (py - y) * (py - y)
+            if (distance <= best_distance):
+                best = SnapTarget(QPointF(px, py), SnapKind.EDGE, self.__edges__.owners[edge])
+                best_distance = distance
+        return best
+    #
+    # (re-)index everything that changed since the last query, shapes are updated first
+    # so their vertices fit their bounding-boxes
+    #
+    def __prepare__(self) -> None:
+        if (self.__points__ is None):
+            self.scene.update()
+            self.__points__ = SnapIndex()
+            self.__edges__ = SnapIndex()
+            self.__stale__.clear()
+            for shape in self.scene.attachedShapes:
+                self.__insert__(shape)
+        elif (len(self.__stale__)):
+            self.scene.refresh(list(self.__stale__))
+            for shape in self.__stale__:
+                self.__points__.remove(shape)
+                self.__edges__.remove(shape)
+                self.__insert__(shape)
+            self.__stale__.clear()
+
+    def __insert__(self, shape : Shape) -> None:
+        # (x, y) -> kind, corners that are vertices as well (e.g. of rectangles) are only indexed once
+        points : dict[tuple[float, float], SnapKind] = {}
+        box : QRectF = shape.boundingBox.normalized()
+        for corner in (box.topLeft(), box.topRight(), box.bottomRight(), box.bottomLeft()):
+            points[(corner.x(), corner.y())] = SnapKind.CORNER
+        for point in shape.snapPoints():
+            points[(point.x(), point.y())] = SnapKind.VERTEX
+        edge_xs : list[float] = []
+        edge_ys : list[float] = []
+        edges : list[tuple[float, float, float, float]] = []
+        for outline in shape.snapOutlines():
+            vertices : list[tuple[float, float]] = [(vertex.x(), vertex.y()) for vertex in outline.toList()]
+            if (len(vertices) > 1 and vertices[0] == vertices[-1]):
+                vertices.pop()
+            previous : tuple[float, float] = vertices[-1] if (len(vertices)) else (0.0, 0.0)
+            for vertex in vertices:
+                points[vertex] = SnapKind.VERTEX
+                __split_edge__(previous[0], previous[1], vertex[0], vertex[1], edge_xs, edge_ys, edges)
+                previous = vertex
+        self.__points__.insert(shape, [point[0] for point in points], [point[1] for point in points], list(points.values()))
+        self.__edges__.insert(shape, edge_xs, edge_ys, edges)
+    #
+    # edits of the scene, shapes inside groups are re-indexed through their attached groups
+    #
+    def __mark_stale__(self, shapes : list[Shape]) -> None:
+        if (self.__points__ is None):
+            return
+        for shape in shapes:
+            if (shape in self.__points__):
+                self.__stale__[shape] = None
+            else:
+                self.__mark_stale__(shape.__parent_groups__)
+
+    def shapesAttached(self, shapes : list[Shape]) -> None:
+        if (self.__points__ is not None):
+            for shape in shapes:
+                self.__stale__[shape] = None
+
+    def shapesDetached(self, shapes : list[Shape]) -> None:
+        if (self.__points__ is None):
+            return
+        for shape in shapes:
+            self.__stale__.pop(shape, None)
+            self.__points__.remove(shape)
+            self.__edges__.remove(shape)
+
+    def shapesEdited(self, shapes : list[Shape], previous : list[QRectF]) -> None:
+        self.__mark_stale__(shapes)
+
+    def shapesTransformed(self, shapes : list[Shape], transform : QTransform) -> None:
+        self.__mark_stale__(shapes)
+
+    def shapesDeformed(self, shapes : list[Shape]) -> None:
+        self.__mark_stale__(shapes)
+
+    def shapesReplaced(self, previous : list[Shape]) -> None:
+        self.__points__ = None
+
+    def sceneCleared(self) -> None:
+        self.__points__ = None
+        self.target = None
+
+# the edge from (x0, y0) to (x1, y1) as midpoints and endpoints of pieces no longer than Snapping.maxEdgeLength
+def __split_edge__(x0 : float, y0 : float, x1 : float, y1 : float,
+                   xs : list[float], ys : list[float], edges : list[tuple[float, float, float, float]]) -> None:
+    dx : float = x1 - x0
+    dy : float = y1 - y0
+    length : float = sqrt(dx * dx + dy * dy)
+    if (length <= Snapping.maxEdgeLength):
+        xs.append(x0 + 0.5 * dx)
+        ys.append(y0 + 0.5 * dy)
+        edges.append((x0, y0, x1, y1))
+        return
+    pieces : int = ceil(length / Snapping.maxEdgeLength)
+    for piece in range(pieces):
+        t0 : float = piece / pieces
+        t1 : float = (piece + 1) / pieces
+        xs.append(x0 + 0.5 * (t0 + t1) * dx)
+        ys.append(y0 + 0.5 * (t0 + t1) * dy)
+        edges.append((x0 + t0 * dx, y0 + t0 * dy, x0 + t1 * dx, y0 + t1 * dy))
@@ -0,0 +1,81 @@
+from typing import Callable, Iterator
+from contextlib import contextmanager
+
+import os
+import sys
+import time
+
+# the clock starts when this module is first imported, main.py does so before anything else
+__process_start__ : float = time.perf_counter()
+#
+# startup-profiler class
+#
+# measures how long the phases of starting the editor take (creating the application, importing
+# the editor, building the window, ...) and the time until the canvas has painted its first frame
+#
+# all times are in seconds since the profiler was started, phases can be nested (their names are
+# then joined by '/'), the report can be written as json so it can be tracked e.g. in CI
+#
+class StartupProfiler:
+    def __init__(self, start : float | None = None) -> None:
+        self.start : float = start if (start is not None) else time.perf_counter()
+        # (name, start, end) of every finished phase, in the order they were started
+        self.phases : list[tuple[str, float, float]] = []
+        self.firstFrame : float | None = None
+        self.__open__ : list[str] = []
+        self.__first_frame_callbacks__ : list[Callable[[], None]] = []
+
+    @contextmanager
+    def phase(self, name : str) -> Iterator[None]:
+        self.__open__.append(name)
+        full_name : str = "/".join(self.__open__)
+        index : int = len(self.phases)
+        # reserve the slot, so phases stay ordered by their start even when nested
+        self.phases.append((full_name, self.elapsed(), 0.0))
+        try:
+            yield
+        finally:
+            self.phases[index] = (full_name, self.phases[index][1], self.elapsed())
+            self.__open__.pop()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+    #
+    # to be called whenever the canvas finished a frame, only the first call is recorded
+    #
+    def frameRendered(self) -> None:
+        if (self.firstFrame is not None):
+            return
+        self.firstFrame = self.elapsed()
+        callbacks : list[Callable[[], None]] = self.__first_frame_callbacks__
+        self.__first_frame_callbacks__ = []
+        for callback in callbacks:
+            callback()
+    #
+    # call 'callback' once the first frame is rendered (immediately if it already is)
+    #
+    def onFirstFrame(self, callback : Callable[[], None]) -> None:
+        if (self.firstFrame is not None):
+            callback()
+        else:
+            self.__first_frame_callbacks__.append(callback)
+
+    def toDict(self) -> dict:
+        return { "phases" : [{ "name" : name, "start" : start, "duration" : end - start } for name, start, end in self.phases],
+                 "firstFrame" : self.firstFrame,
+                 "python" : sys.version.split()[0] }
+
+    def write(self, file : os.path) -> None:
+        import json # only needed when a report is requested, not worth its import-time otherwise
+        with open(file, "w") as stream:
+            json.dump(self.toDict(), stream, indent=2)
+
+    def __str__(self) -> str:
+        lines : list[str] = [f"{'  ' * name.count('/')}{name.rsplit('/', 1)[-1]}: {1000.0 * (end - start):.1f} ms"
+                             for name, start, end in self.phases]
+        if (self.firstFrame is not None):
+            lines.append(f"time to first frame: {1000.0 * self.firstFrame:.1f} ms")
+        return "\n".join(lines)
+
+# profiler of the running editor
+startupProfiler : StartupProfiler = StartupProfiler(__process_start__)
@@ -0,0 +1,87 @@
+from PySide6.QtCore import QRectF
+#
+# lightweight 2d-math for hot paths
+#
+# every Qt value-type (QPointF, QSizeF, QRectF, QVector2D) returned from or passed to Qt is a new
+# wrapper-object, so code that only does arithmetic per shape and per frame works on these plain
+# slotted classes instead, updates them in place and only converts to Qt-types where Qt needs them
+# (painter, bounding-boxes of shapes)
+#
+
+#
+# 2d-vector (the per-axis ratios of group-members, see AggregateShape)
+#
+class Vec2:
+    __slots__ = ("x", "y")
+
+    def __init__(self, x : float = 0.0, y : float = 0.0) -> None:
+        self.x : float = x
+        self.y : float = y
+
+    def __repr__(self) -> str:
+        return f"Vec2({self.x}, {self.y})"
+
+#
+# axis-aligned box, like QRectF its width and height can be negative (mirrored shapes)
+#
+class Box:
+    __slots__ = ("x", "y", "width", "height")
+
+    def __init__(self, x : float = 0.0, y : float = 0.0, width : float = 0.0, height : float = 0.0) -> None:
+        self.x : float = x
+        self.y : float = y
+        self.width : float = width
+        self.height : float = height
+
+    def set(self, x : float, y : float, width : float, height : float) -> "Box":
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        return self
+    #
+    # corner that is visually in the top-left, no matter how the box is mirrored
+    #
+    @property
+    def left(self) -> float:
+        return min(self.x, self.x + self.width)
+
+    @property
+    def top(self) -> float:
+        return min(self.y, self.y + self.height)
+    #
+    # position and size of 'rect' relative to the (normalized) box, as ratios of the box's size
+    #
+    def ratiosOf(self, rect : QRectF) -> tuple[Vec2, Vec2]:
+        width : float = abs(self.width)
+        height : float = abs(self.height)
+        return (Vec2(abs(rect.x() - self.left) / width, abs(rect.y() - self.top) / height),
+                Vec2(abs(rect.width()) / width, abs(rect.height()) / height))
+    #
+    # inverse of ratiosOf(), writes the resulting rectangle into 'rect' in place
+    #
+    def fitRect(self, position : Vec2, size : Vec2, rect : QRectF) -> None:
+        width : float = abs(self.width)
+        height : float = abs(self.height)
+        rect.setRect(self.left + position.x * width, self.top + position.y * height, size.x * width, size.y * height)
+    #
+    # conversion from/to Qt
+    #
+    def assign(self, rect : QRectF) -> "Box":
+        return self.set(rect.x(), rect.y(), rect.width(), rect.height())
+
+    def toQRectF(self) -> QRectF:
+        return QRectF(self.x, self.y, self.width, self.height)
+
+    def __repr__(self) -> str:
+        return f"Box({self.x}, {self.y}, {self.width}, {self.height})"
+
+#
+# bounding-box of all rectangles (by their unnormalized top-left and bottom-right corners)
+#
+def unitedBox(rects : list[QRectF]) -> Box:
+    left : float = min(rect.left() for rect in rects)
+    top : float = min(rect.top() for rect in rects)
+    right : float = max(rect.right() for rect in rects)
+    bottom : float = max(rect.bottom() for rect in rects)
+    return Box(left, top, right - left, bottom - top)
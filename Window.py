@@ -1,18 +1,26 @@
 from PySide6.QtCore import QSize, QPointF, QSizeF
+from PySide6.QtCore import Qt
 
 from PySide6.QtGui import (
-    QColor,     QAction,    QIcon,    QCloseEvent
+    QColor,     QAction,    QIcon,    QCloseEvent,
+    QKeySequence
 )
 
 from PySide6.QtWidgets import (
     QFrame,         QMenuBar,       QToolBar,
     QVBoxLayout,    QFileDialog,    QMessageBox,
     QMainWindow,    QMessageBox,    QMenu,
+    QProgressDialog,QApplication,   QInputDialog
 )
 
-from Editor.Shapes.Primitives import Rectangle, Ellipse, Star, Circle
+import xml.etree.ElementTree as XMLTree
+
 from Editor.Canvas import Canvas, EditorState
-from Editor.Scene import exampleScene1, exampleScene2, exampleScene3
+from Editor.StartupProfiler import startupProfiler
+#
+# shapes, examples, autosave and export-options are imported by the actions that use them,
+# so they don't add to the startup-time (see Editor/StartupProfiler.py)
+
 #
 # window class
 #
@@ -35,6 +43,8 @@ class Window(QMainWindow):
         self.toolbar.setIconSize(QSize(16, 16))
 
         file_button : QMenu = self.menu_bar.addMenu("File")
+        edit_button : QMenu = self.menu_bar.addMenu("Edit")
+        view_button : QMenu = self.menu_bar.addMenu("View")
         help_button : QMenu = self.menu_bar.addMenu("Help")
 
         examples_button : QMenu = file_button.addMenu("Examples")
@@ -42,39 +52,102 @@ class Window(QMainWindow):
         example_1_action : QAction = examples_button.addAction("Example 1")
         example_2_action : QAction = examples_button.addAction("Example 2")
         example_3_action : QAction = examples_button.addAction("Example 3")
+        example_3_animated_action : QAction = examples_button.addAction("Example 3 (animated)")
         
-        file_new_action : QAction = file_button.addAction(QIcon("icons/blue-document--plus"), "New Scene")
-        file_export_action : QAction = file_button.addAction(QIcon(""), "Export to .svg")
-        file_close_action : QAction = file_button.addAction(QIcon("icons/door--arrow.png"), "Close")
+        file_new_action : QAction = file_button.addAction("New Scene")
+        file_open_action : QAction = file_button.addAction("Open Scene")
+        file_save_action : QAction = file_button.addAction("Save Scene")
+        file_autosave_action : QAction = file_button.addAction("Autosave to Directory")
+        file_import_action : QAction = file_button.addAction("Import .svg/.svgz")
+        file_export_action : QAction = file_button.addAction("Export to .svg/.svgz")
+        file_export_optimized_action : QAction = file_button.addAction("Export optimized .svg/.svgz")
+        file_export_png_action : QAction = file_button.addAction("Export to .png")
+        file_export_frames_action : QAction = file_button.addAction("Export Animation Frames")
+        file_close_action : QAction = file_button.addAction("Close")
+
+        edit_undo_action : QAction = edit_button.addAction("Undo")
+        edit_redo_action : QAction = edit_button.addAction("Redo")
+        edit_flatten_action : QAction = edit_button.addAction("Flatten Shapes")
+        edit_repeat_action : QAction = edit_button.addAction("Repeat as Instances")
+        edit_deform_action : QAction = edit_button.addAction("Deform Selection")
+        edit_undo_action.setShortcut(QKeySequence.StandardKey.Undo)
+        edit_redo_action.setShortcut(QKeySequence.StandardKey.Redo)
+
+        view_async_action : QAction = view_button.addAction("Asynchronous Rendering")
+        view_stats_action : QAction = view_button.addAction("Render Statistics")
+        view_scene_stats_action : QAction = view_button.addAction("Scene Statistics")
+        view_export_scene_stats_action : QAction = view_button.addAction("Export Scene Statistics")
+        view_snap_action : QAction = view_button.addAction("Snapping")
+        view_overlaps_action : QAction = view_button.addAction("Highlight Overlaps")
+        view_stop_animation_action : QAction = view_button.addAction("Stop Animation")
+        view_async_action.setCheckable(True)
+        view_snap_action.setCheckable(True)
+        view_snap_action.setChecked(True)
+        view_overlaps_action.setCheckable(True)
 
-        add_rect_action : QAction = self.addAction(QIcon(""), "add Rectangle")
-        add_ellipse_action : QAction = self.addAction(QIcon(""), "add Ellipse")
-        add_circ_action : QAction = self.addAction(QIcon(""), "add Circle")
-        add_star_action : QAction = self.addAction(QIcon(""), "add Star")
+        add_rect_action : QAction = self.addAction("add Rectangle")
+        add_ellipse_action : QAction = self.addAction("add Ellipse")
+        add_circ_action : QAction = self.addAction("add Circle")
+        add_star_action : QAction = self.addAction("add Star")
 
         
-        help_information_action : QAction = help_button.addAction(QIcon("icons/information.png"), "About")
-        self.move_mode_action : QAction = self.toolbar.addAction(QIcon("icons/arrow-move.png"), "Move Scene")
-        self.group_mode_action : QAction = self.toolbar.addAction(QIcon(""), "Group Shapes")
+        help_information_action : QAction = help_button.addAction("About")
+        self.move_mode_action : QAction = self.toolbar.addAction("Move Scene")
+        self.group_mode_action : QAction = self.toolbar.addAction("Group Shapes")
+        mirror_h_action : QAction = self.toolbar.addAction("Mirror Horizontally")
+        mirror_v_action : QAction = self.toolbar.addAction("Mirror Vertically")
         self.move_mode_action.setCheckable(True)
         self.group_mode_action.setCheckable(True)
         
         
         file_new_action.triggered.connect(self.action_new)
+        file_open_action.triggered.connect(self.action_open)
+        file_save_action.triggered.connect(self.action_save)
+        file_autosave_action.triggered.connect(self.action_autosave)
+        file_import_action.triggered.connect(self.action_import)
         file_export_action.triggered.connect(self.action_export)
+        file_export_optimized_action.triggered.connect(self.action_export_optimized)
+        file_export_png_action.triggered.connect(self.action_export_png)
+        file_export_frames_action.triggered.connect(self.action_export_frames)
         file_close_action.triggered.connect(self.close)
+        edit_undo_action.triggered.connect(self.canvas.undo)
+        edit_redo_action.triggered.connect(self.canvas.redo)
+        edit_flatten_action.triggered.connect(self.action_flatten)
+        edit_repeat_action.triggered.connect(self.action_repeat)
+        edit_deform_action.triggered.connect(self.action_deform)
+        view_async_action.triggered.connect(self.canvas.setAsyncRendering)
+        view_snap_action.triggered.connect(self.canvas.setSnapping)
+        view_overlaps_action.triggered.connect(self.canvas.setOverlapHighlighting)
+        view_stop_animation_action.triggered.connect(self.canvas.stopAnimation)
+        view_stats_action.triggered.connect(self.action_render_stats)
+        view_scene_stats_action.triggered.connect(self.action_scene_stats)
+        view_export_scene_stats_action.triggered.connect(self.action_export_scene_stats)
         help_information_action.triggered.connect(self.action_info)
         example_1_action.triggered.connect(self.action_example_1)
         example_2_action.triggered.connect(self.action_example_2)
         example_3_action.triggered.connect(self.action_example_3)
+        example_3_animated_action.triggered.connect(self.action_example_3_animated)
         self.move_mode_action.triggered.connect(self.action_move)
         self.group_mode_action.triggered.connect(self.action_group)
+        mirror_h_action.triggered.connect(self.action_mirror_h)
+        mirror_v_action.triggered.connect(self.action_mirror_v)
 
         add_rect_action.triggered.connect(self.action_add_rect)
         add_ellipse_action.triggered.connect(self.action_add_ellipse)
         add_circ_action.triggered.connect(self.action_add_circ)
         add_star_action.triggered.connect(self.action_add_star)
 
+        # icons are only loaded once the first frame is on screen
+        self.__icons__ : list[tuple[QAction, str]] = [(file_new_action, "icons/blue-document--plus.png"),
+                                                      (file_open_action, "icons/folder-horizontal-open.png"),
+                                                      (file_save_action, "icons/disk.png"),
+                                                      (file_autosave_action, "icons/disk.png"),
+                                                      (file_import_action, "icons/folder-horizontal-open.png"),
+                                                      (file_close_action, "icons/door--arrow.png"),
+                                                      (help_information_action, "icons/information.png"),
+                                                      (self.move_mode_action, "icons/arrow-move.png")]
+        startupProfiler.onFirstFrame(self.__load_icons__)
+
         self.toolbar.addActions([file_new_action, 
                                  add_rect_action,
                                  add_ellipse_action,
@@ -84,15 +157,161 @@ class Window(QMainWindow):
                                  file_close_action, 
                                  help_information_action])
 
+    def __load_icons__(self) -> None:
+        for action, path in self.__icons__:
+            action.setIcon(QIcon(path))
+        self.__icons__ = []
+
     def action_new(self):
         if QMessageBox.question(self, "create new scene?", "unsaved progress will be lost") == QMessageBox.Yes:
             self.canvas.clear()
 
     def action_export(self):
-        file_name, selected_filter = QFileDialog.getSaveFileName(self, "Select Export Path", "","SVG Files (*.svg)")
+        file_name, selected_filter = QFileDialog.getSaveFileName(self, "Select Export Path", "","SVG Files (*.svg);;Compressed SVG Files (*.svgz)")
         if (len(file_name)):
             self.canvas.exportSceneToSVG(file_name, "VGEditor Scene", "placeholder description")
 
+    def action_export_optimized(self):
+        from Editor.SVGWriter import SVGOptimization, SVGOptimizationReport
+        file_name, selected_filter = QFileDialog.getSaveFileName(self, "Select Export Path", "","SVG Files (*.svg);;Compressed SVG Files (*.svgz)")
+        if (len(file_name)):
+            report : SVGOptimizationReport = self.canvas.exportSceneToSVG(file_name, "VGEditor Scene", "placeholder description",
+                                                                          False, SVGOptimization(precision=2))
+            QMessageBox.information(self, "Optimized Export", str(report), QMessageBox.Close)
+
+    def action_export_png(self):
+        width, accepted = QInputDialog.getInt(self, "Export to .png", "Width in pixels:", 4 * self.canvas.width(), 1, 1 << 20)
+        if not (accepted):
+            return
+        file_name, selected_filter = QFileDialog.getSaveFileName(self, "Select Export Path", "","PNG Files (*.png)")
+        if (len(file_name)):
+            progress_dialog : QProgressDialog = QProgressDialog("Exporting image...", "", 0, 100, self)
+            progress_dialog.setCancelButton(None)
+            # events are processed while the export runs, the scene must not be edited meanwhile
+            progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+            progress_dialog.setMinimumDuration(500)
+
+            def report(done : int, total : int) -> None:
+                progress_dialog.setValue(int(100 * done / max(total, 1)))
+                QApplication.processEvents()
+
+            self.canvas.exportSceneToPNG(file_name, width, progress=report)
+            progress_dialog.close()
+
+    def action_export_frames(self):
+        if (self.canvas.animation is None):
+            QMessageBox.information(self, "Export Animation Frames", "no animation is playing", QMessageBox.Close)
+            return
+        width, accepted = QInputDialog.getInt(self, "Export Animation Frames", "Width in pixels:", self.canvas.width(), 1, 1 << 16)
+        if not (accepted):
+            return
+        directory : str = QFileDialog.getExistingDirectory(self, "Select Frame Directory")
+        if (len(directory)):
+            progress_dialog : QProgressDialog = QProgressDialog("Exporting frames...", "", 0, 100, self)
+            progress_dialog.setCancelButton(None)
+            progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+            progress_dialog.setMinimumDuration(500)
+
+            def report(done : int, total : int) -> None:
+                progress_dialog.setValue(int(100 * done / max(total, 1)))
+                QApplication.processEvents()
+
+            self.canvas.exportAnimation(directory, width, progress=report)
+            progress_dialog.close()
+
+    def action_flatten(self):
+        QMessageBox.information(self, "Flatten Shapes", str(self.canvas.flatten()), QMessageBox.Close)
+
+    def action_repeat(self):
+        if not (len(self.canvas.editShape.selection)):
+            QMessageBox.information(self, "Repeat as Instances", "select the shapes to repeat first", QMessageBox.Close)
+            return
+        count, accepted = QInputDialog.getInt(self, "Repeat as Instances", "Instances per shape:", 4, 1, 10000)
+        if (accepted):
+            self.canvas.repeatSelection(count)
+
+    def action_deform(self):
+        from Editor.BatchDeform import BatchDeform
+        if not (len(self.canvas.editShape.selection)):
+            QMessageBox.information(self, "Deform Selection", "select the shapes to deform first", QMessageBox.Close)
+            return
+        amplitude, accepted = QInputDialog.getDouble(self, "Deform Selection", "Amplitude:", 20.0, -10000.0, 10000.0, 2)
+        if not (accepted):
+            return
+        subdivisions, accepted = QInputDialog.getInt(self, "Deform Selection", "Subdivisions:", 2, 0, 8)
+        if not (accepted):
+            return
+        deform : BatchDeform = BatchDeform(amplitude, 0.2, 0.0, subdivisions)
+        progress_dialog : QProgressDialog = QProgressDialog("Deforming shapes...", "Cancel", 0, 100, self)
+        progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+        progress_dialog.setMinimumDuration(500)
+        progress_dialog.canceled.connect(deform.cancel)
+
+        def report(done : int, total : int) -> None:
+            progress_dialog.setValue(int(100 * done / max(total, 1)))
+            QApplication.processEvents()
+
+        result = self.canvas.deformSelection(deform, report)
+        progress_dialog.close()
+        if (result.cancelled):
+            QMessageBox.information(self, "Deform Selection", str(result), QMessageBox.Close)
+
+    def action_render_stats(self):
+        if (self.canvas.renderStats is None):
+            QMessageBox.information(self, "Render Statistics", "asynchronous rendering is disabled", QMessageBox.Close)
+        else:
+            QMessageBox.information(self, "Render Statistics", str(self.canvas.renderStats), QMessageBox.Close)
+
+    def action_scene_stats(self):
+        QMessageBox.information(self, "Scene Statistics", str(self.canvas.scene.inspect()), QMessageBox.Close)
+
+    def action_export_scene_stats(self):
+        file_name, selected_filter = QFileDialog.getSaveFileName(self, "Select Export Path", "","JSON Files (*.json)")
+        if (len(file_name)):
+            self.canvas.scene.inspect().write(file_name)
+
+    def action_open(self):
+        file_name, selected_filter = QFileDialog.getOpenFileName(self, "Open Scene", "","VGEditor Scenes (*.vgs)")
+        if (len(file_name)):
+            self.canvas.openScene(file_name)
+
+    def action_save(self):
+        file_name, selected_filter = QFileDialog.getSaveFileName(self, "Save Scene", "","VGEditor Scenes (*.vgs)")
+        if (len(file_name)):
+            self.canvas.saveScene(file_name)
+
+    def action_autosave(self):
+        from Editor.Journal import Journal
+        directory : str = QFileDialog.getExistingDirectory(self, "Select Autosave Directory")
+        if (len(directory)):
+            recover : bool = False
+            if (Journal.hasData(directory)):
+                recover = QMessageBox.question(self, "recover autosaved scene?",
+                                               "the directory contains an autosaved scene, load it instead of the current one?") == QMessageBox.Yes
+            self.canvas.enableAutosave(directory, recover)
+
+    def action_import(self):
+        file_name, selected_filter = QFileDialog.getOpenFileName(self, "Select SVG-File to import", "","SVG Files (*.svg *.svgz)")
+        if (len(file_name)):
+            progress_dialog : QProgressDialog = QProgressDialog("Importing shapes...", "", 0, 100, self)
+            progress_dialog.setCancelButton(None)
+            progress_dialog.setWindowModality(Qt.WindowModality.WindowModal)
+            progress_dialog.setMinimumDuration(500)
+
+            def report(done : int, total : int) -> None:
+                progress_dialog.setValue(int(100 * done / max(total, 1)))
+                QApplication.processEvents()
+
+            # nothing is attached to the scene if the file cannot be read or parsed completely
+            try:
+                Canvas.importShapesFromSVG(self.canvas.scene, file_name, report)
+            except (XMLTree.ParseError, OSError, EOFError) as error:
+                progress_dialog.close()
+                QMessageBox.warning(self, "Import SVG", f"could not import {file_name}:\n{error}", QMessageBox.Close)
+                return
+            progress_dialog.close()
+            self.canvas.update()
+
     def action_move(self, state : bool):
         if (state):
             self.canvas.setState(EditorState.SCROLL_CAMERA)
@@ -105,40 +324,62 @@ class Window(QMainWindow):
         else:
             self.canvas.setState(EditorState.EDIT)
 
+    def action_mirror_h(self):
+        self.canvas.editShape.mirrorSelection(True)
+        self.canvas.update()
+
+    def action_mirror_v(self):
+        self.canvas.editShape.mirrorSelection(False)
+        self.canvas.update()
+
     def action_add_rect(self):
+        from Editor.Shapes.Primitives import Rectangle
         self.move_mode_action.setChecked(False)
         self.canvas.setState(EditorState.NEW)
         self.canvas.newShape.makeNewShape(Rectangle(QPointF(0.0, 0.0), QSizeF(0.0, 0.0)))
 
     def action_add_ellipse(self):
+        from Editor.Shapes.Primitives import Ellipse
         self.move_mode_action.setChecked(False)
         self.canvas.setState(EditorState.NEW)
         self.canvas.newShape.makeNewShape(Ellipse(QPointF(0.0, 0.0), QSizeF(0.0, 0.0)))
 
     def action_add_circ(self):
+        from Editor.Shapes.Primitives import Circle
         self.move_mode_action.setChecked(False)
         self.canvas.setState(EditorState.NEW)
         self.canvas.newShape.makeNewShape(Circle(QPointF(0.0, 0.0), 0.0))
 
     def action_add_star(self):
+        from Editor.Shapes.Primitives import Star
         self.move_mode_action.setChecked(False)
         self.canvas.setState(EditorState.NEW)
         self.canvas.newShape.makeNewShape(Star(QPointF(0.0, 0.0), QSizeF(0.0, 0.0), QSizeF(0.0, 0.0), 3))
 
     def action_example_1(self):
+        from Editor.Examples import exampleScene1
         self.canvas.clear()
         exampleScene1(self.canvas.scene)
 
     def action_example_2(self):
+        from Editor.Examples import exampleScene2
         self.canvas.clear()
         exampleScene2(self.canvas.scene)
 
     def action_example_3(self):
+        from Editor.Examples import exampleScene3
         self.canvas.clear()
         exampleScene3(self.canvas.scene)
+
+    def action_example_3_animated(self):
+        from Editor.Examples import exampleAnimation3
+        self.canvas.clear()
+        self.canvas.playAnimation(exampleAnimation3(self.canvas.scene))
     
     def closeEvent(self, event : QCloseEvent):
         if (QMessageBox.question(self, "Really close?", "Progress may be unsaved", QMessageBox.Yes, QMessageBox.No) == QMessageBox.Yes):
+            self.canvas.disableAutosave()
+            self.canvas.setAsyncRendering(False)
             event.accept()
         else:
             event.ignore()
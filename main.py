@@ -1,17 +1,53 @@
-from Window import Window
-from PySide6.QtWidgets import QApplication
+from Editor.StartupProfiler import startupProfiler
 
 import sys
 
+#
+# startup-profiling (e.g. to track the time-to-first-frame in CI):
+#
+#   --startup-profile[=file]    print the startup-phases once the first frame is rendered,
+#                               or write them to 'file' as json
+#   --exit-after-first-frame    quit right after the first frame
+#
+def __startup_options__(arguments : list[str]) -> tuple[str | None, bool]:
+    report : str | None = None
+    exit_after_first_frame : bool = False
+    for argument in arguments:
+        if (argument == "--startup-profile"):
+            report = ""
+        elif (argument.startswith("--startup-profile=")):
+            report = argument.split("=", 1)[1]
+        elif (argument == "--exit-after-first-frame"):
+            exit_after_first_frame = True
+    return (report, exit_after_first_frame)
+
 if __name__ == "__main__":
 
-    app : QApplication = QApplication(sys.argv)
+    report, exit_after_first_frame = __startup_options__(sys.argv[1:])
 
-    main_window : Window = Window(None)
-    main_window.show()
-    
-    app.exec()
+    with startupProfiler.phase("import qt"):
+        from PySide6.QtWidgets import QApplication
+        from PySide6.QtCore import QTimer
 
+    with startupProfiler.phase("application"):
+        app : QApplication = QApplication(sys.argv)
 
+    with startupProfiler.phase("import editor"):
+        from Window import Window
 
+    with startupProfiler.phase("window"):
+        main_window : Window = Window(None)
+    with startupProfiler.phase("show"):
+        main_window.show()
 
+    def first_frame() -> None:
+        if (report == ""):
+            print(startupProfiler)
+        elif (report is not None):
+            startupProfiler.write(report)
+        if (exit_after_first_frame):
+            # exit() instead of quit(), which would ask through the window's close-dialog first
+            QTimer.singleShot(0, lambda : app.exit(0))
+    startupProfiler.onFirstFrame(first_frame)
+
+    app.exec()